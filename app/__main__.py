@@ -1,15 +1,15 @@
+import contextlib
 import logging
 import os
 import sys
+import threading
 
 import click
-import httpx
 import uvicorn
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
 from a2a.server.tasks import (
-    BasePushNotificationSender,
     InMemoryPushNotificationConfigStore,
     InMemoryTaskStore,
 )
@@ -20,8 +20,9 @@ from a2a.types import (
 )
 from dotenv import load_dotenv
 
-from app.agent import Agent
+from app.admin import admin_routes
 from app.agent_executor import GeneralAgentExecutor
+from app.push import QueuedPushNotificationSender
 
 load_dotenv()
 
@@ -31,10 +32,129 @@ logger = logging.getLogger(__name__)
 class MissingAPIKeyError(Exception):
     """Exception for missing API key."""
 
+
+def build_agent_card(host, port) -> AgentCard:
+    """Return the agent card advertised at the well-known path."""
+    # Configure agent capabilities and skills
+    capabilities = AgentCapabilities(
+        streaming=True, 
+        push_notifications=True,
+        text_input=True,
+        file_upload=False,
+        web_browsing=True,
+        data_analysis=False
+    )
+    
+    skills = [
+        AgentSkill(
+            id='disease_diagnosis',
+            name='Rice Disease Diagnosis',
+            description='Diagnose rice diseases from symptoms and conditions',
+            tags=['agriculture', 'pathology', 'diagnosis'],
+            examples=['My rice plants have brown spots on leaves, what disease is this?'],
+        ),
+        AgentSkill(
+            id='ipm_recommendations',
+            name='Integrated Pest Management',
+            description='Provide integrated pest management strategies for rice',
+            tags=['agronomy', 'ipm', 'management'],
+            examples=['What IPM strategy should I use for rice blast disease?'],
+        ),
+        AgentSkill(
+            id='scientific_research',
+            name='Agricultural Research',
+            description='Access scientific literature and research papers on rice diseases',
+            tags=['research', 'literature', 'academic'],
+            examples=['Find recent research on rice disease resistance breeding'],
+        ),
+        AgentSkill(
+            id='batch_diagnosis',
+            name='Batch Diagnosis',
+            description=(
+                'Diagnose many symptom reports in one task. Send a data part {"queries": [...]}; '
+                'each result is streamed back as an artifact {index, query, status, message} '
+                'as soon as it completes, followed by a summary artifact'
+            ),
+            tags=['agriculture', 'diagnosis', 'batch', 'survey'],
+            examples=['{"queries": ["Brown spots on leaves after heavy rain", "White panicles at heading"]}'],
+            input_modes=['data'],
+            output_modes=['data'],
+        ),
+    ]
+
+    return AgentCard(
+        name='Rice Disease Agent',
+        description='AI assistant for rice disease diagnosis and integrated pest management',
+        url=f'http://{host}:{port}/',
+        version='1.0.0',
+        defaultInputModes=['text'],
+        defaultOutputModes=['text'],
+        capabilities=capabilities,
+        skills=skills,
+    )
+
+
+def build_server(
+    agent_card, agent_executor=None, task_store=None, push_config_store=None, push_sender=None
+) -> A2AStarletteApplication:
+    """Wire the request handler, stores and push sender into an A2A application."""
+    # Create required components following the working pattern
+    push_config_store = push_config_store or InMemoryPushNotificationConfigStore()
+    # Webhooks are called by background workers, never inline with task updates (see app.push)
+    push_sender = push_sender or QueuedPushNotificationSender(
+        httpx_client=None,
+        config_store=push_config_store
+    )
+    
+    request_handler = DefaultRequestHandler(
+        agent_executor=agent_executor or GeneralAgentExecutor(),
+        task_store=task_store or InMemoryTaskStore(),
+        push_config_store=push_config_store,
+        push_sender=push_sender
+    )
+    
+    return A2AStarletteApplication(
+        agent_card=agent_card, 
+        http_handler=request_handler
+    )
+
+
+def warm_up_lifespan(agent_executor, push_sender=None):
+    """Starlette lifespan that builds the agent in the background once the server starts.
+
+    The port is bound without waiting for the agent (models, tools, graph);
+    a request arriving earlier waits for the same build. `AGENT_WARMUP=0`
+    defers the build to the first request. On shutdown, queued push
+    notifications get a few seconds to be delivered.
+    """
+
+    def warm_up():
+        try:
+            agent_executor.warm_up()
+            logger.info('Agent ready')
+        except Exception:
+            logger.exception('Agent warm-up failed; it will be retried on the first request')
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        if os.getenv('AGENT_WARMUP', '1').lower() not in ('0', 'false', 'no', 'off'):
+            threading.Thread(target=warm_up, name='agent-warm-up', daemon=True).start()
+        yield
+        if push_sender is not None:
+            await push_sender.aclose()
+
+    return lifespan
+
+
 @click.command()
 @click.option('--host', 'host', default='0.0.0.0')
 @click.option('--port', 'port', default=int(os.environ.get('PORT', 10000)))
-def main(host, port):
+@click.option(
+    '--profile-startup',
+    is_flag=True,
+    help='Report import and initialization time per module and stage, then exit.',
+)
+def main(host, port, profile_startup):
     """Starts the Rice Disease Agent server with A2A protocol support."""
     try:
         if not os.getenv('OPENAI_API_KEY'):
@@ -42,75 +162,28 @@ def main(host, port):
                 'OPENAI_API_KEY environment variable not set.'
             )
 
-        logger.info(f"Starting Rice Disease Agent server on {host}:{port}")
+        if profile_startup:
+            from app.startup import print_profile, profile_startup as run_profile
 
-        # Configure agent capabilities and skills
-        capabilities = AgentCapabilities(
-            streaming=True, 
-            push_notifications=True,
-            text_input=True,
-            file_upload=False,
-            web_browsing=True,
-            data_analysis=False
-        )
-        
-        skills = [
-            AgentSkill(
-                id='disease_diagnosis',
-                name='Rice Disease Diagnosis',
-                description='Diagnose rice diseases from symptoms and conditions',
-                tags=['agriculture', 'pathology', 'diagnosis'],
-                examples=['My rice plants have brown spots on leaves, what disease is this?'],
-            ),
-            AgentSkill(
-                id='ipm_recommendations',
-                name='Integrated Pest Management',
-                description='Provide integrated pest management strategies for rice',
-                tags=['agronomy', 'ipm', 'management'],
-                examples=['What IPM strategy should I use for rice blast disease?'],
-            ),
-            AgentSkill(
-                id='scientific_research',
-                name='Agricultural Research',
-                description='Access scientific literature and research papers on rice diseases',
-                tags=['research', 'literature', 'academic'],
-                examples=['Find recent research on rice disease resistance breeding'],
-            ),
-        ]
-
-        agent_card = AgentCard(
-            name='Rice Disease Agent',
-            description='AI assistant for rice disease diagnosis and integrated pest management',
-            url=f'http://{host}:{port}/',
-            version='1.0.0',
-            defaultInputModes=['text'],
-            defaultOutputModes=['text'],
-            capabilities=capabilities,
-            skills=skills,
-        )
+            print_profile(run_profile())
+            return
 
-        # Create required components following the working pattern
-        httpx_client = httpx.AsyncClient()
+        logger.info(f"Starting Rice Disease Agent server on {host}:{port}")
+
+        agent_card = build_agent_card(host, port)
+        agent_executor = GeneralAgentExecutor()
+        task_store = InMemoryTaskStore()
         push_config_store = InMemoryPushNotificationConfigStore()
-        push_sender = BasePushNotificationSender(
-            httpx_client=httpx_client,
-            config_store=push_config_store
-        )
-        
-        request_handler = DefaultRequestHandler(
-            agent_executor=GeneralAgentExecutor(),
-            task_store=InMemoryTaskStore(),
-            push_config_store=push_config_store,
-            push_sender=push_sender
-        )
-        
-        server = A2AStarletteApplication(
-            agent_card=agent_card, 
-            http_handler=request_handler
-        )
+        push_sender = QueuedPushNotificationSender(httpx_client=None, config_store=push_config_store)
+        server = build_server(agent_card, agent_executor, task_store, push_config_store, push_sender)
 
-        # Build and run the server
-        uvicorn.run(server.build(), host=host, port=port)
+        # Build and run the server; the agent is built once it is listening.
+        # Admin endpoints are added when ADMIN_TOKEN is set (see app.admin)
+        app = server.build(
+            routes=admin_routes(agent_executor, task_store, push_config_store, push_sender),
+            lifespan=warm_up_lifespan(agent_executor, push_sender),
+        )
+        uvicorn.run(app, host=host, port=port)
 
     except MissingAPIKeyError as e:
         logger.error(f'Error: {e}')
@@ -0,0 +1,289 @@
+"""Authenticated admin endpoints for index and cache management.
+
+Mounted at `/admin` on the A2A app when `ADMIN_TOKEN` is set (there are no
+admin routes otherwise); every request needs `Authorization: Bearer
+<ADMIN_TOKEN>`:
+- `GET /admin/stats`: the live index (files, pages, chunks, sections,
+  vectors and their memory), cache sizes and hit rates (query embeddings,
+  tool results, precomputed answers, prefetched retrievals), the
+  occupancy of the conversation checkpointer and the A2A task store, and
+  push-notification delivery (see `app.push`);
+- `POST /admin/warmup`: build the agent and the RAG index now, and embed
+  the canonical questions (or `{"questions": [...]}`) into the query cache;
+- `POST /admin/reindex`: refresh the index from `RAG_DATA_DIR`, re-embedding
+  only chunk texts the live index does not hold (`{"full": true}` re-embeds
+  everything); retrievals prefetched from the previous index are dropped;
+- `POST /admin/caches/invalidate`: clear the caches named in
+  `{"caches": [...]}` (default all of `CACHES`).
+
+Statistics never build anything: components not built yet are reported as
+null. Index work runs in a thread, so the server keeps answering requests
+while it runs.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import hmac
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import BaseRoute, Mount, Route
+
+
+logger = logging.getLogger(__name__)
+
+# Names accepted by POST /admin/caches/invalidate
+CACHES = ("query_embeddings", "tools", "answers", "prefetches")
+
+
+def _admin_token() -> Optional[str]:
+    """Bearer token of the admin endpoints from `ADMIN_TOKEN` (unset: no admin endpoints)."""
+    return os.environ.get("ADMIN_TOKEN") or None
+
+
+def _hit_rate(hits: int, lookups: int) -> Optional[float]:
+    return hits / lookups if lookups else None
+
+
+async def _json_body(request: Request) -> Dict[str, Any]:
+    """The request's JSON object; an empty body is an empty object."""
+    raw = await request.body()
+    if not raw.strip():
+        return {}
+    body = json.loads(raw)
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object")
+    return body
+
+
+def _loaded_rag():
+    """The `app.rag` module if something imported it already (stats never import the RAG stack)."""
+    return sys.modules.get("app.rag")
+
+
+def _checkpointer_stats() -> Optional[Dict[str, int]]:
+    """Occupancy of the in-memory checkpointer; None if not loaded or its layout is unknown.
+
+    `storage` and `writes` are internals of LangGraph's `InMemorySaver`, not
+    API, so a checkpointer without them is reported as null.
+    """
+    agent_module = sys.modules.get("app.agent")
+    memory = getattr(agent_module, "memory", None)
+    storage = getattr(memory, "storage", None)
+    writes = getattr(memory, "writes", None)
+    if not isinstance(storage, dict) or not isinstance(writes, dict):
+        return None
+    # Copied before iterating: conversations keep writing while we count
+    namespaces = [ns for thread in list(storage.values()) for ns in list(thread.values())]
+    return {
+        "threads": len(storage),
+        "checkpoints": sum(len(ns) for ns in namespaces),
+        "pending_writes": len(writes),
+    }
+
+
+class AdminAPI:
+    """Handlers of the admin endpoints over the server's executor and stores."""
+
+    def __init__(
+        self,
+        agent_executor,
+        task_store=None,
+        push_config_store=None,
+        push_sender=None,
+        token: Optional[str] = None,
+    ):
+        self.agent_executor = agent_executor
+        self.task_store = task_store
+        self.push_config_store = push_config_store
+        self.push_sender = push_sender
+        self.token = token or _admin_token()
+
+    def routes(self) -> List[BaseRoute]:
+        return [
+            Route("/stats", self._authenticated(self.stats), methods=["GET"]),
+            Route("/warmup", self._authenticated(self.warmup), methods=["POST"]),
+            Route("/reindex", self._authenticated(self.reindex), methods=["POST"]),
+            Route("/caches/invalidate", self._authenticated(self.invalidate), methods=["POST"]),
+        ]
+
+    def _authenticated(self, handler: Callable[[Request], Awaitable[JSONResponse]]):
+        async def endpoint(request: Request) -> JSONResponse:
+            scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+            if not (
+                self.token
+                and scheme.lower() == "bearer"
+                and hmac.compare_digest(credentials.strip().encode(), self.token.encode())
+            ):
+                return JSONResponse(
+                    {"error": "unauthorized"}, status_code=401, headers={"WWW-Authenticate": "Bearer"}
+                )
+            try:
+                return await handler(request)
+            except ValueError as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+            except Exception as e:
+                logger.exception("Admin request %s failed", request.url.path)
+                return JSONResponse({"error": f"{type(e).__name__}: {e}"}, status_code=500)
+
+        return endpoint
+
+    # -- stats ------------------------------------------------------------------
+
+    def _library(self):
+        rag = _loaded_rag()
+        return rag._get_rag_library.cached() if rag is not None else None
+
+    def _cache_stats(self) -> Dict[str, Any]:
+        caches: Dict[str, Any] = {name: None for name in CACHES}
+        library = self._library()
+        if library is not None:
+            embeddings = library.query_embeddings.stats()
+            embeddings["hit_rate"] = _hit_rate(embeddings["cache_hits"], embeddings["queries"])
+            caches["query_embeddings"] = embeddings
+        from app.toolcache import default_cache
+
+        tool_cache = default_cache()
+        if tool_cache is not None:
+            tools = tool_cache.stats()
+            tools["hit_rate"] = _hit_rate(tools["hits"], tools["hits"] + tools["misses"])
+            caches["tools"] = tools
+        agent = self.agent_executor.built_agent
+        if agent is not None and agent.answers is not None:
+            answers = agent.answers
+            caches["answers"] = {
+                "path": answers.path,
+                "entries": len(answers),
+                "lookups": answers.lookups,
+                "hits": answers.hits,
+                "hit_rate": _hit_rate(answers.hits, answers.lookups),
+            }
+        rag = _loaded_rag()
+        if rag is not None:
+            caches["prefetches"] = rag.query_stats()
+        return caches
+
+    async def _task_stats(self) -> Optional[Dict[str, Any]]:
+        # Attributes of the SDK's InMemoryTaskStore; other stores report null
+        tasks = getattr(self.task_store, "tasks", None)
+        lock = getattr(self.task_store, "lock", None)
+        if not isinstance(tasks, dict) or lock is None:
+            return None
+        async with lock:
+            states = collections.Counter(task.status.state.value for task in tasks.values())
+        return {"tasks": sum(states.values()), "by_state": dict(states)}
+
+    def _push_config_count(self) -> Optional[int]:
+        # Private to the SDK's in-memory store; other stores (or SDK versions) report null
+        infos = getattr(self.push_config_store, "_push_notification_infos", None)
+        if not isinstance(infos, dict):
+            return None
+        return sum(len(configs) for configs in list(infos.values()))
+
+    async def stats(self, request: Request) -> JSONResponse:
+        library = self._library()
+        return JSONResponse(
+            {
+                "agent_ready": self.agent_executor.built_agent is not None,
+                "index": library.stats() if library is not None else None,
+                "caches": self._cache_stats(),
+                "checkpointer": _checkpointer_stats(),
+                "task_store": await self._task_stats(),
+                "push_configs": self._push_config_count(),
+                "push_delivery": self.push_sender.stats() if hasattr(self.push_sender, "stats") else None,
+            }
+        )
+
+    # -- actions ----------------------------------------------------------------
+
+    async def warmup(self, request: Request) -> JSONResponse:
+        body = await _json_body(request)
+        questions = body.get("questions")
+        if questions is not None and not (
+            isinstance(questions, list) and all(isinstance(q, str) for q in questions)
+        ):
+            raise ValueError('"questions" must be a list of strings')
+        started = time.perf_counter()
+        await asyncio.to_thread(self.agent_executor.warm_up)
+        from app import rag
+
+        library = await asyncio.to_thread(rag._get_rag_library)
+        await asyncio.to_thread(rag._get_rag_graph)
+        if questions is None:
+            from app.answers import canonical_questions
+
+            questions = canonical_questions()
+        embedded = await asyncio.to_thread(library.query_embeddings.warm, list(questions))
+        return JSONResponse(
+            {
+                "seconds": time.perf_counter() - started,
+                "questions_embedded": embedded,
+                "index": library.stats(),
+            }
+        )
+
+    async def reindex(self, request: Request) -> JSONResponse:
+        body = await _json_body(request)
+        started = time.perf_counter()
+        from app import rag
+
+        built = rag._get_rag_library.cached() is None
+        library = await asyncio.to_thread(rag._get_rag_library)
+        full = bool(body.get("full"))
+        # A library built by this call is already current (and nothing was prefetched from it)
+        changed = built or await asyncio.to_thread(library.refresh, full)
+        dropped = library.prefetches_dropped if changed and not built else 0
+        logger.info("Admin reindex of %s: changed=%s full=%s", library.data_dir, changed, full)
+        return JSONResponse(
+            {
+                "changed": changed,
+                "full": full,
+                "seconds": time.perf_counter() - started,
+                "prefetches_dropped": dropped,
+                "index": library.stats(),
+            }
+        )
+
+    async def invalidate(self, request: Request) -> JSONResponse:
+        body = await _json_body(request)
+        names = body.get("caches") or list(CACHES)
+        unknown = sorted(set(names) - set(CACHES))
+        if unknown:
+            raise ValueError(f"Unknown caches {unknown}; expected some of {list(CACHES)}")
+        cleared: Dict[str, Any] = {}
+        library = self._library()
+        if "query_embeddings" in names and library is not None:
+            cleared["query_embeddings"] = library.query_embeddings.stats()["cached"]
+            library.query_embeddings.clear()
+        if "tools" in names:
+            from app.toolcache import default_cache
+
+            tool_cache = default_cache()
+            if tool_cache is not None:
+                cleared["tools"] = tool_cache.stats()["entries"]
+                tool_cache.clear()
+        agent = self.agent_executor.built_agent
+        if "answers" in names and agent is not None and agent.answers is not None:
+            # The store file is rebuilt offline; this only forces a re-read and library check
+            agent.answers.invalidate()
+            cleared["answers"] = len(agent.answers)
+        rag = _loaded_rag()
+        if "prefetches" in names and rag is not None:
+            cleared["prefetches"] = rag.clear_prefetches()
+        logger.info("Admin cache invalidation: %s", cleared)
+        return JSONResponse({"cleared": cleared})
+
+
+def admin_routes(agent_executor, task_store=None, push_config_store=None, push_sender=None) -> List[BaseRoute]:
+    """Routes of the admin API under `/admin`, or none when `ADMIN_TOKEN` is unset."""
+    if _admin_token() is None:
+        return []
+    api = AdminAPI(agent_executor, task_store, push_config_store, push_sender)
+    return [Mount("/admin", routes=api.routes())]
@@ -1,9 +1,16 @@
+import asyncio
 import logging
+import os
+import threading
+import uuid
+
+from typing import TYPE_CHECKING
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
 from a2a.server.tasks import TaskUpdater
 from a2a.types import (
+    DataPart,
     InternalError,
     InvalidParamsError,
     Part,
@@ -17,18 +24,80 @@ from a2a.utils import (
 )
 from a2a.utils.errors import ServerError
 
-from app.agent import Agent
+if TYPE_CHECKING:
+    from app.agent import Agent
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Largest batch accepted, and how many batch items run through the agent at once
+BATCH_MAX_QUERIES = int(os.environ.get('BATCH_MAX_QUERIES', '500'))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '8'))
+
+
+def batch_queries(context: RequestContext) -> list[str] | None:
+    """Return the queries of a batch request, or None for a normal message.
+
+    A batch is a message with a data part of the form {"queries": [...]};
+    raises ValueError if the list is empty, longer than BATCH_MAX_QUERIES,
+    or holds anything but non-blank strings.
+    """
+    for part in (context.message.parts if context.message else []):
+        if isinstance(part.root, DataPart) and 'queries' in part.root.data:
+            queries = part.root.data['queries']
+            if not isinstance(queries, list) or not all(isinstance(q, str) and q.strip() for q in queries):
+                raise ValueError('"queries" must be a list of non-empty strings')
+            if not 0 < len(queries) <= BATCH_MAX_QUERIES:
+                raise ValueError(f'"queries" must hold 1 to {BATCH_MAX_QUERIES} items')
+            return queries
+    return None
+
+
+def request_deadline(context: RequestContext) -> float | None:
+    """Return the per-request latency budget in seconds, or None for the agent default.
+
+    Set as `deadline_s` in the request or message metadata; raises
+    ValueError if it is not a non-negative number.
+    """
+    for metadata in (context.metadata, context.message.metadata if context.message else None):
+        if metadata and metadata.get('deadline_s') is not None:
+            value = float(metadata['deadline_s'])
+            if value < 0:
+                raise ValueError('deadline_s must not be negative')
+            return value
+    return None
+
+
 class GeneralAgentExecutor(AgentExecutor):
     """General Purpose AgentExecutor with A2A Protocol Support."""
 
-    def __init__(self):
-        self.agent = Agent()
+    def __init__(self, agent: 'Agent | None' = None, batch_concurrency: int | None = None):
+        # Built on first use (or by `warm_up`) so the server can bind its port first
+        self._agent = agent
+        self._agent_lock = threading.Lock()
+        self.batch_concurrency = batch_concurrency or BATCH_CONCURRENCY
+
+    @property
+    def agent(self) -> 'Agent':
+        if self._agent is None:
+            with self._agent_lock:
+                if self._agent is None:
+                    # Imported here: the agent stack is slow to import
+                    from app.agent import Agent
+
+                    self._agent = Agent()
+        return self._agent
+
+    @property
+    def built_agent(self) -> 'Agent | None':
+        """The agent if it has been built, without building it."""
+        return self._agent
+
+    def warm_up(self) -> None:
+        """Build the agent (models, tools, graph) ahead of the first request."""
+        self.agent
 
     async def execute(
         self,
@@ -37,17 +106,31 @@ class GeneralAgentExecutor(AgentExecutor):
     ) -> None:
         error = self._validate_request(context)
         if error:
-            raise ServerError(error=InvalidParamsError())
+            raise ServerError(error=InvalidParamsError(message=error))
 
         query = context.get_user_input()
+        deadline_s = request_deadline(context)
         task = context.current_task
         if not task:
             task = new_task(context.message)  # type: ignore
             await event_queue.enqueue_event(task)
         updater = TaskUpdater(event_queue, task.id, task.context_id)
+
+        # Keep the event loop serving while a cold agent is built
+        await asyncio.to_thread(self.warm_up)
+
+        queries = batch_queries(context)
+        if queries is not None:
+            try:
+                await self._execute_batch(queries, task, updater, deadline_s)
+            except Exception as e:
+                logger.error(f'An error occurred while processing the batch: {e}')
+                raise ServerError(error=InternalError()) from e
+            return
+
         try:
             logger.info(f"Starting agent stream for query: {query}")
-            async for item in self.agent.stream(query, task.context_id):
+            async for item in self.agent.stream(query, task.context_id, deadline_s):
                 is_task_complete = item['is_task_complete']
                 require_user_input = item['require_user_input']
                 logger.info(f"Stream item - complete: {is_task_complete}, requires_input: {require_user_input}")
@@ -84,8 +167,91 @@ class GeneralAgentExecutor(AgentExecutor):
             logger.error(f'An error occurred while streaming the response: {e}')
             raise ServerError(error=InternalError()) from e
 
-    def _validate_request(self, context: RequestContext) -> bool:
-        return False
+    async def _final_response(self, query: str, context_id: str, deadline_s: float | None = None) -> dict:
+        result: dict = {}
+        async for item in self.agent.stream(query, context_id, deadline_s):
+            result = item
+        return result
+
+    async def _execute_batch(
+        self, queries: list[str], task, updater: TaskUpdater, deadline_s: float | None = None
+    ) -> None:
+        """Run the queries with bounded parallelism, emitting one artifact per item as it completes.
+
+        The latency budget applies to each item from the moment it starts.
+
+        Identical queries (ignoring case and spacing) run once and share the
+        result; retrieval and external search results are further shared
+        through the RAG single-flight and the tool cache. Each item's
+        conversation thread is removed from the checkpointer when it ends.
+        """
+        logger.info(f"Starting batch of {len(queries)} queries")
+        await updater.update_status(
+            TaskState.working,
+            new_agent_text_message(
+                f'Processing {len(queries)} queries...', task.context_id, task.id
+            ),
+        )
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        checkpointer = getattr(self.agent.graph, 'checkpointer', None)
+
+        async def run(query: str) -> dict:
+            async with semaphore:
+                # Each distinct query gets its own conversation thread, deleted
+                # once answered: batch items are never continued
+                thread_id = f'{task.context_id}-{uuid.uuid4().hex}'
+                try:
+                    return await self._final_response(query, thread_id, deadline_s)
+                finally:
+                    if checkpointer is not None:
+                        await checkpointer.adelete_thread(thread_id)
+
+        shared: dict[str, asyncio.Future] = {}
+        for query in queries:
+            key = ' '.join(query.lower().split())
+            if key not in shared:
+                shared[key] = asyncio.ensure_future(run(query))
+
+        async def item(index: int, query: str) -> dict:
+            try:
+                result = await shared[' '.join(query.lower().split())]
+            except Exception as e:
+                logger.error(f'Batch item {index} failed: {e}')
+                return {'index': index, 'query': query, 'status': 'error', 'message': str(e)}
+            if result.get('is_task_complete'):
+                status = 'completed'
+            elif result.get('require_user_input'):
+                status = 'input_required'
+            else:
+                status = 'error'
+            return {'index': index, 'query': query, 'status': status, 'message': result.get('content', '')}
+
+        counts: dict[str, int] = {}
+        try:
+            for next_item in asyncio.as_completed([item(i, q) for i, q in enumerate(queries)]):
+                data = await next_item
+                counts[data['status']] = counts.get(data['status'], 0) + 1
+                await updater.add_artifact([Part(root=DataPart(data=data))], name=f'item-{data["index"]}')
+        finally:
+            # Stop the remaining items if an artifact could not be emitted
+            for future in shared.values():
+                future.cancel()
+
+        await updater.add_artifact(
+            [Part(root=DataPart(data={'total': len(queries), 'unique': len(shared), **counts}))],
+            name='summary',
+        )
+        await updater.complete()
+
+    def _validate_request(self, context: RequestContext) -> str | None:
+        """Return why the request is invalid, or None if it is valid."""
+        try:
+            request_deadline(context)
+            batch_queries(context)
+        except (TypeError, ValueError) as e:
+            return str(e)
+        return None
 
     async def cancel(
         self, context: RequestContext, event_queue: EventQueue
@@ -12,7 +12,14 @@ from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+from app.deadline import CRITICAL, DEGRADED, EXPIRED, NORMAL, best_available_answer, deadline_phase
+
+
+# Tools that stay available when the deadline nears (no external API round trips)
+LOCAL_TOOLS = {"retrieve_information"}
 
 
 class AgentState(TypedDict):
@@ -21,10 +28,12 @@ class AgentState(TypedDict):
     structured_response: Any  # ResponseFormat | None
 
 
-def build_model_with_tools(model):
-    """Return a model instance bound to the tool belt."""
-    from app.tools import get_tool_belt
-    return model.bind_tools(get_tool_belt())
+def build_model_with_tools(model, tools=None):
+    """Return a model instance bound to `tools` (default: the tool belt)."""
+    if tools is None:
+        from app.tools import get_tool_belt
+        tools = get_tool_belt()
+    return model.bind_tools(tools)
 
 
 def call_model(state: Dict[str, Any], model) -> Dict[str, Any]:
@@ -96,18 +105,60 @@ def helpfulness_decision(state: Dict[str, Any]):
     return "continue"
 
 
-def build_agent_graph_with_helpfulness(model, system_instruction, format_instruction, checkpointer=None):
-    """Build an agent graph with an auxiliary helpfulness evaluation subgraph."""
+def build_agent_graph_with_helpfulness(
+    model, system_instruction, format_instruction, checkpointer=None, tools=None, fallback_model=None
+):
+    """Build an agent graph with an auxiliary helpfulness evaluation subgraph.
+
+    `tools` defaults to `get_tool_belt()`; the same list is bound to the model
+    and executed by the tool node, so callers can substitute their own tools.
+
+    Nodes honour the request deadline in the run config (see `app.deadline`):
+    as it nears they switch to `fallback_model` (if given) and local tools
+    only, skip structured output and helpfulness evaluation, and finally
+    answer with the best result gathered so far.
+    """
     from app.tools import get_tool_belt
     from app.agent import ResponseFormat
-    
+    from app.rag import prefetch_enabled, prefetch_retrieval
+
+    if tools is None:
+        tools = get_tool_belt()
+    model_with_tools = build_model_with_tools(model, tools)
+    # Speculatively start library retrieval for each new user message
+    prefetch = prefetch_enabled() and any(t.name == "retrieve_information" for t in tools)
+
+    # Models used once the deadline nears: local tools only, then no further tool calls
+    degraded_model = fallback_model or model
+    local_tools = [t for t in tools if t.name in LOCAL_TOOLS]
+    models_by_phase = {
+        NORMAL: model_with_tools,
+        DEGRADED: degraded_model.bind_tools(local_tools) if local_tools else degraded_model,
+        CRITICAL: degraded_model.bind_tools(tools, tool_choice="none") if tools else degraded_model,
+    }
+
     # Create model-bound functions
-    def _call_model(state: AgentState) -> Dict[str, Any]:
+    def _call_model(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
         """Wrapper to pass model to call_model."""
-        model_with_tools = build_model_with_tools(model)
         messages = state["messages"]
-        response = model_with_tools.invoke(messages)
-        
+        phase = deadline_phase(config)
+        if phase == EXPIRED:
+            answer = best_available_answer(messages)
+            return {
+                "messages": [AIMessage(content=answer)],
+                "structured_response": ResponseFormat(status="completed", message=answer),
+            }
+        if prefetch and isinstance(messages[-1], HumanMessage):
+            prefetch_retrieval(messages[-1].content)
+        response = models_by_phase[phase].invoke(messages)
+
+        if not getattr(response, "tool_calls", None) and phase != NORMAL:
+            # No time for a separate structured-output call
+            return {
+                "messages": [response],
+                "structured_response": ResponseFormat(status="completed", message=str(response.content)),
+            }
+
         # If there are no tool calls, try to extract structured response
         if not getattr(response, "tool_calls", None):
             try:
@@ -132,16 +183,41 @@ def build_agent_graph_with_helpfulness(model, system_instruction, format_instruc
         else:
             # If there are tool calls, just return the response
             return {"messages": [response]}
-    
-    def _helpfulness_node(state: AgentState) -> Dict[str, Any]:
+
+    tool_node = ToolNode(tools)
+
+    def _action(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+        """Run the requested tools, skipping external ones once the deadline nears."""
+        phase = deadline_phase(config)
+        if phase == NORMAL:
+            return tool_node.invoke(state, config)
+        last = state["messages"][-1]
+        allowed = [c for c in last.tool_calls if phase == DEGRADED and c["name"] in LOCAL_TOOLS]
+        messages = [
+            ToolMessage(
+                content="Skipped to stay within the response time limit.",
+                tool_call_id=c["id"],
+                name=c["name"],
+            )
+            for c in last.tool_calls
+            if c not in allowed
+        ]
+        if allowed:
+            result = tool_node.invoke({"messages": [last.model_copy(update={"tool_calls": allowed})]}, config)
+            messages = result["messages"] + messages
+        return {"messages": messages}
+
+    def _helpfulness_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
         """Wrapper to pass model to helpfulness_node."""
+        if deadline_phase(config) != NORMAL:
+            # No time for another evaluation round: stop with the current answer
+            return {"messages": [AIMessage(content="HELPFULNESS:END")]}
         return helpfulness_node(state, model)
     
     graph = StateGraph(AgentState)
-    tool_node = ToolNode(get_tool_belt())
     
     graph.add_node("agent", _call_model)
-    graph.add_node("action", tool_node)
+    graph.add_node("action", _action)
     graph.add_node("helpfulness", _helpfulness_node)
     graph.set_entry_point("agent")
     
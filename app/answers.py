@@ -0,0 +1,335 @@
+"""Precomputed answers for canonical questions.
+
+The agent card examples and the questions suggested in the Chainlit UI make
+up a large share of traffic. `python -m app.answers build` runs each of them
+through the agent once per corpus version and stores the final answer, its
+status and the PDF citations it contains in
+`<data_dir>/.answer_store/answers.json` (`RAG_ANSWER_STORE`; "off"
+disables). `Agent.stream` answers the first message of a conversation from
+the store when it matches a stored question after normalisation (case,
+punctuation and spacing), without calling a model.
+
+The store records the SHA-256 of every library PDF. A lookup compares the
+PDFs' (mtime, size) stamps with the recorded ones and re-hashes only files
+whose stamps differ; if the library content changed, the store serves
+nothing until it is rebuilt. The library is checked at most once per
+`RAG_ANSWER_CHECK_INTERVAL` seconds (default 5; lookups in between reuse the
+last result). A rebuilt store file is picked up without a restart.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+from app.textstore import file_hash
+from app.watcher import snapshot
+
+
+logger = logging.getLogger(__name__)
+
+# Suggested by the Chainlit UI (app/chainlit_app.py) when a request fails
+CHAINLIT_SUGGESTIONS = [
+    "What causes leaf blast in rice?",
+    "How to manage bacterial leaf blight in irrigated systems?",
+    "Symptoms of false smut in West Africa",
+]
+
+_CITATION = re.compile(r"\[([^\[\]]+?\.pdf)(?:,\s*pp?\.\s*([^\]]+))?\]", re.IGNORECASE)
+
+
+def normalize_question(text: str) -> str:
+    """Lower-case `text`, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def extract_citations(text: str) -> List[Dict[str, str]]:
+    """Return the distinct `[file.pdf, p. N]` citations in `text`, in order."""
+    seen, citations = set(), []
+    for match in _CITATION.finditer(text):
+        citation = (match.group(1).strip(), (match.group(2) or "").strip())
+        if citation not in seen:
+            seen.add(citation)
+            citations.append({"file": citation[0], "pages": citation[1]})
+    return citations
+
+
+def canonical_questions(questions_file: Optional[str] = None) -> List[str]:
+    """Agent card text examples, the Chainlit suggestions and any lines of `questions_file`."""
+    from app.__main__ import build_agent_card
+
+    card = build_agent_card("localhost", 0)
+    questions = [
+        example
+        for skill in card.skills
+        if "text" in (skill.input_modes or ["text"])
+        for example in (skill.examples or [])
+    ]
+    questions += CHAINLIT_SUGGESTIONS
+    if questions_file:
+        with open(questions_file, encoding="utf-8") as f:
+            questions += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    unique: Dict[str, str] = {}
+    for question in questions:
+        unique.setdefault(normalize_question(question), question)
+    return list(unique.values())
+
+
+def library_files(data_dir: str) -> Dict[str, Dict]:
+    """Return {path relative to `data_dir`: {sha256, mtime_ns, size}} for the library PDFs."""
+    return {
+        os.path.relpath(path, data_dir): {"sha256": file_hash(path), "mtime_ns": mtime_ns, "size": size}
+        for path, (mtime_ns, size) in snapshot(data_dir).items()
+    }
+
+
+def corpus_version(files: Dict[str, Dict]) -> str:
+    """Digest of the library content: relative paths and their SHA-256."""
+    payload = json.dumps(sorted((name, meta["sha256"]) for name, meta in files.items()))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StoredAnswer:
+    question: str
+    status: str  # "completed" or "input_required", as in ResponseFormat
+    message: str
+    citations: List[Dict[str, str]] = field(default_factory=list)
+
+
+def _check_interval() -> float:
+    """Seconds between library checks on lookup (`RAG_ANSWER_CHECK_INTERVAL`, default 5)."""
+    return float(os.environ.get("RAG_ANSWER_CHECK_INTERVAL", "5"))
+
+
+class AnswerStore:
+    """Read side of the answer store file; thread-safe and reloaded when the file changes."""
+
+    def __init__(self, path: str, data_dir: str, check_interval: Optional[float] = None):
+        self.path = path
+        self.data_dir = data_dir
+        self.check_interval = check_interval if check_interval is not None else _check_interval()
+        self._lock = threading.Lock()
+        self._file_stamp: Optional[Tuple[int, int]] = None
+        self._answers: Dict[str, StoredAnswer] = {}
+        self._files: Dict[str, Dict] = {}
+        # Library stamps last found to match (or not match) the stored digests
+        self._valid_stamps: Optional[dict] = None
+        self._stale_stamps: Optional[dict] = None
+        # Monotonic time and result of the last library check
+        self._checked_at: Optional[float] = None
+        self._unchanged = False
+        self.lookups = 0
+        self.hits = 0
+
+    def _reload(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._file_stamp, self._answers, self._files = None, {}, {}
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._file_stamp:
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self._file_stamp = stamp
+        self._files = data.get("files", {})
+        self._answers = {key: StoredAnswer(**value) for key, value in data.get("answers", {}).items()}
+        self._valid_stamps = self._stale_stamps = self._checked_at = None
+
+    def _matches_stored(self, stamps: dict) -> bool:
+        current = {os.path.relpath(path, self.data_dir): (path, stamp) for path, stamp in stamps.items()}
+        if set(current) != set(self._files):
+            return False
+        for name, meta in self._files.items():
+            path, stamp = current[name]
+            # Only files whose stamps moved are re-hashed
+            if stamp != (meta["mtime_ns"], meta["size"]) and file_hash(path) != meta["sha256"]:
+                return False
+        return True
+
+    def _library_unchanged(self) -> bool:
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._unchanged
+        self._checked_at = now
+        self._unchanged = self._check_library()
+        return self._unchanged
+
+    def _check_library(self) -> bool:
+        stamps = snapshot(self.data_dir)
+        if stamps == self._valid_stamps:
+            return True
+        if stamps == self._stale_stamps:
+            return False
+        unchanged = self._matches_stored(stamps)
+        if unchanged:
+            self._valid_stamps = stamps
+        else:
+            self._stale_stamps = stamps
+            logger.warning(
+                "PDF library changed since the answer store was built; rebuild it with "
+                "`python -m app.answers build`"
+            )
+        return unchanged
+
+    def lookup(self, question: str) -> Optional[StoredAnswer]:
+        """Return the stored answer for `question` if it is current for the library."""
+        key = normalize_question(question)
+        with self._lock:
+            self.lookups += 1
+            self._reload()
+            answer = self._answers.get(key)
+            if answer is None or not self._library_unchanged():
+                return None
+            self.hits += 1
+        return answer
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._reload()
+            return len(self._answers)
+
+    def invalidate(self) -> None:
+        """Re-read the store file and re-check the library on the next lookup."""
+        with self._lock:
+            self._file_stamp = None
+            self._valid_stamps = self._stale_stamps = self._checked_at = None
+
+
+def _store_path(data_dir: str) -> Optional[str]:
+    """Answer store file from `RAG_ANSWER_STORE` (default `<data_dir>/.answer_store/answers.json`; "off" disables)."""
+    path = os.environ.get("RAG_ANSWER_STORE", os.path.join(data_dir, ".answer_store", "answers.json"))
+    return None if path.lower() in ("", "0", "off", "none") else path
+
+
+def default_answer_store() -> Optional[AnswerStore]:
+    """Return the store for RAG_DATA_DIR from the environment, or None if disabled."""
+    data_dir = os.environ.get("RAG_DATA_DIR", "data")
+    path = _store_path(data_dir)
+    return AnswerStore(path, data_dir) if path else None
+
+
+@dataclass
+class BuildStats:
+    questions: int = 0
+    answered: int = 0
+    reused: int = 0
+    failed: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+async def build_answers(
+    agent,
+    questions: List[str],
+    data_dir: str,
+    path: str,
+    force: bool = False,
+    concurrency: int = 4,
+) -> BuildStats:
+    """Answer `questions` with `agent` and write the store for the current library.
+
+    Answers already stored for the same corpus version are kept unless
+    `force`; errors and empty answers are reported and not stored.
+    """
+    start = time.perf_counter()
+    files = library_files(data_dir)
+    version = corpus_version(files)
+    answers: Dict[str, Dict] = {}
+    if not force and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("version") == version:
+            answers = previous.get("answers", {})
+
+    stats = BuildStats(questions=len(questions))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(question: str) -> None:
+        key = normalize_question(question)
+        if key in answers:
+            stats.reused += 1
+            return
+        async with semaphore:
+            result: dict = {}
+            # A fresh thread per question, without the per-request latency budget
+            async for item in agent.stream(question, f"answer-store-{uuid.uuid4().hex}", deadline_s=0):
+                result = item
+        if result.get("is_task_complete") and result.get("content"):
+            status = "completed"
+        elif result.get("require_user_input") and result.get("content"):
+            status = "input_required"
+        else:
+            stats.failed.append(question)
+            return
+        message = result["content"]
+        answers[key] = asdict(StoredAnswer(question, status, message, extract_citations(message)))
+        stats.answered += 1
+
+    await asyncio.gather(*(answer(q) for q in questions))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "built": time.time(), "files": files, "answers": answers}, f, indent=2)
+    os.replace(tmp, path)
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+@click.group()
+def cli():
+    """Precomputed answer store commands."""
+
+
+@cli.command("build")
+@click.option("--data-dir", default=lambda: os.environ.get("RAG_DATA_DIR", "data"), show_default="RAG_DATA_DIR or data")
+@click.option("--questions-file", type=click.Path(exists=True, dir_okay=False), help="Extra questions, one per line.")
+@click.option("--force", is_flag=True, help="Re-answer questions already stored for this library version.")
+@click.option("--concurrency", default=4, show_default=True)
+def build_command(data_dir, questions_file, force, concurrency):
+    """Answer the canonical questions with the agent and store the answers."""
+    from app.agent import Agent
+
+    path = _store_path(data_dir)
+    if path is None:
+        raise click.ClickException("RAG_ANSWER_STORE is off")
+    questions = canonical_questions(questions_file)
+    stats = asyncio.run(
+        build_answers(Agent(answers=False), questions, data_dir, path, force=force, concurrency=concurrency)
+    )
+    print(f"Store: {path}")
+    print(f"Questions: {stats.questions}  answered: {stats.answered}  reused: {stats.reused}  "
+          f"failed: {len(stats.failed)}  ({stats.seconds:.1f}s)")
+    for question in stats.failed:
+        print(f"  failed: {question}")
+
+
+@cli.command("status")
+@click.option("--data-dir", default=lambda: os.environ.get("RAG_DATA_DIR", "data"), show_default="RAG_DATA_DIR or data")
+def status_command(data_dir):
+    """Show the stored questions and whether the store matches the library."""
+    path = _store_path(data_dir)
+    if path is None or not os.path.exists(path):
+        raise click.ClickException(f"No answer store at {path}")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    current = corpus_version(library_files(data_dir)) == data.get("version")
+    print(f"Store: {path}  ({'current' if current else 'STALE: the PDF library changed'})")
+    for answer in data.get("answers", {}).values():
+        print(f"  [{answer['status']}] {answer['question']}  ({len(answer['citations'])} citations)")
+
+
+if __name__ == "__main__":
+    cli()
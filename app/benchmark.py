@@ -0,0 +1,270 @@
+"""Offline end-to-end benchmark for the agent graph and the A2A application.
+
+Runs `Agent.stream` directly and/or the full in-process A2A Starlette app
+against the deterministic stand-ins in `app.fakes` (chat models, embeddings,
+Tavily/PubMed/arXiv tools) with configurable injected latency, so it needs no
+network or API keys and can run in CI:
+
+    python -m app.benchmark --requests 40 --concurrency 4 --llm-latency 0.02
+
+Reports per-stage time (graph nodes and tools), LLM calls per request,
+throughput and p50/p95/p99 request latency. With injected latencies set to
+zero the numbers measure pure graph/framework overhead.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from unittest import mock
+from uuid import uuid4
+
+import click
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from app.stats import percentiles
+
+
+DEFAULT_QUERIES = [
+    "What causes false smut and how is it managed?",
+    "My rice plants have brown spots on leaves, what disease is this?",
+    "What IPM strategy should I use for rice blast disease?",
+    "Outline diagnostic symptoms and IPM for rice black streaked dwarf in Africa.",
+    "Find recent research on rice disease resistance breeding",
+]
+
+
+class _StageTimer(BaseCallbackHandler):
+    """Per-request callback collecting graph node/tool timings and LLM call counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._starts: Dict[Any, tuple] = {}
+        self.stages: Dict[str, float] = {}
+        self.llm_calls = 0
+
+    def _start(self, run_id, stage: str) -> None:
+        with self._lock:
+            self._starts[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id) -> None:
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+            if started:
+                stage, t0 = started
+                self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - t0
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        name = kwargs.get("name")
+        # Graph nodes run as chains named after the node (agent, action, retrieve, ...)
+        if name and (metadata or {}).get("langgraph_node") == name:
+            self._start(run_id, f"node:{name}")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, f"tool:{(serialized or {}).get('name') or kwargs.get('name')}")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self.llm_calls += 1
+        self._start(run_id, "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+
+# Every LangChain run started while this is set reports to the request's timer.
+_stage_timer_var: ContextVar[Optional[_StageTimer]] = ContextVar(
+    "benchmark_stage_timer", default=None
+)
+register_configure_hook(_stage_timer_var, inheritable=True)
+
+
+@dataclass
+class _RequestResult:
+    latency: float
+    llm_calls: int
+    stages: Dict[str, float]
+    ok: bool = True
+
+
+@dataclass
+class BenchmarkReport:
+    """Aggregated results of one benchmark mode."""
+
+    mode: str
+    wall_time: float
+    results: List[_RequestResult] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(r.latency for r in self.results)
+        stage_names = sorted({s for r in self.results for s in r.stages})
+        n = len(self.results) or 1
+        return {
+            "mode": self.mode,
+            "requests": len(self.results),
+            "errors": sum(not r.ok for r in self.results),
+            "wall_time_s": self.wall_time,
+            "throughput_rps": len(self.results) / self.wall_time if self.wall_time else 0.0,
+            "latency_s": {"mean": sum(latencies) / n, **percentiles(latencies)},
+            "llm_calls_per_request": sum(r.llm_calls for r in self.results) / n,
+            "stage_time_per_request_s": {
+                s: sum(r.stages.get(s, 0.0) for r in self.results) / n for s in stage_names
+            },
+        }
+
+
+async def _timed(coro_fn) -> _RequestResult:
+    """Run one request with its own stage timer bound to the current context."""
+    timer = _StageTimer()
+    token = _stage_timer_var.set(timer)
+    start = time.perf_counter()
+    ok = True
+    try:
+        ok = await coro_fn()
+    except Exception:
+        ok = False
+    finally:
+        _stage_timer_var.reset(token)
+    return _RequestResult(time.perf_counter() - start, timer.llm_calls, dict(timer.stages), ok)
+
+
+async def _run_load(make_request, queries: List[str], requests: int, concurrency: int, mode: str) -> BenchmarkReport:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> _RequestResult:
+        async with semaphore:
+            return await _timed(lambda: make_request(queries[i % len(queries)]))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(requests)))
+    return BenchmarkReport(mode, time.perf_counter() - start, list(results))
+
+
+async def bench_agent(agent, queries: List[str], requests: int, concurrency: int) -> BenchmarkReport:
+    """Benchmark `Agent.stream` directly, one fresh context per request."""
+
+    async def make_request(query: str) -> bool:
+        final = None
+        async for item in agent.stream(query, uuid4().hex):
+            final = item
+        return bool(final and final["is_task_complete"])
+
+    return await _run_load(make_request, queries, requests, concurrency, "agent")
+
+
+async def bench_a2a(agent, queries: List[str], requests: int, concurrency: int) -> BenchmarkReport:
+    """Benchmark the full A2A app in-process through `A2AClient` `message/send`."""
+    import httpx
+    from a2a.client import A2AClient
+    from a2a.server.tasks import InMemoryPushNotificationConfigStore
+    from a2a.types import MessageSendParams, SendMessageRequest
+
+    from app.__main__ import build_agent_card, build_server
+    from app.agent_executor import GeneralAgentExecutor
+    from app.push import QueuedPushNotificationSender
+
+    agent_card = build_agent_card("localhost", 10000)
+    push_config_store = InMemoryPushNotificationConfigStore()
+    # Created here so that its HTTP client is closed with the run
+    push_sender = QueuedPushNotificationSender(httpx_client=None, config_store=push_config_store)
+    asgi_app = build_server(
+        agent_card, GeneralAgentExecutor(agent), push_config_store=push_config_store, push_sender=push_sender
+    ).build()
+    transport = httpx.ASGITransport(app=asgi_app)
+    try:
+        async with httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(300.0)) as httpx_client:
+            client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
+
+            async def make_request(query: str) -> bool:
+                request = SendMessageRequest(
+                    id=str(uuid4()),
+                    params=MessageSendParams(
+                        message={
+                            "role": "user",
+                            "parts": [{"kind": "text", "text": query}],
+                            "message_id": uuid4().hex,
+                        }
+                    ),
+                )
+                response = await client.send_message(request)
+                result = getattr(response.root, "result", None)
+                return result is not None and getattr(result, "status", None) is not None and result.status.state == "completed"
+
+            return await _run_load(make_request, queries, requests, concurrency, "a2a")
+    finally:
+        await push_sender.aclose()
+
+
+def _print_summary(summary: Dict[str, Any]) -> None:
+    lat = summary["latency_s"]
+    print(f"\n== {summary['mode']} ==")
+    print(f"requests: {summary['requests']}  errors: {summary['errors']}  "
+          f"wall: {summary['wall_time_s']:.3f}s  throughput: {summary['throughput_rps']:.2f} req/s")
+    print(f"latency (s): mean {lat['mean']:.4f}  p50 {lat['p50']:.4f}  "
+          f"p95 {lat['p95']:.4f}  p99 {lat['p99']:.4f}")
+    print(f"LLM calls per request: {summary['llm_calls_per_request']:.2f}")
+    print("time per request by stage (s):")
+    for stage, seconds in summary["stage_time_per_request_s"].items():
+        print(f"  {stage:<32} {seconds:.4f}")
+
+
+@click.command()
+@click.option("--mode", type=click.Choice(["agent", "a2a", "all"]), default="all")
+@click.option("--requests", "requests", default=20, show_default=True)
+@click.option("--concurrency", default=1, show_default=True)
+@click.option("--data-dir", default="data", show_default=True, help="PDF folder indexed with fake embeddings.")
+@click.option("--llm-latency", default=0.0, show_default=True, help="Seconds injected per chat-model call.")
+@click.option("--embed-latency", default=0.0, show_default=True, help="Seconds injected per embeddings call.")
+@click.option("--tool-latency", default=0.0, show_default=True, help="Seconds injected per web/paper search.")
+@click.option("--json-output", type=click.Path(dir_okay=False), default=None, help="Also write results as JSON.")
+def main(mode, requests, concurrency, data_dir, llm_latency, embed_latency, tool_latency, json_output):
+    """Benchmark the agent offline with fake models, embeddings and tools."""
+    import app.rag as rag
+
+    # Per-request INFO logs from the executor would dominate the output and timings
+    logging.getLogger().setLevel(logging.WARNING)
+    t0 = time.perf_counter()
+    from app.fakes import build_offline_agent
+
+    agent, rag_graph = build_offline_agent(data_dir, llm_latency, embed_latency, tool_latency)
+    print(f"offline index + agent build: {time.perf_counter() - t0:.3f}s")
+
+    summaries = []
+    with mock.patch.object(rag, "_get_rag_graph", lambda: rag_graph):
+        if mode in ("agent", "all"):
+            report = asyncio.run(bench_agent(agent, DEFAULT_QUERIES, requests, concurrency))
+            summaries.append(report.summary())
+        if mode in ("a2a", "all"):
+            report = asyncio.run(bench_a2a(agent, DEFAULT_QUERIES, requests, concurrency))
+            summaries.append(report.summary())
+
+    for summary in summaries:
+        _print_summary(summary)
+    if json_output:
+        with open(json_output, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
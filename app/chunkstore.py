@@ -0,0 +1,154 @@
+"""Compact storage of library chunks, decoupled from LangChain `Document`s.
+
+A `Document` per chunk costs a Python object, a `str` and a metadata dict
+repeating the source path, the PDF's metadata and the tag lists. The vector
+index used to keep a second copy of the text and metadata as its payload.
+`ChunkStore` keeps instead:
+- chunk ids 0..n-1 in insertion order, which the vector index uses as point
+  ids (rows);
+- every chunk text in one UTF-8 buffer, with an end offset per chunk;
+- file-level metadata (source, file hash, PDF metadata) interned once per
+  file, and tag combinations (see `app.metadata`) interned once per
+  distinct combination;
+- page numbers and start offsets in integer arrays;
+- `duplicates` citations only for the chunks that have them.
+
+`documents(ids)` materializes `Document`s, with the same content and
+metadata as the chunks that were added, only for the ids a search returns.
+`filter_ids` resolves a metadata filter ({field: [allowed values]}) to the
+matching chunk ids by evaluating it once per interned entry.
+"""
+from __future__ import annotations
+
+import json
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.metadata import FILTER_FIELDS, matches
+
+
+# Per-chunk metadata kept in arrays or sparse maps rather than interned dicts
+_CHUNK_KEYS = ("page", "start_index", "duplicates")
+
+# Stored for a missing page or start_index
+_MISSING = -1
+
+
+def _intern_key(value: dict) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class ChunkStore:
+    """Append-only chunk texts and metadata addressed by integer chunk id."""
+
+    def __init__(self):
+        self._text = bytearray()
+        self._ends = array("q")
+        self._pages = array("i")
+        self._starts = array("q")
+        self._file = array("I")
+        self._tags = array("I")
+        self._files: List[dict] = []
+        self._tagsets: List[dict] = []
+        self._file_ids: Dict[str, int] = {}
+        self._tagset_ids: Dict[str, int] = {}
+        self._duplicates: Dict[int, List[dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    @staticmethod
+    def _intern(values: List[dict], ids: Dict[str, int], value: dict) -> int:
+        key = _intern_key(value)
+        if key not in ids:
+            ids[key] = len(values)
+            values.append(value)
+        return ids[key]
+
+    def add(self, chunk: Document) -> int:
+        """Store `chunk` and return its id."""
+        chunk_id = len(self)
+        metadata = chunk.metadata or {}
+        tags = {key: metadata[key] for key in FILTER_FIELDS if key in metadata}
+        file_meta = {
+            key: value for key, value in metadata.items() if key not in tags and key not in _CHUNK_KEYS
+        }
+        self._text += chunk.page_content.encode("utf-8", "surrogatepass")
+        self._ends.append(len(self._text))
+        page, start = metadata.get("page"), metadata.get("start_index")
+        self._pages.append(_MISSING if page is None else int(page))
+        self._starts.append(_MISSING if start is None else int(start))
+        self._file.append(self._intern(self._files, self._file_ids, file_meta))
+        self._tags.append(self._intern(self._tagsets, self._tagset_ids, tags))
+        if metadata.get("duplicates"):
+            self._duplicates[chunk_id] = [dict(d) for d in metadata["duplicates"]]
+        return chunk_id
+
+    def extend(self, chunks: Iterable[Document]) -> None:
+        for chunk in chunks:
+            self.add(chunk)
+
+    def set_duplicates(self, chunk_id: int, duplicates: List[dict]) -> None:
+        """Replace the `duplicates` citations of a stored chunk."""
+        self._duplicates[chunk_id] = [dict(d) for d in duplicates]
+
+    def text(self, chunk_id: int) -> str:
+        start = self._ends[chunk_id - 1] if chunk_id else 0
+        return self._text[start:self._ends[chunk_id]].decode("utf-8", "surrogatepass")
+
+    def metadata(self, chunk_id: int) -> dict:
+        metadata = dict(self._files[self._file[chunk_id]])
+        if self._pages[chunk_id] != _MISSING:
+            metadata["page"] = self._pages[chunk_id]
+        if self._starts[chunk_id] != _MISSING:
+            metadata["start_index"] = self._starts[chunk_id]
+        # Tag lists are copied so callers cannot alter the interned ones
+        metadata.update({
+            key: list(value) if isinstance(value, list) else value
+            for key, value in self._tagsets[self._tags[chunk_id]].items()
+        })
+        if chunk_id in self._duplicates:
+            metadata["duplicates"] = [dict(d) for d in self._duplicates[chunk_id]]
+        return metadata
+
+    def document(self, chunk_id: int) -> Document:
+        return Document(page_content=self.text(chunk_id), metadata=self.metadata(chunk_id))
+
+    def documents(self, ids: Optional[Sequence[int]] = None) -> List[Document]:
+        """Materialize the chunks `ids` (all chunks when None), in the given order."""
+        return [self.document(int(i)) for i in (range(len(self)) if ids is None else ids)]
+
+    def filter_ids(self, filters: Dict[str, List]) -> np.ndarray:
+        """Return the sorted ids of chunks whose metadata matches `filters` (see `app.metadata.matches`)."""
+        mask = np.ones(len(self), dtype=bool)
+        tag_filters = {k: v for k, v in filters.items() if k in FILTER_FIELDS}
+        file_filters = {k: v for k, v in filters.items() if k not in FILTER_FIELDS and k not in _CHUNK_KEYS}
+        for key, values in (("page", self._pages), ("start_index", self._starts)):
+            if key in filters:
+                wanted = filters[key] if isinstance(filters[key], (list, tuple, set)) else [filters[key]]
+                mask &= np.isin(np.frombuffer(values, dtype=values.typecode), [int(v) for v in wanted])
+        if tag_filters:
+            allowed = [i for i, tags in enumerate(self._tagsets) if matches(tags, tag_filters)]
+            mask &= np.isin(np.frombuffer(self._tags, dtype=np.uint32), allowed)
+        if file_filters:
+            allowed = [i for i, meta in enumerate(self._files) if matches(meta, file_filters)]
+            mask &= np.isin(np.frombuffer(self._file, dtype=np.uint32), allowed)
+        return np.flatnonzero(mask)
+
+    def page_count(self) -> int:
+        """Number of distinct (file, page) pairs among the chunks."""
+        if not len(self):
+            return 0
+        files = np.frombuffer(self._file, dtype=np.uint32).astype(np.int64)
+        pages = np.frombuffer(self._pages, dtype=np.int32).astype(np.int64)
+        return len(np.unique((files << 32) | (pages & 0xFFFFFFFF)))
+
+    def nbytes(self) -> int:
+        """Approximate bytes held: text buffer, per-chunk arrays and interned entries."""
+        arrays = (self._ends, self._pages, self._starts, self._file, self._tags)
+        interned = sum(len(key) for key in self._file_ids) + sum(len(key) for key in self._tagset_ids)
+        duplicates = sum(len(_intern_key(d)) for entries in self._duplicates.values() for d in entries)
+        return len(self._text) + sum(a.itemsize * len(a) for a in arrays) + interned + duplicates
@@ -0,0 +1,123 @@
+"""Token-budgeted CONTEXT builder for RAG generation.
+
+`pack_context` turns retrieved chunks (best first) into the CONTEXT block of
+the generation prompt while keeping its size bounded:
+- chunks from the same file on the same or adjacent pages are merged into one
+  passage, in page order, so continuous text is not repeated or interleaved;
+- passages are ordered by the best relevance rank among their chunks;
+- passages are added until the token budget is reached, and the passage that
+  does not fit is cut at a word boundary; `[file.pdf, p. N]` headers are never
+  truncated.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+
+# A truncated passage shorter than this is dropped instead of being included
+MIN_TRUNCATED_TOKENS = 40
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    import tiktoken
+
+    return tiktoken.encoding_for_model("gpt-4o")
+
+
+def citation_headers(meta: dict) -> List[str]:
+    """Return `[file.pdf, p. N]` for a chunk, plus one per merged duplicate."""
+    headers: List[str] = []
+    for entry in [meta] + list(meta.get("duplicates") or []):
+        src = os.path.basename(entry.get("source") or "") or "unknown.pdf"
+        page = entry.get("page")
+        header = f"[{src}, p. {page}]" if page is not None else f"[{src}]"
+        if header not in headers:
+            headers.append(header)
+    return headers
+
+
+@dataclass
+class _Passage:
+    rank: int
+    source: Optional[str]
+    last_page: Optional[int]
+    docs: List[Document] = field(default_factory=list)
+
+    def render(self) -> tuple[str, str]:
+        headers: List[str] = []
+        for doc in self.docs:
+            for header in citation_headers(doc.metadata or {}):
+                if header not in headers:
+                    headers.append(header)
+        return " ".join(headers), "\n".join(d.page_content for d in self.docs)
+
+
+def _merge_adjacent(docs: List[Document]) -> List[_Passage]:
+    """Group chunks of the same file on the same/adjacent pages, ordered by best rank."""
+    ranked = list(enumerate(docs))
+
+    def position(item):
+        meta = item[1].metadata or {}
+        return (str(meta.get("source")), meta.get("page", -1), meta.get("start_index", 0))
+
+    passages: List[_Passage] = []
+    paged = sorted((r for r in ranked if (r[1].metadata or {}).get("page") is not None), key=position)
+    for rank, doc in paged:
+        meta = doc.metadata
+        last = passages[-1] if passages else None
+        if (
+            last is not None
+            and last.source == meta.get("source")
+            and last.last_page is not None
+            and meta["page"] - last.last_page <= 1
+        ):
+            last.docs.append(doc)
+            last.rank = min(last.rank, rank)
+            last.last_page = meta["page"]
+        else:
+            passages.append(_Passage(rank, meta.get("source"), meta["page"], [doc]))
+    for rank, doc in ranked:
+        if (doc.metadata or {}).get("page") is None:
+            passages.append(_Passage(rank, (doc.metadata or {}).get("source"), None, [doc]))
+    return sorted(passages, key=lambda p: p.rank)
+
+
+def pack_context(docs: List[Document], token_budget: int = 0, encoding=None) -> str:
+    """Format retrieved chunks as a CONTEXT block of at most `token_budget` tokens.
+
+    A budget of 0 or less disables the limit (adjacent chunks are still merged).
+    Tokens are counted with `encoding` (anything with tiktoken's `encode` and
+    `decode`), by default the gpt-4o tokenizer, loaded only when a budget is set.
+    """
+    parts: List[str] = []
+    remaining = token_budget if token_budget > 0 else None
+    if remaining is not None and encoding is None:
+        encoding = _encoding()
+    for passage in _merge_adjacent(docs):
+        header, body = passage.render()
+        if remaining is None:
+            parts.append(f"{header}\n{body}")
+            continue
+
+        # Header plus the blank-line separator are always kept whole
+        header_tokens = len(encoding.encode(f"{header}\n\n\n"))
+        body_tokens = encoding.encode(body)
+        if header_tokens + len(body_tokens) <= remaining:
+            parts.append(f"{header}\n{body}")
+            remaining -= header_tokens + len(body_tokens)
+            continue
+
+        room = remaining - header_tokens
+        if room >= MIN_TRUNCATED_TOKENS:
+            truncated = encoding.decode(body_tokens[:room])
+            cut = truncated.rfind(" ")
+            truncated = truncated[:cut] if cut > len(truncated) // 2 else truncated
+            parts.append(f"{header}\n{truncated.rstrip()} …")
+        break
+    return "\n\n".join(parts)
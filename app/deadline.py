@@ -0,0 +1,80 @@
+"""Per-request latency budget for the agent graph.
+
+`Agent.stream` puts the request's absolute deadline (epoch seconds) and its
+budget into the run config; graph nodes call `deadline_phase` and degrade
+as the deadline nears:
+- NORMAL: all tools, the main model, structured output and helpfulness check;
+- DEGRADED (less than half the budget left): local RAG only, the cheaper
+  fallback model if configured, no structured-output or helpfulness call;
+- CRITICAL (less than a fifth left): answer now from what has been gathered,
+  without further tool calls;
+- EXPIRED: no more model calls; `best_available_answer` is returned.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+NORMAL = "normal"
+DEGRADED = "degraded"
+CRITICAL = "critical"
+EXPIRED = "expired"
+
+# Fraction of the budget left at which each phase starts
+DEGRADE_AT = 0.5
+CRITICAL_AT = 0.2
+
+# Characters of each tool result included in a partial answer
+_EVIDENCE_CHARS = 1500
+
+
+def deadline_phase(config: Optional[dict], now: Optional[float] = None) -> str:
+    """Return the phase of the request whose config carries `deadline` and `latency_budget`."""
+    configurable = (config or {}).get("configurable") or {}
+    deadline, budget = configurable.get("deadline"), configurable.get("latency_budget")
+    if not deadline or not budget:
+        return NORMAL
+    left = deadline - (time.time() if now is None else now)
+    if left <= 0:
+        return EXPIRED
+    if left < budget * CRITICAL_AT:
+        return CRITICAL
+    if left < budget * DEGRADE_AT:
+        return DEGRADED
+    return NORMAL
+
+
+def _current_turn(messages: List[Any]) -> List[Any]:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i + 1:]
+    return list(messages)
+
+
+def best_available_answer(messages: List[Any]) -> str:
+    """Return the best answer to the latest user message that the turn produced so far."""
+    turn = _current_turn(messages)
+    for message in reversed(turn):
+        content = message.content if isinstance(message.content, str) else ""
+        if (
+            isinstance(message, AIMessage)
+            and not message.tool_calls
+            and content
+            and not content.startswith("HELPFULNESS:")
+        ):
+            return content
+    evidence = [
+        m.content[:_EVIDENCE_CHARS] for m in turn if isinstance(m, ToolMessage) and isinstance(m.content, str)
+    ]
+    if evidence:
+        return (
+            "I ran out of time before finishing the analysis. "
+            "Relevant evidence found so far:\n\n" + "\n\n".join(evidence)
+        )
+    return (
+        "I could not complete this request within the time limit. "
+        "Please try again or ask a narrower question."
+    )
@@ -0,0 +1,119 @@
+"""Near-duplicate chunk detection with MinHash signatures and LSH banding.
+
+The IRRI chapter PDFs repeat boilerplate (running headers, reference lists,
+disease descriptions reused across sections). `deduplicate_chunks` keeps the
+first occurrence of each group of near-identical chunks and records where the
+dropped copies came from in the canonical chunk's `duplicates` metadata, so
+citations can still point at every source/page.
+
+Similarity is the Jaccard similarity of word 5-gram shingles, estimated from
+MinHash signatures; LSH banding limits comparisons to likely candidates.
+"""
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift hash family: h(x) = ((a * x + b) mod 2^64) >> 32, with odd a
+_A = _rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+
+
+def _shingles(text: str) -> np.ndarray:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.unique(np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Return the NUM_PERM-value MinHash signature of `text`'s word shingles."""
+    shingles = _shingles(text)
+    with np.errstate(over="ignore"):
+        hashed = (shingles[:, None] * _A + _B) >> np.uint64(32)
+    return hashed.min(axis=0)
+
+
+def _citation(meta: dict) -> Dict[str, object]:
+    return {"source": meta.get("source"), "page": meta.get("page")}
+
+
+class Deduplicator:
+    """Streaming form of `deduplicate_chunks`: feed chunks in order with `add`.
+
+    Memory grows with the signatures and metadata of kept chunks, not with
+    their texts. A canonical chunk can gain `duplicates` after it was
+    returned; `updated` maps the kept index of every chunk that did to its
+    (shared, already updated) metadata dict.
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self.kept = 0
+        self.updated: Dict[int, dict] = {}
+        self._metadata: List[dict] = []
+        self._signatures: List[np.ndarray] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+    def add(self, chunk: Document) -> Optional[Document]:
+        """Return a copy of `chunk` to keep, or None if it duplicates a kept chunk."""
+        if self.threshold <= 0:
+            self.kept += 1
+            return chunk
+        signature = minhash_signature(chunk.page_content)
+        keys = [
+            (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            for band in range(BANDS)
+        ]
+        candidates = {i for key in keys for i in self._buckets.get(key, ())}
+        best, best_similarity = None, 0.0
+        for i in candidates:
+            similarity = float(np.mean(self._signatures[i] == signature))
+            if similarity > best_similarity:
+                best, best_similarity = i, similarity
+
+        if best is not None and best_similarity >= self.threshold:
+            canonical = self._metadata[best]
+            canonical.setdefault("duplicates", []).append(_citation(chunk.metadata))
+            self.updated[best] = canonical
+            return None
+
+        index = self.kept
+        self.kept += 1
+        kept = Document(page_content=chunk.page_content, metadata=dict(chunk.metadata))
+        self._signatures.append(signature)
+        self._metadata.append(kept.metadata)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(index)
+        return kept
+
+    def stage(self, chunk_lists: Iterable[List[Document]]) -> Iterator[List[Document]]:
+        """Pipeline stage: yield the kept chunks of each incoming list."""
+        for chunks in chunk_lists:
+            yield [kept for kept in map(self.add, chunks) if kept is not None]
+
+
+def deduplicate_chunks(chunks: List[Document], threshold: float = 0.85) -> List[Document]:
+    """Drop chunks whose estimated Jaccard similarity to a kept chunk is >= `threshold`.
+
+    Order is preserved and the first chunk of each near-duplicate group is the
+    canonical one. Its metadata gains `duplicates`, a list of
+    `{"source", "page"}` entries for every dropped copy.
+    """
+    deduplicator = Deduplicator(threshold)
+    return [kept for kept in map(deduplicator.add, chunks) if kept is not None]
@@ -0,0 +1,131 @@
+"""Micro-batched, cached query embeddings.
+
+Every retrieval embeds its question with its own single-text request. Under
+concurrent load `BatchingEmbeddings` wraps the embedding model so that:
+- query texts arriving within a short window (`RAG_EMBED_BATCH_WINDOW_MS`,
+  default 5 ms) are sent as one `embed_documents` request and the vectors
+  are handed back to each waiting caller;
+- recently embedded queries are answered from an LRU cache
+  (`RAG_QUERY_CACHE_SIZE` entries, default 1024; 0 disables).
+
+The first caller of a window waits for the window, then sends the batch on
+behalf of everyone queued behind it; the next caller to arrive opens a new
+window, and no background thread is involved. Callers get their own copy of
+each vector. Document embedding is passed through unchanged.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+
+# Upper bound on texts per batched request
+MAX_BATCH_SIZE = 256
+
+
+class BatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that micro-batches and caches `embed_query` calls."""
+
+    def __init__(self, embeddings: Embeddings, window: float | None = None, cache_size: int | None = None):
+        self.embeddings = embeddings
+        self.window = (
+            window if window is not None
+            else float(os.environ.get("RAG_EMBED_BATCH_WINDOW_MS", "5")) / 1000.0
+        )
+        self.cache_size = (
+            cache_size if cache_size is not None
+            else int(os.environ.get("RAG_QUERY_CACHE_SIZE", "1024"))
+        )
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, List[float]] = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._collecting = False
+        self.queries = 0
+        self.cache_hits = 0
+        self.requests = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            self.queries += 1
+            if text in self._cache:
+                self._cache.move_to_end(text)
+                self.cache_hits += 1
+                return list(self._cache[text])
+            future = self._pending.get(text)
+            leader = False
+            if future is None:
+                future = self._pending[text] = Future()
+                leader = not self._collecting
+                self._collecting = True
+        if leader:
+            self._flush_after_window()
+        return list(future.result())
+
+    def _flush_after_window(self) -> None:
+        """Send what queued during the window; later arrivals start their own window."""
+        if self.window > 0:
+            time.sleep(self.window)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._collecting = False
+        texts = list(pending)
+        for start in range(0, len(texts), MAX_BATCH_SIZE):
+            batch = texts[start:start + MAX_BATCH_SIZE]
+            with self._lock:
+                self.requests += 1
+            try:
+                vectors = self.embeddings.embed_documents(batch)
+            except BaseException as e:
+                for text in batch:
+                    pending[text].set_exception(e)
+                continue
+            with self._lock:
+                for text, vector in zip(batch, vectors):
+                    self._remember(text, vector)
+            for text, vector in zip(batch, vectors):
+                pending[text].set_result(vector)
+
+    def _remember(self, text: str, vector: List[float]) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[text] = vector
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def warm(self, texts: List[str]) -> int:
+        """Embed the texts not cached yet in batched requests and cache them; return how many."""
+        with self._lock:
+            missing = list(dict.fromkeys(text for text in texts if text not in self._cache))
+        for start in range(0, len(missing), MAX_BATCH_SIZE):
+            batch = missing[start:start + MAX_BATCH_SIZE]
+            vectors = self.embeddings.embed_documents(batch)
+            with self._lock:
+                self.requests += 1
+                for text, vector in zip(batch, vectors):
+                    self._remember(text, vector)
+        return len(missing)
+
+    def clear(self) -> None:
+        """Drop the cached query vectors (counters are kept)."""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Query count, cache hits and embedding requests sent so far."""
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "cache_hits": self.cache_hits,
+                "requests": self.requests,
+                "cached": len(self._cache),
+            }
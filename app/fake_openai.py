@@ -0,0 +1,461 @@
+"""Local OpenAI-compatible stand-in server for offline performance tests.
+
+Serves the endpoints the app's OpenAI clients call, backed by the scripted
+stand-ins in `app.fakes`, so the real server (`python -m app`) can be
+load-tested end to end without network access or API keys:
+- `POST /v1/chat/completions`: tool calls, `json_schema` structured output
+  and plain answers from `FakeChatModel`'s script, optionally overridden by
+  rules from a `--script` file; `stream: true` is answered with SSE chunks;
+- `POST /v1/embeddings`: hashed bag-of-words vectors (`hash_embedding`) for
+  strings or token-id arrays, as floats or base64;
+- `GET /v1/models` and `GET /stats` (request and token counters).
+
+Latency and throughput are shaped like a hosted model: `--latency` before
+the first token, `--tokens-per-second` for the rest of the reply (tokens are
+estimated at 4 characters each), `--max-concurrency` requests served at once
+(the rest queue) and `--rpm` requests per minute (the rest get 429 with
+`Retry-After`, which the OpenAI client retries).
+
+Point the app at it with:
+
+    python -m app.fake_openai --port 8001 --latency 0.3 --tokens-per-second 80
+    OPENAI_API_KEY=unused OPENAI_BASE_URL=http://localhost:8001/v1 python -m app
+
+`OPENAI_BASE_URL` routes every client; `TOOL_LLM_URL`, `RAG_LLM_URL` and
+`RAG_EMBEDDING_URL` route the agent model, the RAG generator and the
+embeddings separately. A script file is JSON:
+`[{"match": "regex", "content": "..."}, {"match": "...", "tool_calls":
+[{"name": "tavily_search", "arguments": {"query": "..."}}]}, ...]`; the
+first rule whose regex matches the last message (and whose tools are bound)
+answers the request.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import collections
+import contextlib
+import json
+import logging
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import click
+import numpy as np
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.fakes import FakeChatModel, hash_embedding
+
+
+logger = logging.getLogger(__name__)
+
+# Characters per token when estimating usage and pacing replies
+_CHARS_PER_TOKEN = 4
+
+# Listed by GET /v1/models; any other model name is accepted as well
+_MODELS = ("gpt-4o-mini", "gpt-4.1-nano", "text-embedding-3-small")
+
+
+@dataclass
+class ScriptRule:
+    """A scripted reply: `content` or `tool_calls` when `match` finds the last message."""
+
+    match: re.Pattern
+    content: Optional[str] = None
+    tool_calls: List[dict] = field(default_factory=list)
+    model: Optional[str] = None
+
+    def applies(self, model: str, text: str, bound: List[str]) -> bool:
+        if self.model and self.model != model:
+            return False
+        if any(call["name"] not in bound for call in self.tool_calls):
+            return False
+        return bool(self.match.search(text))
+
+
+def load_script(path: str) -> List[ScriptRule]:
+    """Read script rules: a JSON list of {"match", "content" | "tool_calls", "model"?} objects."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rules = []
+    for item in data:
+        if "content" not in item and not item.get("tool_calls"):
+            raise ValueError(f"{path}: every rule needs a content or tool_calls")
+        rules.append(
+            ScriptRule(
+                re.compile(item.get("match", ""), re.IGNORECASE | re.DOTALL),
+                item.get("content"),
+                [{"name": c["name"], "arguments": c.get("arguments", {})} for c in item.get("tool_calls", [])],
+                item.get("model"),
+            )
+        )
+    return rules
+
+
+@dataclass
+class StandInConfig:
+    """Latency, throughput limits and script of the stand-in server."""
+
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    embed_latency: float = 0.0
+    max_concurrency: int = 0
+    requests_per_minute: int = 0
+    embedding_dim: int = 1536
+    rules: List[ScriptRule] = field(default_factory=list)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // _CHARS_PER_TOKEN) if text else 0
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return " ".join(part.get("text", "") for part in content or () if isinstance(part, dict))
+
+
+def _to_messages(items: List[dict]) -> List[BaseMessage]:
+    """Convert OpenAI chat messages to LangChain messages for `FakeChatModel`."""
+    messages: List[BaseMessage] = []
+    for item in items:
+        role, content = item.get("role"), _content_text(item.get("content"))
+        if role in ("system", "developer"):
+            messages.append(SystemMessage(content=content))
+        elif role == "assistant":
+            tool_calls = [
+                {
+                    "name": call["function"]["name"],
+                    "args": json.loads(call["function"].get("arguments") or "{}"),
+                    "id": call.get("id", ""),
+                }
+                for call in item.get("tool_calls") or ()
+            ]
+            messages.append(AIMessage(content=content, tool_calls=tool_calls))
+        elif role == "tool":
+            messages.append(ToolMessage(content=content, tool_call_id=item.get("tool_call_id", "")))
+        else:
+            messages.append(HumanMessage(content=content))
+    return messages
+
+
+def _resolve(schema: dict, defs: dict) -> dict:
+    while "$ref" in schema:
+        schema = defs.get(schema["$ref"].rsplit("/", 1)[-1], {})
+    if "anyOf" in schema:
+        return _resolve(schema["anyOf"][0], defs)
+    return schema
+
+
+def _instance(schema: dict, defs: dict) -> Any:
+    """Return the smallest value valid for a JSON schema (defaults and first enum values)."""
+    schema = _resolve(schema, defs)
+    if "default" in schema:
+        return schema["default"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        properties = schema.get("properties", {})
+        return {
+            name: _instance(sub, defs)
+            for name, sub in properties.items()
+            if name in schema.get("required", properties)
+        }
+    return {"array": [], "string": "", "integer": 0, "number": 0.0, "boolean": False}.get(kind)
+
+
+def _structured(content: str, response_format: dict) -> str:
+    """Fit the scripted JSON reply to the requested `json_schema` response format."""
+    if response_format.get("type") != "json_schema":
+        return content
+    schema = response_format.get("json_schema", {}).get("schema", {})
+    value = _instance(schema, schema.get("$defs", {}))
+    try:
+        scripted = json.loads(content)
+    except ValueError:
+        scripted = {"message": content}
+    if isinstance(value, dict) and isinstance(scripted, dict):
+        properties = _resolve(schema, schema.get("$defs", {})).get("properties", {})
+        value.update({k: v for k, v in scripted.items() if k in properties})
+    return json.dumps(value)
+
+
+def _tool_arguments(tools: List[dict], name: str, args: dict) -> dict:
+    """Rename the scripted `query` argument to the first required parameter of tool `name`."""
+    spec = next((t["function"] for t in tools if t["function"]["name"] == name), {})
+    parameters = spec.get("parameters", {})
+    required = parameters.get("required") or list(parameters.get("properties", {}))
+    if "query" in args and required and "query" not in required:
+        return {required[0]: args["query"]}
+    return args
+
+
+def _reply(body: dict, rules: List[ScriptRule]) -> Tuple[str, List[dict]]:
+    """Return the content and OpenAI tool calls answering a chat-completions request."""
+    messages = _to_messages(body.get("messages", []))
+    tools = body.get("tools") or []
+    bound = [t["function"]["name"] for t in tools]
+    last = _content_text(body["messages"][-1].get("content")) if body.get("messages") else ""
+    rule = next((r for r in rules if r.applies(body.get("model", ""), last, bound)), None)
+    if rule is not None:
+        content, calls = rule.content or "", [(c["name"], c["arguments"]) for c in rule.tool_calls]
+    else:
+        kwargs = {
+            "tools": tools,
+            "tool_choice": body.get("tool_choice"),
+            "response_format": body.get("response_format"),
+        }
+        message = FakeChatModel()._reply(messages, kwargs)
+        content = _content_text(message.content)
+        calls = [(c["name"], _tool_arguments(tools, c["name"], c["args"])) for c in message.tool_calls]
+    if body.get("response_format") and not calls:
+        content = _structured(content, body["response_format"])
+    tool_calls = [
+        {
+            "id": f"call_{uuid.uuid4().hex[:24]}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(args)},
+        }
+        for name, args in calls
+    ]
+    return content, tool_calls
+
+
+def _embedding_inputs(value: Any) -> List[str]:
+    """Texts to embed from a string, token ids, or a list of either (token ids as 't<id>' words)."""
+    if isinstance(value, str) or (value and isinstance(value[0], int)):
+        value = [value]
+    return [item if isinstance(item, str) else " ".join(f"t{token}" for token in item) for item in value]
+
+
+def _error(status: int, message: str, kind: str = "invalid_request_error", headers=None) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": kind}}, status_code=status, headers=headers)
+
+
+class StandInServer:
+    """Request handlers sharing the limits, script and counters of one stand-in."""
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self._slots = (
+            asyncio.Semaphore(config.max_concurrency) if config.max_concurrency > 0 else contextlib.nullcontext()
+        )
+        self._recent: collections.deque = collections.deque()
+        self.stats: Dict[str, int] = collections.Counter()
+        self._active = 0
+
+    def _rate_limited(self) -> Optional[float]:
+        """Seconds until a request is allowed when over `requests_per_minute`, else None."""
+        if self.config.requests_per_minute <= 0:
+            return None
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] >= 60.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.config.requests_per_minute:
+            return 60.0 - (now - self._recent[0])
+        self._recent.append(now)
+        return None
+
+    async def _admit(self, endpoint: str) -> Optional[JSONResponse]:
+        self.stats[f"{endpoint}_requests"] += 1
+        wait = self._rate_limited()
+        if wait is not None:
+            self.stats["rate_limited"] += 1
+            return _error(
+                429, "Rate limit reached", "rate_limit_exceeded", headers={"Retry-After": f"{max(wait, 0.01):.2f}"}
+            )
+        return None
+
+    @contextlib.asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        async with self._slots:
+            self._active += 1
+            self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], self._active)
+            try:
+                yield
+            finally:
+                self._active -= 1
+
+    async def _pace(self, tokens: int) -> None:
+        if self.config.tokens_per_second > 0 and tokens:
+            await asyncio.sleep(tokens / self.config.tokens_per_second)
+
+    async def chat_completions(self, request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return _error(400, "Request body is not valid JSON")
+        rejected = await self._admit("chat")
+        if rejected is not None:
+            return rejected
+        content, tool_calls = _reply(body, self.config.rules)
+        model = body.get("model", _MODELS[0])
+        prompt = "".join(_content_text(m.get("content")) for m in body.get("messages", []))
+        usage = {
+            "prompt_tokens": _estimate_tokens(prompt),
+            "completion_tokens": _estimate_tokens(content) + sum(
+                _estimate_tokens(c["function"]["arguments"]) for c in tool_calls
+            ),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.stats["prompt_tokens"] += usage["prompt_tokens"]
+        self.stats["completion_tokens"] += usage["completion_tokens"]
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                self._stream(completion_id, model, content, tool_calls, finish_reason, usage if include_usage else None),
+                media_type="text/event-stream",
+            )
+        async with self._slot():
+            await asyncio.sleep(self.config.latency)
+            await self._pace(usage["completion_tokens"])
+        message: Dict[str, Any] = {"role": "assistant", "content": content or None}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return JSONResponse(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+                "usage": usage,
+            }
+        )
+
+    async def _stream(
+        self,
+        completion_id: str,
+        model: str,
+        content: str,
+        tool_calls: List[dict],
+        finish_reason: str,
+        usage: Optional[dict],
+    ) -> AsyncIterator[str]:
+        def chunk(delta: Optional[dict], finish: Optional[str] = None, **extra: Any) -> str:
+            choices = [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish, "logprobs": None}]
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async with self._slot():
+            await asyncio.sleep(self.config.latency)
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in re.findall(r"\S+\s*|\s+", content):
+                await self._pace(_estimate_tokens(piece))
+                yield chunk({"content": piece})
+            for index, call in enumerate(tool_calls):
+                await self._pace(_estimate_tokens(call["function"]["arguments"]))
+                yield chunk({"tool_calls": [{"index": index, **call}]})
+            yield chunk({}, finish_reason)
+            if usage is not None:
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+
+    async def embeddings(self, request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return _error(400, "Request body is not valid JSON")
+        if not body.get("input"):
+            return _error(400, "'input' is required")
+        rejected = await self._admit("embeddings")
+        if rejected is not None:
+            return rejected
+        texts = _embedding_inputs(body["input"])
+        dim = int(body.get("dimensions") or self.config.embedding_dim)
+        async with self._slot():
+            await asyncio.sleep(self.config.embed_latency)
+        vectors = [hash_embedding(text, dim) for text in texts]
+        as_base64 = body.get("encoding_format") == "base64"
+        tokens = sum(len(t.split()) for t in texts)
+        self.stats["embedded_inputs"] += len(texts)
+        return JSONResponse(
+            {
+                "object": "list",
+                "model": body.get("model", _MODELS[-1]),
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": i,
+                        "embedding": (
+                            base64.b64encode(np.asarray(v, dtype="<f4").tobytes()).decode("ascii") if as_base64 else v
+                        ),
+                    }
+                    for i, v in enumerate(vectors)
+                ],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    async def models(self, request: Request):
+        return JSONResponse(
+            {"object": "list", "data": [{"id": m, "object": "model", "created": 0, "owned_by": "local"} for m in _MODELS]}
+        )
+
+    async def stats_endpoint(self, request: Request):
+        return JSONResponse(dict(self.stats))
+
+
+def build_app(config: Optional[StandInConfig] = None) -> Starlette:
+    """Return the stand-in ASGI app (routes with and without the `/v1` prefix)."""
+    server = StandInServer(config or StandInConfig())
+    routes = []
+    for prefix in ("/v1", ""):
+        routes += [
+            Route(f"{prefix}/chat/completions", server.chat_completions, methods=["POST"]),
+            Route(f"{prefix}/embeddings", server.embeddings, methods=["POST"]),
+            Route(f"{prefix}/models", server.models, methods=["GET"]),
+        ]
+    routes.append(Route("/stats", server.stats_endpoint, methods=["GET"]))
+    app = Starlette(routes=routes)
+    app.state.server = server
+    return app
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8001, show_default=True)
+@click.option("--latency", default=0.0, show_default=True, help="Seconds before the first token of a chat reply.")
+@click.option("--tokens-per-second", default=0.0, show_default=True, help="Reply token rate (0: unlimited).")
+@click.option("--embed-latency", default=0.0, show_default=True, help="Seconds per embeddings request.")
+@click.option("--max-concurrency", default=0, show_default=True, help="Requests served at once; others queue (0: unlimited).")
+@click.option("--rpm", default=0, show_default=True, help="Requests per minute before answering 429 (0: unlimited).")
+@click.option("--embedding-dim", default=1536, show_default=True, help="Vector size when a request sets no dimensions.")
+@click.option("--script", type=click.Path(exists=True, dir_okay=False), default=None, help="JSON file of scripted replies.")
+def main(host, port, latency, tokens_per_second, embed_latency, max_concurrency, rpm, embedding_dim, script):
+    """Serve an OpenAI-compatible chat/embeddings stand-in for offline load tests."""
+    import uvicorn
+
+    config = StandInConfig(
+        latency=latency,
+        tokens_per_second=tokens_per_second,
+        embed_latency=embed_latency,
+        max_concurrency=max_concurrency,
+        requests_per_minute=rpm,
+        embedding_dim=embedding_dim,
+        rules=load_script(script) if script else [],
+    )
+    logger.info("OpenAI stand-in listening on http://%s:%s/v1", host, port)
+    uvicorn.run(build_app(config), host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
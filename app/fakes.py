@@ -0,0 +1,206 @@
+"""Deterministic offline stand-ins for the OpenAI models and external tools.
+
+These mimic the call patterns of the real components closely enough to run
+the whole agent (graph, tools, RAG pipeline, A2A app) without network access:
+- `FakeChatModel` answers tool-calling, structured-output, helpfulness and
+  RAG-generation prompts with scripted, deterministic replies.
+- `FakeEmbeddings` produces hashed bag-of-words vectors, so texts sharing
+  words land close together and retrieval still behaves sensibly.
+- `fake_tool_belt` mirrors `get_tool_belt` with search tools that sleep
+  instead of calling Tavily, PubMed or arXiv.
+- `build_offline_agent` wires them all into an `Agent` and a RAG graph, as
+  used by `app.benchmark` and `app.loadtest --in-process`.
+
+Every stand-in takes a `latency` (seconds) that is injected per call.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+import time
+import zlib
+from typing import Any, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def hash_embedding(text: str, dim: int = 256) -> List[float]:
+    """Return a unit-length hashed bag-of-words vector for `text`."""
+    vector = [0.0] * dim
+    for token in _TOKEN_RE.findall(text.lower()):
+        h = zlib.crc32(token.encode("utf-8"))
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0.0:
+        vector[0] = 1.0
+        return vector
+    return [v / norm for v in vector]
+
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted chat model following the agent's tool-use policy.
+
+    With tools bound, each user turn calls the tools in `tool_plan` one at a
+    time (skipping any that are not bound) and then answers from the tool
+    results. Structured-output requests return a completed `ResponseFormat`,
+    helpfulness prompts return 'Y', and plain prompts (RAG generation) echo
+    the start of the provided context.
+    """
+
+    latency: float = 0.0
+    tool_plan: List[str] = ["retrieve_information"]
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def with_structured_output(self, schema, *, include_raw: bool = False, **kwargs: Any):
+        return self.bind(response_format="json_schema") | PydanticOutputParser(
+            pydantic_object=schema
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._reply(messages, kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _reply(self, messages: List[BaseMessage], kwargs: dict) -> AIMessage:
+        if kwargs.get("response_format"):
+            answer = next(
+                (
+                    _text(m)
+                    for m in reversed(messages)
+                    if isinstance(m, AIMessage)
+                    and not m.tool_calls
+                    and not _text(m).startswith("HELPFULNESS:")
+                ),
+                "",
+            )
+            return AIMessage(
+                content=json.dumps({"status": "completed", "message": answer})
+            )
+
+        bound = [t["function"]["name"] for t in kwargs.get("tools") or []]
+        if bound:
+            turn: List[BaseMessage] = []
+            for m in reversed(messages):
+                if isinstance(m, HumanMessage):
+                    query = _text(m)
+                    break
+                turn.append(m)
+            else:
+                query = _text(messages[-1])
+            results = [_text(m) for m in reversed(turn) if isinstance(m, ToolMessage)]
+            plan = [name for name in self.tool_plan if name in bound]
+            if kwargs.get("tool_choice") == "none":
+                plan = plan[:len(results)]
+            if len(results) < len(plan):
+                name = plan[len(results)]
+                return AIMessage(
+                    content="",
+                    tool_calls=[
+                        {
+                            "name": name,
+                            "args": {"query": query},
+                            "id": f"call_{len(messages)}_{name}",
+                        }
+                    ],
+                )
+            evidence = " ".join(r[:200] for r in results) or "no tool evidence"
+            return AIMessage(content=f"Diagnosis: based on {evidence}")
+
+        prompt = _text(messages[-1])
+        if "helpfulness" in prompt.lower():
+            return AIMessage(content="Y")
+        context = prompt.split("# CONTEXT:", 1)[-1].split("# QUERY:", 1)[0].strip()
+        return AIMessage(content=context[:300] or "I don't know")
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words embeddings with injected per-request latency."""
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [hash_embedding(t, self.dim) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def fake_search_tool(name: str, description: str, latency: float = 0.0) -> BaseTool:
+    """Return a search tool named like a real one that sleeps instead of calling out."""
+
+    def _search(query: str) -> str:
+        if latency:
+            time.sleep(latency)
+        return f"[{name}] top results for: {query}"
+
+    return StructuredTool.from_function(func=_search, name=name, description=description)
+
+
+def fake_tool_belt(latency: float = 0.0) -> List:
+    """Return a tool belt like `get_tool_belt` with offline web/paper search tools.
+
+    The local `retrieve_information` tool is kept as-is; build its RAG graph
+    with `FakeEmbeddings` and `FakeChatModel` to keep it offline too.
+    """
+    from app.rag import retrieve_information
+
+    return [
+        retrieve_information,
+        fake_search_tool("tavily_search", "Search the web for current information.", latency),
+        fake_search_tool("pub_med", "Search PubMed for biomedical literature.", latency),
+        fake_search_tool("arxiv", "Search arXiv for scientific papers.", latency),
+    ]
+
+
+def build_offline_agent(data_dir: str, llm_latency: float = 0.0, embed_latency: float = 0.0, tool_latency: float = 0.0):
+    """Return an `Agent` wired to fakes plus the offline RAG graph over `data_dir` it should use.
+
+    Patch `app.rag._get_rag_graph` to return the graph while the agent runs.
+    """
+    from app.agent import Agent
+    from app.rag import _build_rag_graph
+
+    rag_graph = _build_rag_graph(
+        data_dir,
+        embedding_model=FakeEmbeddings(latency=embed_latency),
+        generator_llm=FakeChatModel(latency=llm_latency),
+    )
+    agent = Agent(model=FakeChatModel(latency=llm_latency), tools=fake_tool_belt(tool_latency), answers=False)
+    return agent, rag_graph
@@ -0,0 +1,148 @@
+"""Coarse file and section index for two-level retrieval.
+
+The library is a set of chapter PDFs ("Fungus Chapter 4--Grain Diseases.pdf",
+...), and most questions are answered by one or two of them. `SectionIndex`
+summarizes every run of `RAG_SECTION_PAGES` pages of a PDF (a section) by
+the centroid of its chunk vectors. It is built while chunks are indexed,
+from vectors that were computed anyway, so it costs no extra embedding calls.
+
+`candidates` narrows a query in two steps:
+- files: the `RAG_COARSE_FILES` PDFs whose best section scores highest;
+- sections: the best sections of those files, until they hold at least
+  `RAG_COARSE_CANDIDATES` chunks.
+The chunk-level search then only scores those chunks, so its cost stays
+roughly constant as PDFs are added, and chunks from unrelated chapters stay
+out of the citations. Libraries with no more chunks than that are searched
+in full.
+
+Narrowing trades some recall for speed, and only the brute-force quantized
+store (see `app.vectorstore`) gets faster from scoring fewer rows; Qdrant's
+own index does not. It is therefore on by default only for quantized
+vectors, and `RAG_COARSE_FILES` overrides that either way.
+"""
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _section_pages() -> int:
+    """Pages per section from `RAG_SECTION_PAGES` (default 4)."""
+    return max(1, int(os.environ.get("RAG_SECTION_PAGES", "4")))
+
+
+def coarse_files(quantized: bool = False) -> int:
+    """Files kept per query from `RAG_COARSE_FILES` (0 disables the coarse index).
+
+    Unset, it is 8 for a `quantized` vector store and 0 otherwise.
+    """
+    default = "8" if quantized else "0"
+    return int(os.environ.get("RAG_COARSE_FILES", "").strip() or default)
+
+
+def _coarse_candidates() -> int:
+    """Minimum chunks kept per query from `RAG_COARSE_CANDIDATES` (default 200)."""
+    return int(os.environ.get("RAG_COARSE_CANDIDATES", "200"))
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class SectionIndex:
+    """Section centroids, the file of each section and the chunk ids of each section.
+
+    Fill with `add` in chunk id order, call `finish` once, then query with
+    `candidates`.
+    """
+
+    def __init__(
+        self,
+        files: Optional[int] = None,
+        min_candidates: Optional[int] = None,
+        section_pages: Optional[int] = None,
+    ):
+        self.files = coarse_files() if files is None else files
+        self.min_candidates = _coarse_candidates() if min_candidates is None else min_candidates
+        self.section_pages = section_pages or _section_pages()
+        self._section_ids: Dict[Tuple[str, int], int] = {}
+        self._file_ids: Dict[str, int] = {}
+        self._section_sums: List[np.ndarray] = []
+        self._section_file: List[int] = []
+        self._chunk_section: List[int] = []
+        # Filled by `finish`
+        self._centroids = np.zeros((0, 0), dtype=np.float32)
+        self._section_files = np.zeros(0, dtype=np.int64)
+        self._section_chunks: List[np.ndarray] = []
+        self._chunk_sections = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        """Number of sections."""
+        return len(self._section_ids)
+
+    def add(self, sources: Sequence[str], pages: Sequence[Optional[int]], vectors: Sequence) -> None:
+        """Add the next chunks (in chunk id order) by source file, page and vector."""
+        if not len(vectors):
+            return
+        for source, page, vector in zip(sources, pages, _unit(np.asarray(vectors, dtype=np.float32))):
+            key = (source, (page or 0) // self.section_pages)
+            section = self._section_ids.get(key)
+            if section is None:
+                section = self._section_ids[key] = len(self._section_sums)
+                self._section_sums.append(np.zeros_like(vector))
+                self._section_file.append(self._file_ids.setdefault(source, len(self._file_ids)))
+            self._section_sums[section] += vector
+            self._chunk_section.append(section)
+
+    def nbytes(self) -> int:
+        """Bytes of the finished index: centroids and the section of every chunk, both ways."""
+        arrays = [self._centroids, self._section_files, self._chunk_sections, *self._section_chunks]
+        return sum(a.nbytes for a in arrays)
+
+    def finish(self) -> "SectionIndex":
+        if not self._section_sums:
+            return self
+        self._centroids = _unit(np.stack(self._section_sums))
+        self._section_files = np.asarray(self._section_file, dtype=np.int64)
+        self._chunk_sections = np.asarray(self._chunk_section, dtype=np.int64)
+        order = np.argsort(self._chunk_sections, kind="stable")
+        bounds = np.searchsorted(self._chunk_sections[order], np.arange(len(self._centroids) + 1))
+        self._section_chunks = [np.sort(order[bounds[i]:bounds[i + 1]]) for i in range(len(self._centroids))]
+        self._section_sums, self._section_file, self._chunk_section = [], [], []
+        return self
+
+    def candidates(self, query: Sequence[float], allowed: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Return the sorted chunk ids of the best sections of the best files for `query`.
+
+        Only chunks in `allowed` (sorted ids) are considered. Returns None
+        when narrowing would not help: the index is disabled (`files` < 1)
+        or empty, or there are no more than `min_candidates` chunks to search.
+        """
+        total = len(self._chunk_sections) if allowed is None else len(allowed)
+        if self.files < 1 or not len(self._centroids) or total <= self.min_candidates:
+            return None
+        scores = self._centroids @ _unit(np.asarray(query, dtype=np.float32))
+        if allowed is not None:
+            eligible = np.zeros(len(scores), dtype=bool)
+            eligible[np.unique(self._chunk_sections[allowed])] = True
+            scores[~eligible] = -np.inf
+        # A file scores as its best section: whole-file centroids blur chapters covering several diseases
+        file_scores = np.full(len(self._file_ids), -np.inf, dtype=np.float32)
+        np.maximum.at(file_scores, self._section_files, scores)
+        scores[~np.isin(self._section_files, np.argsort(-file_scores)[: self.files])] = -np.inf
+
+        ids: List[np.ndarray] = []
+        count = 0
+        for section in np.argsort(-scores):
+            if count >= self.min_candidates or not np.isfinite(scores[section]):
+                break
+            chunks = self._section_chunks[section]
+            if allowed is not None:
+                chunks = np.intersect1d(chunks, allowed, assume_unique=True)
+            ids.append(chunks)
+            count += len(chunks)
+        return np.sort(np.concatenate(ids)) if ids else np.zeros(0, dtype=np.int64)
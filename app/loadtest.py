@@ -0,0 +1,367 @@
+"""Concurrent load generator for the A2A server, for capacity planning.
+
+Simulates users holding multi-turn conversations through the same
+`A2AClient` as `app/test_client.py`:
+- conversations arrive as a Poisson process at `--rate` per second for
+  `--duration` seconds (open loop: arrivals do not wait for the server);
+- each conversation is a scenario drawn from a weighted query mix and sends
+  its turns in order under one `context_id`, pausing `--think-time` seconds
+  (exponentially distributed) between turns;
+- a `--streaming-share` of conversations use `message/stream`, the rest
+  `message/send`;
+- at most `--max-users` conversations run at once; arrivals beyond that are
+  dropped and counted, as a saturated deployment would turn users away.
+
+    python -m app.loadtest --url http://localhost:10000 --rate 2 --duration 60
+
+The report gives throughput, error rate, time to first event (streaming
+turns) and p50/p95/p99 completion latency, overall and per scenario. A mix
+file is JSON: `[{"name": ..., "weight": 2, "turns": ["...", "..."]}, ...]`.
+`--in-process` runs against the offline agent of `app.fakes` instead of
+a server (httpx's ASGI transport delivers a stream only once it has ended,
+so time to first event is not meaningful there).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from unittest import mock
+from uuid import uuid4
+
+import click
+
+from app.stats import percentiles
+
+
+# Final task states that count as a successful turn
+_OK_STATES = ("completed", "input-required")
+
+
+@dataclass
+class Scenario:
+    """One kind of conversation: its turns are sent in order under one context."""
+
+    name: str
+    turns: List[str]
+    weight: float = 1.0
+
+
+DEFAULT_MIX = [
+    Scenario(
+        "lookup",
+        ["What causes false smut in rice?", "How is it managed?"],
+        weight=4,
+    ),
+    Scenario(
+        "diagnosis",
+        [
+            "Irrigated lowland rice at maximum tillering: spindle-shaped leaf lesions with gray "
+            "centers and brown margins after a humid week. What is the likely diagnosis?",
+            "We now also see neck rot on panicles in hotspots. Revise the diagnosis and give IPM steps.",
+            "Which of these measures can we apply before heading?",
+        ],
+        weight=3,
+    ),
+    Scenario(
+        "research",
+        ["Find recent research on rice blast resistance genes", "Summarize the most relevant paper"],
+        weight=1,
+    ),
+    Scenario(
+        "single",
+        ["Outline diagnostic symptoms and IPM for rice black streaked dwarf in Africa."],
+        weight=2,
+    ),
+]
+
+
+def load_mix(path: str) -> List[Scenario]:
+    """Read a JSON query mix: a list of {"name", "turns", "weight"} objects."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    mix = [Scenario(item["name"], list(item["turns"]), float(item.get("weight", 1.0))) for item in data]
+    if not mix or any(not s.turns or s.weight <= 0 for s in mix):
+        raise ValueError(f"{path}: every scenario needs at least one turn and a positive weight")
+    return mix
+
+
+@dataclass
+class TurnResult:
+    scenario: str
+    turn: int
+    streaming: bool
+    ok: bool
+    latency: float
+    first_event: Optional[float] = None
+    state: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadReport:
+    """Results of one load run."""
+
+    wall_time: float
+    arrivals: int = 0
+    dropped: int = 0
+    results: List[TurnResult] = field(default_factory=list)
+
+    def summary(self, results: Optional[List[TurnResult]] = None) -> Dict[str, Any]:
+        """Counts and percentiles of successful turns; percentiles are None without samples."""
+        results = self.results if results is None else results
+        latencies = sorted(r.latency for r in results if r.ok)
+        first_events = sorted(r.first_event for r in results if r.ok and r.first_event is not None)
+        errors = sum(not r.ok for r in results)
+        return {
+            "turns": len(results),
+            "errors": errors,
+            "error_rate": errors / len(results) if results else 0.0,
+            "throughput_tps": sum(r.ok for r in results) / self.wall_time if self.wall_time else 0.0,
+            "latency_s": percentiles(latencies),
+            "first_event_s": percentiles(first_events),
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        scenarios = sorted({r.scenario for r in self.results})
+        errors: Dict[str, int] = {}
+        for r in self.results:
+            if r.error:
+                errors[r.error] = errors.get(r.error, 0) + 1
+        return {
+            "wall_time_s": self.wall_time,
+            "conversations": self.arrivals - self.dropped,
+            "dropped_conversations": self.dropped,
+            "overall": self.summary(),
+            "scenarios": {
+                name: self.summary([r for r in self.results if r.scenario == name]) for name in scenarios
+            },
+            "errors": errors,
+            "turns": [asdict(r) for r in self.results],
+        }
+
+
+def _user_message(text: str, context_id: str) -> Dict[str, Any]:
+    return {
+        "message": {
+            "role": "user",
+            "parts": [{"kind": "text", "text": text}],
+            "message_id": uuid4().hex,
+            "context_id": context_id,
+        }
+    }
+
+
+def _state_of(result: Any) -> Optional[str]:
+    """Task state carried by a Task or status update event, if any."""
+    status = getattr(result, "status", None)
+    state = getattr(status, "state", None)
+    return getattr(state, "value", state)
+
+
+async def _send_turn(client, text: str, context_id: str, streaming: bool) -> Tuple[Optional[float], Optional[str]]:
+    """Send one turn; return (seconds to first event, final task state). Raises on protocol errors."""
+    from a2a.types import MessageSendParams, SendMessageRequest, SendStreamingMessageRequest
+
+    params = MessageSendParams(**_user_message(text, context_id))
+    if not streaming:
+        response = await client.send_message(SendMessageRequest(id=str(uuid4()), params=params))
+        error = getattr(response.root, "error", None)
+        if error is not None:
+            raise RuntimeError(f"JSON-RPC error {error.code}: {error.message}")
+        return None, _state_of(response.root.result)
+
+    start = time.perf_counter()
+    first_event, state = None, None
+    request = SendStreamingMessageRequest(id=str(uuid4()), params=params)
+    async for event in client.send_message_streaming(request):
+        if first_event is None:
+            first_event = time.perf_counter() - start
+        error = getattr(event.root, "error", None)
+        if error is not None:
+            raise RuntimeError(f"JSON-RPC error {error.code}: {error.message}")
+        state = _state_of(event.root.result) or state
+    return first_event, state
+
+
+async def _conversation(
+    client, scenario: Scenario, streaming: bool, think_time: float, timeout: float, rng: random.Random,
+    results: List[TurnResult],
+) -> None:
+    context_id = uuid4().hex
+    for turn, text in enumerate(scenario.turns):
+        if turn and think_time > 0:
+            await asyncio.sleep(rng.expovariate(1.0 / think_time))
+        start = time.perf_counter()
+        result = TurnResult(scenario.name, turn, streaming, ok=False, latency=0.0)
+        try:
+            result.first_event, result.state = await asyncio.wait_for(
+                _send_turn(client, text, context_id, streaming), timeout
+            )
+            result.ok = result.state in _OK_STATES
+            if not result.ok:
+                result.error = f"state {result.state}"
+        except asyncio.TimeoutError:
+            result.error = "timeout"
+        except Exception as e:
+            result.error = type(e).__name__
+        result.latency = time.perf_counter() - start
+        results.append(result)
+        if not result.ok:
+            return  # later turns depend on this one
+
+
+async def run_load(
+    client,
+    mix: List[Scenario],
+    rate: float,
+    duration: float,
+    max_users: int = 100,
+    think_time: float = 2.0,
+    streaming_share: float = 0.5,
+    timeout: float = 120.0,
+    seed: Optional[int] = None,
+) -> LoadReport:
+    """Start conversations at `rate` per second for `duration` seconds and wait for them to finish."""
+    rng = random.Random(seed)
+    report = LoadReport(wall_time=0.0)
+    active: set = set()
+    start = time.perf_counter()
+    next_arrival = start
+    while True:
+        next_arrival += rng.expovariate(rate)
+        if next_arrival - start >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        report.arrivals += 1
+        if len(active) >= max_users:
+            report.dropped += 1
+            continue
+        scenario = rng.choices(mix, weights=[s.weight for s in mix])[0]
+        task = asyncio.create_task(
+            _conversation(
+                client, scenario, rng.random() < streaming_share, think_time, timeout,
+                random.Random(rng.random()), report.results,
+            )
+        )
+        active.add(task)
+        task.add_done_callback(active.discard)
+    if active:
+        await asyncio.gather(*active)
+    report.wall_time = time.perf_counter() - start
+    return report
+
+
+def print_report(report: LoadReport) -> None:
+    data = report.as_dict()
+    print(
+        f"\nconversations: {data['conversations']}  dropped: {data['dropped_conversations']}  "
+        f"wall: {report.wall_time:.1f}s"
+    )
+    print(f"{'scenario':<12} {'turns':>6} {'err %':>6} {'turns/s':>8} "
+          f"{'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'TTFE p50':>9} {'TTFE p95':>9}")
+    rows = [("overall", data["overall"])] + list(data["scenarios"].items())
+
+    def cell(value: Optional[float], width: int) -> str:
+        return f"{value:>{width}.3f}" if value is not None else f"{'-':>{width}}"
+
+    for name, s in rows:
+        lat, ttfe = s["latency_s"], s["first_event_s"]
+        print(
+            f"{name:<12} {s['turns']:>6} {100 * s['error_rate']:>6.1f} {s['throughput_tps']:>8.2f} "
+            f"{cell(lat['p50'], 8)} {cell(lat['p95'], 8)} {cell(lat['p99'], 8)} "
+            f"{cell(ttfe['p50'], 9)} {cell(ttfe['p95'], 9)}"
+        )
+    for error, count in sorted(data["errors"].items(), key=lambda e: -e[1]):
+        print(f"  error {error}: {count}")
+
+
+async def _run_against_url(url: str, timeout: float, **kwargs) -> LoadReport:
+    import httpx
+    from a2a.client import A2ACardResolver, A2AClient
+
+    limits = httpx.Limits(max_connections=kwargs.get("max_users", 100))
+    async with httpx.AsyncClient(timeout=httpx.Timeout(timeout), limits=limits) as httpx_client:
+        agent_card = await A2ACardResolver(httpx_client=httpx_client, base_url=url).get_agent_card()
+        client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
+        return await run_load(client, timeout=timeout, **kwargs)
+
+
+async def _run_in_process(data_dir: str, llm_latency: float, timeout: float, **kwargs) -> LoadReport:
+    import httpx
+    from a2a.client import A2AClient
+    from a2a.server.tasks import InMemoryPushNotificationConfigStore
+
+    from app.__main__ import build_agent_card, build_server
+    from app.agent_executor import GeneralAgentExecutor
+    from app.fakes import build_offline_agent
+    from app.push import QueuedPushNotificationSender
+    import app.rag as rag
+
+    agent, rag_graph = build_offline_agent(data_dir, llm_latency, 0.0, llm_latency)
+    # Importing the server configures INFO logging; per-turn executor logs would swamp the report
+    logging.getLogger().setLevel(logging.WARNING)
+    agent_card = build_agent_card("localhost", 10000)
+    push_config_store = InMemoryPushNotificationConfigStore()
+    # Created here so that its HTTP client is closed with the run
+    push_sender = QueuedPushNotificationSender(httpx_client=None, config_store=push_config_store)
+    asgi_app = build_server(
+        agent_card, GeneralAgentExecutor(agent), push_config_store=push_config_store, push_sender=push_sender
+    ).build()
+    transport = httpx.ASGITransport(app=asgi_app)
+    try:
+        with mock.patch.object(rag, "_get_rag_graph", lambda: rag_graph):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://localhost:10000", timeout=httpx.Timeout(timeout)
+            ) as httpx_client:
+                client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
+                return await run_load(client, timeout=timeout, **kwargs)
+    finally:
+        await push_sender.aclose()
+
+
+@click.command()
+@click.option("--url", default="http://localhost:10000", show_default=True, help="A2A server base URL.")
+@click.option("--rate", default=1.0, show_default=True, help="New conversations per second (Poisson).")
+@click.option("--duration", default=30.0, show_default=True, help="Seconds during which conversations start.")
+@click.option("--max-users", default=100, show_default=True, help="Concurrent conversations; extra arrivals are dropped.")
+@click.option("--think-time", default=2.0, show_default=True, help="Mean seconds between a user's turns.")
+@click.option("--streaming-share", default=0.5, show_default=True, help="Fraction of conversations using message/stream.")
+@click.option("--mix-file", type=click.Path(exists=True, dir_okay=False), default=None, help="JSON query mix.")
+@click.option("--timeout", default=120.0, show_default=True, help="Seconds before a turn counts as timed out.")
+@click.option("--seed", type=int, default=None, help="Seed for arrivals, scenarios and think times.")
+@click.option("--in-process", is_flag=True, help="Run against the offline agent instead of --url.")
+@click.option("--data-dir", default="data", show_default=True, help="PDF folder for --in-process.")
+@click.option("--llm-latency", default=0.0, show_default=True, help="Seconds per fake model/tool call (--in-process).")
+@click.option("--json-output", type=click.Path(dir_okay=False), default=None, help="Also write the report as JSON.")
+def main(url, rate, duration, max_users, think_time, streaming_share, mix_file, timeout, seed,
+         in_process, data_dir, llm_latency, json_output):
+    """Load-test the A2A server with concurrent multi-turn conversations."""
+    logging.getLogger().setLevel(logging.WARNING)
+    if rate <= 0:
+        raise click.BadParameter("must be positive", param_hint="--rate")
+    kwargs = dict(
+        mix=load_mix(mix_file) if mix_file else DEFAULT_MIX,
+        rate=rate,
+        duration=duration,
+        max_users=max_users,
+        think_time=think_time,
+        streaming_share=streaming_share,
+        seed=seed,
+    )
+    if in_process:
+        report = asyncio.run(_run_in_process(data_dir, llm_latency, timeout, **kwargs))
+    else:
+        report = asyncio.run(_run_against_url(url, timeout, **kwargs))
+    print_report(report)
+    if json_output:
+        with open(json_output, "w") as f:
+            json.dump(report.as_dict(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Structured metadata for chunks of the rice pathology library.
+
+`enrich_metadata` tags every chunk with:
+- `diseases`: canonical disease names mentioned (by common or pathogen name),
+- `plant_parts`: leaf, sheath, stem, panicle, grain, root,
+- `pathogen_types`: fungal, bacterial, viral, nematode,
+- `chapter`: the PDF file name without extension.
+
+Tags come from keyword vocabularies matched against the chunk text plus hints
+from the file name (e.g. "Fungus Chapter 4--Grain Diseases.pdf" implies fungal
+and grain). `infer_filters` applies the same vocabularies to a user query to
+derive a retrieval pre-filter.
+"""
+from __future__ import annotations
+
+import os
+import re
+from typing import Dict, Iterable, List
+
+from langchain_core.documents import Document
+
+
+# Filterable metadata fields (lists of tags, except the `chapter` string)
+FILTER_FIELDS = ("diseases", "plant_parts", "pathogen_types", "chapter")
+
+# canonical disease -> (pathogen type, name patterns)
+DISEASES: Dict[str, tuple] = {
+    "blast": ("fungal", [r"blast", r"magnaporthe", r"pyricularia"]),
+    "brown spot": ("fungal", [r"brown spot", r"bipolaris oryzae", r"cochliobolus"]),
+    "narrow brown leaf spot": ("fungal", [r"narrow brown leaf spot", r"cercospora"]),
+    "leaf scald": ("fungal", [r"leaf scald", r"microdochium"]),
+    "sheath blight": ("fungal", [r"sheath blight", r"rhizoctonia"]),
+    "sheath rot": ("fungal", [r"sheath rot", r"sarocladium"]),
+    "stem rot": ("fungal", [r"stem rot", r"sclerotium oryzae"]),
+    "false smut": ("fungal", [r"false smut", r"ustilaginoidea", r"villosiclava"]),
+    "kernel smut": ("fungal", [r"kernel smut", r"tilletia"]),
+    "bakanae": ("fungal", [r"bakanae", r"fusarium fujikuroi"]),
+    "grain discoloration": ("fungal", [r"grain discolou?ration", r"dirty panicle"]),
+    "seedling blight": ("fungal", [r"seedling blight"]),
+    "downy mildew": ("fungal", [r"downy mildew", r"sclerophthora"]),
+    "bacterial blight": ("bacterial", [r"bacterial (?:leaf )?blight", r"xanthomonas oryzae pv\.? oryzae", r"\bxoo\b"]),
+    "bacterial leaf streak": ("bacterial", [r"(?:bacterial )?leaf streak", r"oryzicola", r"\bxoc\b"]),
+    "bacterial panicle blight": ("bacterial", [r"panicle blight", r"burkholderia"]),
+    "sheath brown rot": ("bacterial", [r"sheath brown rot", r"pseudomonas fuscovaginae"]),
+    "tungro": ("viral", [r"tungro", r"\brtbv\b", r"\brtsv\b"]),
+    "rice yellow mottle": ("viral", [r"yellow mottle", r"\brymv\b"]),
+    "grassy stunt": ("viral", [r"grassy stunt"]),
+    "ragged stunt": ("viral", [r"ragged stunt"]),
+    "black streaked dwarf": ("viral", [r"black[- ]streaked dwarf", r"\bs?rbsdv?\b"]),
+    "hoja blanca": ("viral", [r"hoja blanca"]),
+    "rice stripe": ("viral", [r"stripe virus"]),
+    "root-knot nematode": ("nematode", [r"root[- ]knot", r"meloidogyne"]),
+    "white tip": ("nematode", [r"white tip", r"aphelenchoides"]),
+    "ufra": ("nematode", [r"\bufra\b", r"ditylenchus"]),
+    "rice root nematode": ("nematode", [r"rice root nematode", r"hirschmanniella"]),
+}
+
+PLANT_PARTS: Dict[str, List[str]] = {
+    "leaf": [r"lea(?:f|ves)", r"foliar", r"leaf blade"],
+    "sheath": [r"sheaths?", r"leaf-sheath"],
+    "stem": [r"stems?", r"culms?", r"nodes?", r"tillers?"],
+    "panicle": [r"panicles?", r"spikelets?", r"neck", r"florets?", r"inflorescence"],
+    "grain": [r"grains?", r"seeds?", r"kernels?", r"glumes?", r"hulls?"],
+    "root": [r"roots?", r"rhizosphere"],
+}
+
+PATHOGEN_TYPES: Dict[str, List[str]] = {
+    "fungal": [r"fung(?:us|i|al)", r"myceli(?:um|a)", r"conidi(?:a|um)", r"sclerotia"],
+    "bacterial": [r"bacteri(?:a|um|al)", r"xanthomonas", r"burkholderia"],
+    "viral": [r"vir(?:us|uses|al)", r"planthoppers?", r"leafhoppers?"],
+    "nematode": [r"nematodes?"],
+}
+
+# A plant part or pathogen type must be mentioned this often in a chunk to be tagged
+MIN_MENTIONS = 2
+
+
+def _compile(patterns: Iterable[str]) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(patterns) + r")\b", re.IGNORECASE)
+
+
+_DISEASE_RES = {name: _compile(patterns) for name, (_, patterns) in DISEASES.items()}
+_PART_RES = {name: _compile(patterns) for name, patterns in PLANT_PARTS.items()}
+_TYPE_RES = {name: _compile(patterns) for name, patterns in PATHOGEN_TYPES.items()}
+
+
+def chapter_from_source(source: str) -> str:
+    """Return the chapter label for a PDF path (its file name without extension)."""
+    return os.path.splitext(os.path.basename(source or ""))[0].strip()
+
+
+def _tags(text: str, patterns: Dict[str, re.Pattern], min_mentions: int) -> List[str]:
+    return [name for name, pattern in patterns.items() if len(pattern.findall(text)) >= min_mentions]
+
+
+def derive_metadata(text: str, source: str = "") -> Dict[str, object]:
+    """Derive disease, plant part, pathogen type and chapter tags for one chunk."""
+    chapter = chapter_from_source(source)
+    # File names use '_' and '-' as separators, which would defeat word boundaries
+    hint = re.sub(r"[_\-]+", " ", chapter)
+    diseases = set(_tags(text, _DISEASE_RES, 1)) | set(_tags(hint, _DISEASE_RES, 1))
+    plant_parts = set(_tags(text, _PART_RES, MIN_MENTIONS)) | set(_tags(hint, _PART_RES, 1))
+    pathogen_types = set(_tags(text, _TYPE_RES, MIN_MENTIONS)) | set(_tags(hint, _TYPE_RES, 1))
+    pathogen_types |= {DISEASES[d][0] for d in diseases}
+    return {
+        "diseases": sorted(diseases),
+        "plant_parts": sorted(plant_parts),
+        "pathogen_types": sorted(pathogen_types),
+        "chapter": chapter,
+    }
+
+
+def enrich_metadata(chunks: List[Document]) -> List[Document]:
+    """Add derived tags to each chunk's metadata in place and return the chunks."""
+    for chunk in chunks:
+        chunk.metadata.update(derive_metadata(chunk.page_content, chunk.metadata.get("source", "")))
+    return chunks
+
+
+def infer_filters(query: str) -> Dict[str, List[str]]:
+    """Return the metadata filter implied by a query's disease, plant part and pathogen terms."""
+    filters = {
+        "diseases": _tags(query, _DISEASE_RES, 1),
+        "plant_parts": _tags(query, _PART_RES, 1),
+        "pathogen_types": _tags(query, _TYPE_RES, 1),
+    }
+    return {field: values for field, values in filters.items() if values}
+
+
+def matches(metadata: dict, filters: Dict[str, List[str]]) -> bool:
+    """True if, for every filtered field, the chunk has at least one of the wanted tags."""
+    for field, wanted in filters.items():
+        have = metadata.get(field)
+        have = have if isinstance(have, (list, tuple, set)) else [have]
+        if not set(have) & set(wanted):
+            return False
+    return True
@@ -0,0 +1,94 @@
+"""Threaded generator pipelines joined by bounded queues.
+
+`run_pipeline(source, *stages)` runs the source and each stage in its own
+thread. A stage is a function from an iterator of inputs to an iterator of
+outputs (usually a generator), so it can map, filter, batch or keep state
+across items. Consecutive stages are joined by queues of at most `maxsize`
+items: a slow stage blocks the ones before it instead of letting work pile
+up, so memory is bounded by the queue sizes whatever the input length, and
+stages waiting on I/O (embedding requests) overlap with CPU-bound ones (PDF
+parsing, splitting).
+
+An exception raised by any stage is re-raised to the consumer; closing the
+returned iterator early stops every stage.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+
+# Seconds between checks of the stop flag while blocked on a queue
+_POLL = 0.1
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(q: queue.Queue, stop: threading.Event) -> Iterator[Any]:
+    while True:
+        try:
+            item = q.get(timeout=_POLL)
+        except queue.Empty:
+            if stop.is_set():
+                return
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _Failed):
+            raise item.error
+        yield item
+
+
+def _pump(produce: Callable[[], Iterable[Any]], q: queue.Queue, stop: threading.Event) -> None:
+    try:
+        for item in produce():
+            if not _put(q, item, stop):
+                return
+        _put(q, _DONE, stop)
+    except BaseException as e:
+        # Passed downstream so the consumer re-raises it
+        _put(q, _Failed(e), stop)
+
+
+def run_pipeline(
+    source: Iterable[Any],
+    *stages: Callable[[Iterator[Any]], Iterable[Any]],
+    maxsize: int = 4,
+) -> Iterator[Any]:
+    """Return an iterator over the last stage's outputs; the stages start when it is first advanced."""
+    stop = threading.Event()
+    q: queue.Queue = queue.Queue(maxsize)
+    threads = [threading.Thread(target=_pump, args=(lambda: source, q, stop), daemon=True)]
+    for stage in stages:
+        out: queue.Queue = queue.Queue(maxsize)
+        produce = lambda stage=stage, inputs=q: stage(_drain(inputs, stop))  # noqa: E731
+        threads.append(threading.Thread(target=_pump, args=(produce, out, stop), daemon=True))
+        q = out
+
+    def consume() -> Iterator[Any]:
+        for thread in threads:
+            thread.start()
+        try:
+            yield from _drain(q, stop)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    return consume()
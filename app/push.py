@@ -0,0 +1,327 @@
+"""Background delivery of A2A push notifications.
+
+`BasePushNotificationSender` posts every task update to every webhook
+inline: the request handler awaits the POSTs before it processes the next
+event, so a slow or unreachable receiver delays the task's own status
+updates. `QueuedPushNotificationSender` only enqueues, and a bounded pool of
+`PUSH_WORKERS` asyncio workers delivers:
+- per destination (webhook URL) queues of at most `PUSH_QUEUE_SIZE`
+  notifications; when one is full its oldest notification is dropped;
+- coalescing: a notification carries the whole task, so a newer update of a
+  task still queued for a destination replaces the queued one;
+- one worker at a time per destination, which keeps each receiver's updates
+  in order and lets a dead receiver hold up at most one worker; a worker
+  sends up to `DELIVERIES_PER_TURN` queued notifications to a destination
+  over one keep-alive connection before moving on to the next destination;
+- retries of network errors, timeouts (`PUSH_TIMEOUT`), 429 and 5xx with
+  exponential backoff and jitter per destination, up to `PUSH_MAX_ATTEMPTS`
+  attempts; other 4xx responses are not retried.
+
+A destination's queue is dropped once it is empty and the destination is
+neither being served nor backing off, so webhooks used once do not
+accumulate; its counters are kept apart for the `DESTINATION_STATS_SIZE`
+most recently used URLs.
+
+`stats()` reports queue depths, delivered/retried/coalesced/dropped/failed
+counts and delivery latency percentiles (from the first queued update to
+delivery), overall and per recently used destination.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+import httpx
+from a2a.server.tasks import PushNotificationConfigStore, PushNotificationSender
+from a2a.types import PushNotificationConfig, Task
+
+from app.stats import percentiles
+
+
+logger = logging.getLogger(__name__)
+
+# Notifications sent to one destination before its worker serves another
+DELIVERIES_PER_TURN = 16
+
+# Backoff after a failed delivery: RETRY_BASE * 2^(consecutive failures - 1), at most RETRY_MAX seconds
+RETRY_BASE = 0.5
+RETRY_MAX = 30.0
+
+# Delivery latencies kept for the percentiles in `stats`, overall and per destination
+LATENCY_WINDOW = 1000
+DESTINATION_LATENCY_WINDOW = 100
+
+# Webhook URLs whose counters are kept, least recently used dropped first
+DESTINATION_STATS_SIZE = 1000
+
+_DELIVERED, _RETRY, _REJECTED = "delivered", "retry", "rejected"
+
+
+def _push_workers() -> int:
+    """Concurrent deliveries from `PUSH_WORKERS` (default 8)."""
+    return max(1, int(os.environ.get("PUSH_WORKERS", "8")))
+
+
+def _push_queue_size() -> int:
+    """Notifications queued per destination from `PUSH_QUEUE_SIZE` (default 1000)."""
+    return max(1, int(os.environ.get("PUSH_QUEUE_SIZE", "1000")))
+
+
+def _push_max_attempts() -> int:
+    """Delivery attempts per notification from `PUSH_MAX_ATTEMPTS` (default 5)."""
+    return max(1, int(os.environ.get("PUSH_MAX_ATTEMPTS", "5")))
+
+
+def _push_timeout() -> float:
+    """Seconds per webhook POST from `PUSH_TIMEOUT` (default 10)."""
+    return float(os.environ.get("PUSH_TIMEOUT", "10"))
+
+
+@dataclass
+class _Notification:
+    task_id: str
+    payload: dict
+    headers: Optional[Dict[str, str]]
+    queued_at: float  # monotonic time of the first update this notification coalesced
+    attempts: int = 0
+
+
+class _DestinationStats:
+    """Counters of one webhook URL; they outlive its queue."""
+
+    def __init__(self):
+        self.failures = 0  # consecutive failed deliveries
+        self.delivered = 0
+        self.failed = 0
+        self.latencies: Deque[float] = collections.deque(maxlen=DESTINATION_LATENCY_WINDOW)
+
+
+class _Destination:
+    """Queue of one webhook URL, while it has notifications to deliver."""
+
+    def __init__(self, url: str, stats: _DestinationStats):
+        self.url = url
+        self.stats = stats
+        # (task id, token) -> latest notification, in first-queued order
+        self.pending: "collections.OrderedDict[Tuple[str, Optional[str]], _Notification]" = (
+            collections.OrderedDict()
+        )
+        self.scheduled = False  # waiting for a worker, being served, or backing off
+
+
+class QueuedPushNotificationSender(PushNotificationSender):
+    """Push sender that returns after enqueueing; workers deliver in the background.
+
+    Workers start with the first notification (inside the server's event
+    loop); `aclose` drains the queues for a while and stops them.
+    """
+
+    def __init__(
+        self,
+        httpx_client: Optional[httpx.AsyncClient],
+        config_store: PushNotificationConfigStore,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.workers = workers or _push_workers()
+        self.queue_size = queue_size or _push_queue_size()
+        self.max_attempts = max_attempts or _push_max_attempts()
+        self._client = httpx_client or httpx.AsyncClient(
+            timeout=_push_timeout(),
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+        )
+        self._config_store = config_store
+        self._destinations: Dict[str, _Destination] = {}
+        # URL -> counters, least recently used first
+        self._stats: "collections.OrderedDict[str, _DestinationStats]" = collections.OrderedDict()
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._latencies: Deque[float] = collections.deque(maxlen=LATENCY_WINDOW)
+        self.counts: Dict[str, int] = collections.Counter()
+
+    # -- enqueueing -------------------------------------------------------------
+
+    async def send_notification(self, task: Task) -> None:
+        """Queue the task's current state for each of its push configs."""
+        push_configs = await self._config_store.get_info(task.id)
+        if not push_configs:
+            return
+        self._start()
+        payload = task.model_dump(mode="json", exclude_none=True)
+        for push_info in push_configs:
+            self._enqueue(task.id, payload, push_info)
+
+    def _enqueue(self, task_id: str, payload: dict, push_info: PushNotificationConfig) -> None:
+        destination = self._destinations.get(push_info.url)
+        if destination is None:
+            stats = self._stats_of(push_info.url)
+            destination = self._destinations[push_info.url] = _Destination(push_info.url, stats)
+        else:
+            self._stats_of(push_info.url, destination.stats)
+        headers = {"X-A2A-Notification-Token": push_info.token} if push_info.token else None
+        key = (task_id, push_info.token)
+        queued = destination.pending.get(key)
+        if queued is not None:
+            # The newer state supersedes the queued one; it keeps its place and queue time
+            queued.payload, queued.headers, queued.attempts = payload, headers, 0
+            self.counts["coalesced"] += 1
+        else:
+            if len(destination.pending) >= self.queue_size:
+                _, dropped = destination.pending.popitem(last=False)
+                self.counts["dropped"] += 1
+                logger.warning("Push queue for %s is full; dropped an update of task %s", push_info.url, dropped.task_id)
+            destination.pending[key] = _Notification(task_id, payload, headers, time.monotonic())
+            self.counts["enqueued"] += 1
+        self._schedule(destination)
+
+    def _stats_of(self, url: str, stats: Optional[_DestinationStats] = None) -> _DestinationStats:
+        """Return the counters of `url` (`stats` if given) as the most recently used."""
+        known = self._stats.pop(url, None)
+        stats = stats or known or _DestinationStats()
+        self._stats[url] = stats
+        while len(self._stats) > DESTINATION_STATS_SIZE:
+            self._stats.popitem(last=False)
+        return stats
+
+    def _schedule(self, destination: _Destination) -> None:
+        if not destination.scheduled and destination.pending and self._ready is not None:
+            destination.scheduled = True
+            self._ready.put_nowait(destination)
+
+    def _reschedule(self, destination: _Destination) -> None:
+        destination.scheduled = False
+        if destination.pending:
+            self._schedule(destination)
+        elif self._destinations.get(destination.url) is destination:
+            # Idle: a later notification starts a fresh queue (its counters are kept)
+            del self._destinations[destination.url]
+
+    # -- delivery ---------------------------------------------------------------
+
+    def _start(self) -> None:
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"push-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def _work(self) -> None:
+        while True:
+            destination = await self._ready.get()
+            try:
+                await self._serve(destination)
+            except Exception:
+                logger.exception("Push worker failed serving %s", destination.url)
+                self._reschedule(destination)
+
+    async def _serve(self, destination: _Destination) -> None:
+        for _ in range(DELIVERIES_PER_TURN):
+            if not destination.pending:
+                break
+            key, notification = destination.pending.popitem(last=False)
+            notification.attempts += 1
+            try:
+                outcome = await self._deliver(destination.url, notification)
+            except asyncio.CancelledError:
+                # Stopped by `aclose`: the notification counts as still queued
+                if key not in destination.pending:
+                    destination.pending[key] = notification
+                    destination.pending.move_to_end(key, last=False)
+                raise
+            except Exception:
+                logger.exception("Unexpected error delivering push notification to %s", destination.url)
+                outcome = _REJECTED
+            stats = destination.stats
+            if outcome == _DELIVERED:
+                stats.failures = 0
+                stats.delivered += 1
+                self.counts["delivered"] += 1
+                latency = time.monotonic() - notification.queued_at
+                self._latencies.append(latency)
+                stats.latencies.append(latency)
+                continue
+            if outcome == _REJECTED:
+                self._give_up(destination, notification)
+                continue
+            stats.failures += 1
+            if notification.attempts < self.max_attempts:
+                if key not in destination.pending:
+                    # Retried before anything else queued for this destination
+                    destination.pending[key] = notification
+                    destination.pending.move_to_end(key, last=False)
+                self.counts["retries"] += 1
+            else:
+                self._give_up(destination, notification)
+            # The whole destination backs off; a newer update of the task replaces the retry
+            delay = min(RETRY_MAX, RETRY_BASE * 2 ** (stats.failures - 1)) * random.uniform(0.5, 1.0)
+            asyncio.get_running_loop().call_later(delay, self._reschedule, destination)
+            return
+        # Back of the line, so busy destinations share the workers fairly
+        self._reschedule(destination)
+
+    def _give_up(self, destination: _Destination, notification: _Notification) -> None:
+        destination.stats.failed += 1
+        self.counts["failed"] += 1
+        logger.warning(
+            "Giving up push notification for task %s to %s after %d attempt(s)",
+            notification.task_id, destination.url, notification.attempts,
+        )
+
+    async def _deliver(self, url: str, notification: _Notification) -> str:
+        try:
+            response = await self._client.post(url, json=notification.payload, headers=notification.headers)
+        except httpx.HTTPError as e:
+            logger.info("Push notification for task %s to %s failed: %r", notification.task_id, url, e)
+            return _RETRY
+        if response.status_code == 429 or response.status_code >= 500:
+            return _RETRY
+        if response.status_code >= 400:
+            return _REJECTED
+        return _DELIVERED
+
+    # -- reporting and shutdown ----------------------------------------------------
+
+    def stats(self) -> Dict[str, object]:
+        """Queue depths, delivery counters and delivery latency percentiles (seconds).
+
+        Per-destination entries cover 20 destinations: those with the most
+        queued notifications, then the most recently used.
+        """
+        queued = {url: len(d.pending) for url, d in self._destinations.items()}
+        recent = sorted(reversed(self._stats), key=lambda url: queued.get(url, 0), reverse=True)[:20]
+        return {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "queued": sum(len(d.pending) for d in self._destinations.values()),
+            **{name: self.counts[name] for name in ("enqueued", "delivered", "retries", "coalesced", "dropped", "failed")},
+            "latency_s": percentiles(self._latencies),
+            "destinations": {
+                url: {
+                    "queued": queued.get(url, 0),
+                    "delivered": self._stats[url].delivered,
+                    "failed": self._stats[url].failed,
+                    "consecutive_failures": self._stats[url].failures,
+                    "latency_s": percentiles(self._stats[url].latencies),
+                }
+                for url in recent
+            },
+        }
+
+    async def aclose(self, timeout: float = 5.0) -> None:
+        """Deliver what is queued for up to `timeout` seconds, then stop the workers."""
+        deadline = time.monotonic() + timeout
+        while self._tasks and any(d.pending for d in self._destinations.values()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for worker in self._tasks:
+            worker.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._client.aclose()
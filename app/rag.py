@@ -1,64 +1,109 @@
 """Retrieval-Augmented Generation (RAG) utilities and tool.
 
 This module builds an in-memory RAG pipeline that:
-- Loads PDF documents from `RAG_DATA_DIR` (default: "data").
-- Splits documents into chunks using a token-aware splitter.
-- Embeds chunks with OpenAI and stores vectors in an in-memory Qdrant store.
+- Loads PDF documents from `RAG_DATA_DIR` (default: "data"), reading page
+  texts from a compact extracted-text store (see `app.textstore`).
+- Splits documents into chunks using a token-aware splitter and collapses
+  near-duplicate chunks (see `app.dedup`).
+- Tags chunks with disease, plant part, pathogen type and chapter metadata
+  (see `app.metadata`) so retrieval can pre-filter on them.
+- Embeds chunks with OpenAI and stores vectors in an in-memory Qdrant store,
+  re-indexing added, modified or deleted PDFs while the server runs.
+- Keeps chunk texts and metadata in a compact chunk store (see
+  `app.chunkstore`); the vector index refers to chunks by id and only the
+  retrieved chunks are turned into Documents.
+- With quantized vectors, narrows each search to the most relevant PDFs and
+  sections with a coarse index of file and section centroids (see
+  `app.hierarchy`), then searches the chunks within them.
 - Exposes a LangChain Tool `retrieve_information` that retrieves relevant
-- context and generates a response constrained to that context.
+- context and generates a response constrained to that context, packed into a
+  bounded token budget (see `app.context`).
 """
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
-from functools import lru_cache
-from typing import Annotated, List
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Annotated, Dict, Iterator, List, Optional, Sequence, Tuple
 
-import tiktoken
-from langchain_community.document_loaders import DirectoryLoader, PyMuPDFLoader
-from langchain_community.vectorstores import Qdrant
+import click
+import numpy as np
 from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
-from langchain_openai.embeddings import OpenAIEmbeddings
-from langgraph.graph import START, StateGraph
 from typing_extensions import TypedDict
 
+from app.chunkstore import ChunkStore
+from app.context import pack_context
+from app.dedup import Deduplicator
+from app.embeddings import BatchingEmbeddings
+from app.hierarchy import SectionIndex, coarse_files
+from app.metadata import enrich_metadata, infer_filters
+from app.singleflight import SingleFlight, once
+from app.pipeline import run_pipeline
+from app.textstore import (
+    extract_library,
+    file_hash,
+    iter_extract,
+    list_pdfs,
+    parse_pdf,
+    TextStore,
+)
+from app.vectorstore import QuantizedVectorStore
+from app.watcher import LibraryWatcher
 
-def _tiktoken_len(text: str) -> int:
+
+logger = logging.getLogger(__name__)
+
+
+def tiktoken_len(text: str) -> int:
     """Return token length using tiktoken; used for chunk length measurement."""
+    import tiktoken
+
     tokens = tiktoken.encoding_for_model("gpt-4o").encode(text)
     return len(tokens)
 
 
-class _RAGState(TypedDict):
+class _RAGState(TypedDict, total=False):
     """State schema for the simple two-step RAG graph: retrieve then generate."""
     question: str
+    filters: Dict[str, List[str]]
     context: List[Document]
     response: str
 
 
-def _build_rag_graph(data_dir: str):
-    """Construct and compile a minimal RAG graph.
+def _text_store_dir(data_dir: str) -> Optional[str]:
+    """Extracted-text store directory from `RAG_TEXT_STORE` (default `<data_dir>/.text_store`; "off" disables)."""
+    store_dir = os.environ.get("RAG_TEXT_STORE", os.path.join(data_dir, ".text_store"))
+    return None if store_dir.lower() in ("", "0", "off", "none") else store_dir
 
-    Steps:
-    1) Load PDFs from `data_dir` recursively (best-effort).
-    2) Split documents into token-aware chunks.
-    3) Create embeddings and an in-memory Qdrant vector store retriever.
-    4) Define a chat prompt and generation model.
-    5) Wire a two-node graph: retrieve -> generate.
+
+def _openai_base_url(variable: str) -> Optional[str]:
+    """API base URL from `variable`, else `OPENAI_BASE_URL` (None: the OpenAI default)."""
+    return os.environ.get(variable) or os.environ.get("OPENAI_BASE_URL") or None
+
+
+def openai_embeddings():
+    """Return the OpenAI embedding model used for the library (imported on first use).
+
+    `RAG_EMBEDDING_URL` points it at another OpenAI-compatible server, such
+    as the local stand-in in `app.fake_openai`.
     """
-    # Load PDFs from data directory (recursive)
-    try:
-        directory_loader = DirectoryLoader(
-            data_dir, glob="**/*.pdf", loader_cls=PyMuPDFLoader
-        )
-        documents = directory_loader.load()
-    except Exception:
-        documents = []
+    from langchain_openai.embeddings import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(model="text-embedding-3-small", base_url=_openai_base_url("RAG_EMBEDDING_URL"))
+
 
-    # Split documents
+def _text_splitter():
+    """Return the token-aware splitter used for chunking."""
     try:
         from langchain_text_splitters import RecursiveCharacterTextSplitter
     except Exception:
@@ -67,17 +112,443 @@ def _build_rag_graph(data_dir: str):
             RecursiveCharacterTextSplitter,
         )
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=750, chunk_overlap=0, length_function=_tiktoken_len
+    return RecursiveCharacterTextSplitter(
+        chunk_size=750, chunk_overlap=0, length_function=tiktoken_len, add_start_index=True
     )
-    chunks = text_splitter.split_documents(documents) if documents else []
 
-    # Embeddings and vector store (in-memory Qdrant)
-    embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
-    qdrant_vectorstore = Qdrant.from_documents(
-        documents=chunks, embedding=embedding_model, location=":memory:"
-    )
-    retriever = qdrant_vectorstore.as_retriever()
+
+def _split_documents(documents: List[Document]) -> List[Document]:
+    """Split page documents into token-aware chunks."""
+    return _text_splitter().split_documents(documents) if documents else []
+
+
+def dedup_threshold() -> float:
+    """Near-duplicate threshold from `RAG_DEDUP_THRESHOLD` (default 0.85; 0 disables)."""
+    return float(os.environ.get("RAG_DEDUP_THRESHOLD", "0.85"))
+
+
+def _context_token_budget() -> int:
+    """Token budget for the generate CONTEXT from `RAG_CONTEXT_TOKEN_BUDGET` (0 = unlimited)."""
+    return int(os.environ.get("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+
+
+def _auto_filter_enabled() -> bool:
+    """Whether `retrieve` pre-filters on tags inferred from the query (`RAG_AUTO_FILTER`, default on)."""
+    return os.environ.get("RAG_AUTO_FILTER", "1").lower() not in ("0", "false", "no")
+
+
+class _VectorIndex:
+    """Chunk vectors of one index generation, addressed by `ChunkStore` chunk id.
+
+    By default this is an in-memory Qdrant collection holding float32 vectors.
+    Set `RAG_VECTOR_QUANTIZATION` to "int8" or "binary" to keep compact codes
+    instead (see `app.vectorstore`), and `RAG_RESCORE_OVERSAMPLING` (e.g. 4)
+    to re-rank `k * oversampling` candidates with full-precision vectors kept
+    in a memory-mapped temporary file. Vectors are added in chunk id order and
+    carry no payload: texts and metadata live in the `ChunkStore`.
+    """
+
+    def __init__(self, embedding_model):
+        self.embedding_model = embedding_model
+        self.quantization = os.environ.get("RAG_VECTOR_QUANTIZATION", "none").lower()
+        self.count = 0
+        self.dim = 0
+        self._store: Optional[QuantizedVectorStore] = None
+        self._client = None
+        self._collection = uuid.uuid4().hex
+
+    def add(self, vectors: Sequence) -> None:
+        if not len(vectors):
+            return
+        self.dim = len(vectors[0])
+        if self.quantization not in ("", "none"):
+            if self._store is None:
+                self._store = QuantizedVectorStore(
+                    quantization=self.quantization,
+                    rescore_oversampling=float(os.environ.get("RAG_RESCORE_OVERSAMPLING", "0")),
+                )
+            self._store.add_vectors(vectors)
+        else:
+            from qdrant_client import QdrantClient
+            from qdrant_client.http import models as rest
+
+            if self._client is None:
+                self._client = QdrantClient(location=":memory:")
+                self._client.create_collection(
+                    collection_name=self._collection,
+                    vectors_config=rest.VectorParams(size=len(vectors[0]), distance=rest.Distance.COSINE),
+                )
+            self._client.upsert(
+                collection_name=self._collection,
+                points=[
+                    rest.PointStruct(id=chunk_id, vector=np.asarray(vector, dtype=np.float32).tolist())
+                    for chunk_id, vector in enumerate(vectors, start=self.count)
+                ],
+            )
+        self.count += len(vectors)
+
+    def memory_bytes(self) -> int:
+        """Bytes of vector data in RAM: the quantized codes, or float32 vectors held by Qdrant."""
+        if self._store is not None:
+            return self._store.memory_bytes()
+        return self.count * self.dim * 4
+
+    def finish(self) -> "_VectorIndex":
+        """Complete the index after the last `add` (re-encodes rows quantized with an outdated scale)."""
+        if self._store is not None:
+            self._store.finish()
+        return self
+
+    def disk_bytes(self) -> int:
+        """Bytes of full-precision vectors spilled to disk next to quantized codes."""
+        return self._store.disk_bytes() if self._store is not None else 0
+
+    def vectors(self, ids: Sequence[int]) -> np.ndarray:
+        """Return the float32 vectors of chunk `ids` (normalised to unit length)."""
+        if self._store is not None:
+            return self._store.vectors(ids)
+        if not len(ids):
+            return np.zeros((0, self.dim), dtype=np.float32)
+        points = self._client.retrieve(
+            collection_name=self._collection, ids=[int(i) for i in ids], with_vectors=True
+        )
+        by_id = {int(point.id): point.vector for point in points}
+        return np.asarray([by_id[int(i)] for i in ids], dtype=np.float32)
+
+    def search(self, vector: Sequence[float], k: int, ids: Optional[np.ndarray] = None) -> List[int]:
+        """Return the ids of the `k` chunks closest to query `vector`, optionally among sorted `ids`."""
+        if not self.count or (ids is not None and not len(ids)):
+            return []
+        if self._store is not None:
+            return [row for row, _ in self._store.search_rows(vector, k, ids)]
+        from qdrant_client.http import models as rest
+
+        query_filter = None
+        if ids is not None:
+            query_filter = rest.Filter(must=[rest.HasIdCondition(has_id=[int(i) for i in ids])])
+        points = self._client.query_points(
+            collection_name=self._collection, query=vector, query_filter=query_filter, limit=k
+        ).points
+        return [int(point.id) for point in points]
+
+
+def _text_key(text: str) -> int:
+    """Key of a chunk text in `RAGIndex.keys`: a 64-bit digest instead of the text itself."""
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _key_table(keys: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort chunk text keys (in chunk id order) into (sorted keys, chunk id of each)."""
+    keys = np.asarray(keys, dtype=np.uint64)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], order.astype(np.int64)
+
+
+@dataclass(frozen=True)
+class RAGIndex:
+    """One immutable generation of the index; replaced as a whole on reload."""
+    vectors: Optional[_VectorIndex] = None
+    chunks: ChunkStore = field(default_factory=ChunkStore)
+    files: Dict[str, str] = field(default_factory=dict)  # PDF path -> SHA-256
+    sections: Optional[SectionIndex] = None
+    # `_text_key` of every chunk, sorted, and the chunk id of each: finds the
+    # vector of an already embedded text when the next generation is built
+    keys: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint64))
+    key_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    def find(self, keys: Sequence[int]) -> np.ndarray:
+        """Return the chunk id holding each text key, or -1 where the index has none."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        at = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[at] == keys, self.key_ids[at], -1)
+
+    def search(self, question: str, k: int, filters: Optional[Dict[str, List[str]]] = None) -> List[int]:
+        """Return the ids of the top-`k` chunks for `question`, among those matching `filters`.
+
+        The coarse file/section index, if built, first narrows the search to
+        the chunks of the most relevant sections; if they cannot fill the
+        top-k, every matching chunk is searched.
+        """
+        if self.vectors is None:
+            return []
+        vector = self.vectors.embedding_model.embed_query(question)
+        ids = self.chunks.filter_ids(filters) if filters else None
+        if self.sections is not None:
+            narrowed = self.sections.candidates(vector, ids)
+            if narrowed is not None and len(narrowed) >= k:
+                ids = narrowed
+        return self.vectors.search(vector, k, ids)
+
+
+# PDFs, chunk lists or embedding batches buffered between refresh stages
+INGEST_QUEUE_SIZE = 4
+
+
+def _ingest_batch_size() -> int:
+    """Chunks per embedding request and index upsert during refresh (`RAG_INGEST_BATCH_SIZE`, default 256)."""
+    return int(os.environ.get("RAG_INGEST_BATCH_SIZE", "256"))
+
+
+def _watch_interval() -> float:
+    """Seconds between PDF library polls from `RAG_WATCH_INTERVAL` (default 30; 0 disables)."""
+    return float(os.environ.get("RAG_WATCH_INTERVAL", "30"))
+
+
+def _parse_or_skip(path: str) -> List[Document]:
+    try:
+        return parse_pdf(path)
+    except Exception:
+        logger.warning("Skipping unreadable PDF %s", path, exc_info=True)
+        return []
+
+
+class IndexBuilder:
+    """Collects the (chunks, vectors, text keys) batches of a refresh into a new `RAGIndex`."""
+
+    def __init__(self, embedding_model):
+        self.chunks = ChunkStore()
+        self.vectors = _VectorIndex(embedding_model)
+        files = coarse_files(self.vectors.quantization not in ("", "none"))
+        self.sections = SectionIndex(files) if files > 0 else None
+        self.keys = array("Q")
+
+    def add(self, chunks: List[Document], vectors: np.ndarray, keys: List[int]) -> None:
+        # Kept chunks arrive in order, so chunk ids match the dedup's kept indexes
+        self.chunks.extend(chunks)
+        self.vectors.add(vectors)
+        if self.sections is not None:
+            self.sections.add(
+                [chunk.metadata.get("source") for chunk in chunks],
+                [chunk.metadata.get("page") for chunk in chunks],
+                vectors,
+            )
+        self.keys.extend(keys)
+
+    def finish(self, files: Dict[str, str], deduplicator: Deduplicator) -> RAGIndex:
+        # Canonical chunks that gained duplicates after they were stored
+        for chunk_id, metadata in deduplicator.updated.items():
+            self.chunks.set_duplicates(chunk_id, metadata["duplicates"])
+        vectors = self.vectors.finish() if self.vectors.count else None
+        keys, key_ids = _key_table(self.keys)
+        sections = self.sections.finish() if self.sections is not None else None
+        return RAGIndex(vectors, self.chunks, files, sections, keys, key_ids)
+
+
+class RAGLibrary:
+    """The PDF library of `data_dir` and the live vector index built from it.
+
+    `refresh` re-reads the library and publishes a new `RAGIndex` by a single
+    attribute assignment, so queries holding the previous index finish on it
+    and never see a partially built one. Work is incremental where it costs:
+    pages of unchanged PDFs come from the extracted-text store, and chunks
+    whose text the previous index already holds copy their vector from it
+    (found by `_text_key`), so only new chunk texts are sent to the
+    embedding model. Splitting, tagging, dedup and the index are redone
+    over the whole corpus, which is cheap next to parsing and embedding,
+    and nothing but the live index is kept between refreshes.
+
+    A refresh streams PDF pages -> chunks -> dedup -> embedding batches ->
+    index upserts through threads joined by small bounded queues (see
+    `app.pipeline`): at most a few PDFs' pages and embedding batches are in
+    flight at once, and embedding requests overlap with PDF parsing.
+    """
+
+    def __init__(self, data_dir: str, embedding_model=None):
+        self.data_dir = data_dir
+        self.embedding_model = embedding_model or openai_embeddings()
+        # Question embeddings are micro-batched across concurrent queries and cached
+        self.query_embeddings = BatchingEmbeddings(self.embedding_model)
+        self.index = RAGIndex()
+        self._refresh_lock = threading.Lock()
+        self._watcher: Optional[LibraryWatcher] = None
+        # Epoch time and duration of the last refresh that rebuilt the index
+        self.indexed_at: Optional[float] = None
+        self.index_seconds = 0.0
+        # Prefetched retrievals of the previous index dropped by that refresh
+        self.prefetches_dropped = 0
+
+    def iter_pages(self, digests: Dict[str, str]) -> Iterator[Tuple[str, List[Document]]]:
+        """Yield (path, page Documents) per PDF, from the extracted-text store when possible."""
+        done = set()
+        store: Optional[TextStore] = None
+        store_dir = _text_store_dir(self.data_dir)
+        if store_dir:
+            try:
+                for path, digest, pages in iter_extract(self.data_dir, store_dir, digests):
+                    done.add(path)
+                    yield path, pages
+                store = TextStore(store_dir)
+            except Exception:
+                # e.g. a read-only data directory: parse the remaining PDFs directly
+                logger.warning(
+                    "Extracted-text store %s failed; parsing the remaining PDFs directly", store_dir, exc_info=True
+                )
+        try:
+            # Identical copies under other paths, or everything if the store failed
+            for path, digest in digests.items():
+                if path in done:
+                    continue
+                if store is not None and digest in store:
+                    yield path, store.documents(digest, path)
+                elif store is None or digest not in store.failed:
+                    yield path, _parse_or_skip(path)
+        finally:
+            if store is not None:
+                store.close()
+
+    def chunk_stage(self, files: Iterator[Tuple[str, List[Document]]]) -> Iterator[List[Document]]:
+        """Split and tag each PDF's pages."""
+        for _, pages in files:
+            yield enrich_metadata(_split_documents(pages))
+
+    def embed_stage(
+        self, chunk_lists: Iterator[List[Document]], previous: RAGIndex
+    ) -> Iterator[Tuple[List[Document], np.ndarray, List[int]]]:
+        """Regroup chunks into batches of (chunks, vectors, text keys)."""
+        size = _ingest_batch_size()
+        batch: List[Document] = []
+        for chunks in chunk_lists:
+            batch.extend(chunks)
+            while len(batch) >= size:
+                yield self._with_vectors(batch[:size], previous)
+                batch = batch[size:]
+        if batch:
+            yield self._with_vectors(batch, previous)
+
+    def _with_vectors(
+        self, chunks: List[Document], previous: RAGIndex
+    ) -> Tuple[List[Document], np.ndarray, List[int]]:
+        """Pair chunks with vectors copied from `previous` or, for new texts, embedded now."""
+        keys = [_text_key(c.page_content) for c in chunks]
+        ids = previous.find(keys) if previous.vectors is not None else np.full(len(keys), -1)
+        vectors = np.zeros((len(chunks), 0), dtype=np.float32)
+        reused = np.flatnonzero(ids >= 0)
+        if len(reused):
+            copied = previous.vectors.vectors(ids[reused])
+            vectors = np.zeros((len(chunks), copied.shape[1]), dtype=np.float32)
+            vectors[reused] = copied
+        missing: Dict[int, List[int]] = {}  # text key -> positions, so repeated texts are embedded once
+        for position in np.flatnonzero(ids < 0):
+            missing.setdefault(keys[position], []).append(int(position))
+        if missing:
+            texts = [chunks[positions[0]].page_content for positions in missing.values()]
+            embedded = np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32)
+            if not vectors.shape[1]:
+                vectors = np.zeros((len(chunks), embedded.shape[1]), dtype=np.float32)
+            for positions, vector in zip(missing.values(), embedded):
+                vectors[positions] = vector
+        return chunks, vectors, keys
+
+    def refresh(self, force: bool = False) -> bool:
+        """Bring the index up to date with `data_dir`; return True if it changed.
+
+        With `force` the index is rebuilt even if no PDF changed, and every
+        chunk is embedded again instead of copying vectors from the
+        previous index. Retrievals prefetched from the previous index are
+        dropped whenever it is replaced, whichever path (watcher, admin,
+        startup) refreshed it.
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            digests = {path: file_hash(path) for path in list_pdfs(self.data_dir)}
+            if not force and self.index.vectors is not None and digests == self.index.files:
+                return False
+            previous = RAGIndex() if force else self.index
+
+            deduplicator = Deduplicator(dedup_threshold())
+            builder = IndexBuilder(self.query_embeddings)
+            for batch in run_pipeline(
+                self.iter_pages(digests),
+                self.chunk_stage,
+                deduplicator.stage,
+                lambda chunk_lists: self.embed_stage(chunk_lists, previous),
+                maxsize=INGEST_QUEUE_SIZE,
+            ):
+                builder.add(*batch)
+            self.index = builder.finish(digests, deduplicator)
+            self.prefetches_dropped = clear_prefetches()
+            self.indexed_at, self.index_seconds = time.time(), time.perf_counter() - started
+            return True
+
+    def stats(self) -> Dict[str, object]:
+        """Size of the live index: chunks, vectors and the tables kept next to them."""
+        index = self.index
+        return {
+            "data_dir": self.data_dir,
+            "files": len(index.files),
+            "pages": index.chunks.page_count(),  # pages with at least one indexed chunk
+            "chunks": len(index.chunks),
+            "sections": len(index.sections) if index.sections is not None else 0,
+            "vectors": index.vectors.count if index.vectors is not None else 0,
+            "vector_bytes": index.vectors.memory_bytes() if index.vectors is not None else 0,
+            "vector_disk_bytes": index.vectors.disk_bytes() if index.vectors is not None else 0,
+            "quantization": index.vectors.quantization if index.vectors is not None else None,
+            "chunk_store_bytes": index.chunks.nbytes(),
+            "section_bytes": index.sections.nbytes() if index.sections is not None else 0,
+            "text_key_bytes": index.keys.nbytes + index.key_ids.nbytes,
+            "indexed_at": self.indexed_at,
+            "index_seconds": self.index_seconds,
+            "watching": self._watcher is not None,
+        }
+
+    def watch(self, interval: float) -> LibraryWatcher:
+        """Start polling `data_dir` every `interval` seconds and refresh on changes."""
+        if self._watcher is None:
+            self._watcher = LibraryWatcher(
+                self.data_dir, lambda changes: self.refresh(), interval
+            ).start()
+        return self._watcher
+
+
+def _top_k() -> int:
+    """Chunks retrieved per query from `RAG_TOP_K` (default 4)."""
+    return int(os.environ.get("RAG_TOP_K", "4"))
+
+
+def _query_filters(question: str, filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+    """Filters a retrieval for `question` applies: tags inferred from it, overridden by explicit `filters`."""
+    merged = dict(infer_filters(question)) if _auto_filter_enabled() else {}
+    merged.update(filters or {})
+    return merged
+
+
+def _retrieve(index: RAGIndex, question: str, filters: Dict[str, List[str]]) -> List[Document]:
+    """Return the top-k chunks for `question` as Documents, preferring chunks matching `filters`."""
+    top_k = _top_k()
+    ids = index.search(question, top_k, filters)
+    if filters and len(ids) < top_k:
+        # Too little tagged evidence: top up from the unfiltered index
+        ids += [i for i in index.search(question, top_k) if i not in ids][: top_k - len(ids)]
+    # Only the retrieved chunks become Documents
+    return index.chunks.documents(ids)
+
+
+def _build_rag_graph(data_dir: str, embedding_model=None, generator_llm=None):
+    """Construct and compile a minimal RAG graph.
+
+    `embedding_model` and `generator_llm` default to the OpenAI models; pass
+    stand-ins (see `app.fakes`) to build the pipeline offline.
+
+    Steps:
+    1) Load PDFs from `data_dir` recursively (best-effort).
+    2) Split documents into token-aware chunks, collapse near-duplicates and
+       tag them with disease/plant part/pathogen type/chapter metadata.
+    3) Store the chunks compactly and index their embeddings in memory.
+    4) Define a chat prompt and generation model.
+    5) Wire a two-node graph: retrieve -> generate.
+    Steps 1-3 are `RAGLibrary.refresh`; see `_compile_rag_graph` for 4-5.
+    """
+    library = RAGLibrary(data_dir, embedding_model)
+    library.refresh()
+    return _compile_rag_graph(library, generator_llm)
+
+
+def _compile_rag_graph(library: RAGLibrary, generator_llm=None):
+    """Wire the retrieve -> generate graph; `retrieve` queries `library`'s live index."""
+    from langgraph.graph import START, StateGraph
 
     human_template = (
         "You are a rice pathology/IPM assistant. Write a concise, actionable answer using the provided contexts."
@@ -93,25 +564,30 @@ def _build_rag_graph(data_dir: str):
         ("system", "Ground answers strictly in the provided CONTEXT and follow the citation rules."),
         ("human", human_template),
     ])
-    generator_llm = ChatOpenAI(model=os.environ.get("OPENAI_CHAT_MODEL", "gpt-4.1-nano"), temperature=0)
+    if generator_llm is None:
+        from langchain_openai import ChatOpenAI
+
+        generator_llm = ChatOpenAI(
+            model=os.environ.get("OPENAI_CHAT_MODEL", "gpt-4.1-nano"),
+            base_url=_openai_base_url("RAG_LLM_URL"),
+            temperature=0,
+        )
 
     def retrieve(state: _RAGState) -> _RAGState:
-        retrieved_docs = retriever.invoke(state["question"]) if retriever else []
-        return {"context": retrieved_docs}  # type: ignore
+        if state.get("context") is not None:
+            return {}  # retrieved ahead of the call (see `prefetch_retrieval`)
+        question = state["question"]
+        # Read the index once so a concurrent reload cannot swap it mid-query
+        context = _retrieve(library.index, question, _query_filters(question, state.get("filters")))
+        return {"context": context}  # type: ignore
 
     def generate(state: _RAGState) -> _RAGState:
         generator_chain = chat_prompt | generator_llm | StrOutputParser()
 
-        # Format CONTEXT with filename and page to steer correct inline citations
+        # Format CONTEXT with filename and page to steer correct inline citations,
+        # merging adjacent chunks and bounding its size by the token budget
         docs = state.get("context", [])
-        formatted_context_parts = []
-        for d in docs:
-            meta = getattr(d, "metadata", {}) or {}
-            src = os.path.basename(meta.get("source", "")) or "unknown.pdf"
-            page = meta.get("page")
-            header = f"[{src}, p. {page}]" if page is not None else f"[{src}]"
-            formatted_context_parts.append(f"{header}\n{d.page_content}")
-        formatted_context = "\n\n".join(formatted_context_parts) if formatted_context_parts else ""
+        formatted_context = pack_context(docs, _context_token_budget())
 
         response_text = generator_chain.invoke(
             {"query": state["question"], "context": formatted_context}
@@ -124,20 +600,166 @@ def _build_rag_graph(data_dir: str):
     return graph_builder.compile()
 
 
-@lru_cache(maxsize=1)
+@once
+def _get_rag_library() -> RAGLibrary:
+    """Return the cached library for RAG_DATA_DIR, watched for PDF changes.
+
+    Concurrent first callers (tool calls run in threads) share one build.
+    """
+    library = RAGLibrary(os.environ.get("RAG_DATA_DIR", "data"))
+    library.refresh()
+    if _watch_interval() > 0:
+        library.watch(_watch_interval())
+    return library
+
+
+@once
 def _get_rag_graph():
-    """Return a cached compiled RAG graph built from RAG_DATA_DIR."""
-    data_dir = os.environ.get("RAG_DATA_DIR", "data")
-    return _build_rag_graph(data_dir)
+    """Return a cached compiled RAG graph over the live RAG_DATA_DIR library."""
+    return _compile_rag_graph(_get_rag_library())
+
+
+_query_flights = SingleFlight()
+
+# Prefetched retrievals live this long (seconds) and at most this many are kept
+PREFETCH_TTL = 120.0
+MAX_PREFETCHES = 256
+
+# (normalised question, filters) -> (started, future retrieved Documents)
+_prefetches: "OrderedDict[tuple, Tuple[float, Future]]" = OrderedDict()
+_prefetch_lock = threading.Lock()
+_prefetch_pool: Optional[ThreadPoolExecutor] = None
+_prefetch_counts = {"started": 0, "hits": 0, "failed": 0}
+
+
+def prefetch_enabled() -> bool:
+    """Whether agents prefetch retrieval for each user message (`RAG_PREFETCH`, default off)."""
+    return os.environ.get("RAG_PREFETCH", "0").lower() in ("1", "true", "yes", "on")
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _query_key(query: str, filters: Dict[str, List[str]]) -> tuple:
+    return _normalize_query(query), tuple(sorted((k, tuple(v)) for k, v in filters.items()))
+
+
+def _answer(query: str, filters: Dict[str, List[str]], context: Optional[List[Document]] = None):
+    """Run the RAG graph (generation only when `context` is given).
+
+    Identical queries already in flight share one retrieval and generation.
+    """
+    graph = _get_rag_graph()
+    state = {"question": query, "filters": filters}
+    if context is not None:
+        state["context"] = context
+    return _query_flights.do(_query_key(query, filters), graph.invoke, state)
+
+
+def _expire_prefetches() -> None:
+    cutoff = time.monotonic() - PREFETCH_TTL
+    while _prefetches and next(iter(_prefetches.values()))[0] < cutoff:
+        _prefetches.popitem(last=False)
+
+
+def _prefetch_context(question: str, filters: Dict[str, List[str]]) -> List[Document]:
+    return _retrieve(_get_rag_library().index, question, filters)
+
+
+def prefetch_retrieval(question: str) -> None:
+    """Start retrieving library chunks for `question` in the background.
+
+    Called with the user's message while the agent model decides what to
+    do. Only the query embedding and the search run ahead: a
+    `retrieve_information` call whose normalised query and filters (explicit
+    or inferred) equal this one's then only generates its answer from the
+    prefetched chunks.
+    """
+    global _prefetch_pool
+    filters = _query_filters(question)
+    key = _query_key(question, filters)
+    if not key[0]:
+        return
+    with _prefetch_lock:
+        _expire_prefetches()
+        if key in _prefetches:
+            return
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-prefetch")
+        _prefetches[key] = (time.monotonic(), _prefetch_pool.submit(_prefetch_context, question, filters))
+        _prefetch_counts["started"] += 1
+        while len(_prefetches) > MAX_PREFETCHES:
+            _prefetches.popitem(last=False)
+
+
+def clear_prefetches() -> int:
+    """Drop every prefetched retrieval (e.g. after a reindex) and return how many were dropped."""
+    with _prefetch_lock:
+        count = len(_prefetches)
+        _prefetches.clear()
+    return count
+
+
+def query_stats() -> Dict[str, object]:
+    """Prefetched retrievals held and used, and the coalescing of identical concurrent queries."""
+    with _prefetch_lock:
+        _expire_prefetches()
+        prefetches = {"prefetches": len(_prefetches), **{f"prefetches_{k}": v for k, v in _prefetch_counts.items()}}
+    return {**prefetches, "query_flights": _query_flights.stats()}
+
+
+def _take_prefetch(query: str, filters: Dict[str, List[str]]) -> Optional[List[Document]]:
+    """Return the chunks prefetched for exactly this normalised `query` and `filters`, if any.
+
+    The prefetch is used once: it is removed whether its retrieval
+    succeeded or failed (None is returned then, and the caller retrieves).
+    """
+    with _prefetch_lock:
+        _expire_prefetches()
+        entry = _prefetches.pop(_query_key(query, filters), None)
+    if entry is None:
+        return None
+    try:
+        context = entry[1].result()
+    except Exception:
+        logger.warning("Prefetched retrieval for %r failed; retrieving again", query, exc_info=True)
+        outcome, context = "failed", None
+    else:
+        outcome = "hits"
+    with _prefetch_lock:
+        _prefetch_counts[outcome] += 1
+    return context
+
+
+def lookup_answer(query: str) -> Optional[str]:
+    """Answer a simple lookup straight from the RAG pipeline; None if the library has no answer."""
+    result = _answer(query, {})
+    response = result.get("response") if isinstance(result, dict) else None
+    if not response or response.strip().rstrip(".").lower() == "i don't know":
+        return None
+    return response
 
 
 @tool
 def retrieve_information(
-    query: Annotated[str, "query to ask the retrieve information tool"]
+    query: Annotated[str, "query to ask the retrieve information tool"],
+    plant_part: Annotated[
+        Optional[str], "optional: only search passages about leaf, sheath, stem, panicle, grain or root"
+    ] = None,
+    pathogen_type: Annotated[
+        Optional[str], "optional: only search passages about fungal, bacterial, viral or nematode diseases"
+    ] = None,
 ):
     """Retrieve rice disease and IPM information from the local PDF library using RAG"""
-    graph = _get_rag_graph()
-    result = graph.invoke({"question": query})
+    filters = {}
+    if plant_part:
+        filters["plant_parts"] = [plant_part.lower()]
+    if pathogen_type:
+        filters["pathogen_types"] = [pathogen_type.lower()]
+    filters = _query_filters(query, filters)
+
+    result = _answer(query, filters, _take_prefetch(query, filters))
     # Prefer returning the response string if available
     if isinstance(result, dict) and "response" in result:
         return result["response"]
@@ -163,5 +785,95 @@ def test_rag_system():
         import traceback
         traceback.print_exc()
 
+
+@click.group(invoke_without_command=True)
+@click.pass_context
+def cli(ctx):
+    """RAG utilities. Without a subcommand, runs `test_rag_system`."""
+    if ctx.invoked_subcommand is None:
+        test_rag_system()
+
+
+@cli.command()
+@click.option("--data-dir", default=lambda: os.environ.get("RAG_DATA_DIR", "data"), show_default="RAG_DATA_DIR or data")
+@click.option("--skip-embed", is_flag=True, help="Only profile loading, chunking and dedup (no API calls).")
+@click.option("--fake-embeddings", is_flag=True, help="Embed with the offline stand-in from app.fakes.")
+@click.option("--json-output", type=click.Path(dir_okay=False), default=None, help="Also write the profile as JSON.")
+def profile(data_dir, skip_embed, fake_embeddings, json_output):
+    """Profile the refresh stages per PDF (load, chunk, dedup, embed, index)."""
+    import json
+
+    from app.rag_profile import print_profile, profile_as_dict, profile_ingestion
+
+    embedding_model = None
+    if fake_embeddings:
+        from app.fakes import FakeEmbeddings
+
+        # Same dimensionality as text-embedding-3-small so index memory is comparable
+        embedding_model = FakeEmbeddings(dim=1536)
+    report = profile_ingestion(data_dir, embedding_model=embedding_model, skip_embed=skip_embed)
+    print_profile(report)
+    if json_output:
+        with open(json_output, "w") as f:
+            json.dump(profile_as_dict(report), f, indent=2)
+
+
+@cli.command()
+@click.option("--data-dir", default=lambda: os.environ.get("RAG_DATA_DIR", "data"), show_default="RAG_DATA_DIR or data")
+@click.option("--store-dir", default=None, help="Store directory (default: RAG_TEXT_STORE or <data-dir>/.text_store).")
+def extract(data_dir, store_dir):
+    """Extract PDF page texts into the extracted-text store (only new or changed PDFs)."""
+    store_dir = store_dir or _text_store_dir(data_dir)
+    if not store_dir:
+        raise click.ClickException("The extracted-text store is disabled (RAG_TEXT_STORE=off)")
+    stats = extract_library(data_dir, store_dir)
+    print(
+        f"{stats.files} PDFs: {stats.extracted} extracted, {stats.reused} reused, "
+        f"{stats.failed} unreadable, {stats.removed} removed; {stats.pages} pages, {stats.bytes / 1024:.1f} KiB of text "
+        f"in {store_dir!r} ({stats.seconds:.2f}s)"
+    )
+
+
+@cli.command("quantization-report")
+@click.option("--data-dir", default=lambda: os.environ.get("RAG_DATA_DIR", "data"), show_default="RAG_DATA_DIR or data")
+@click.option("--k", default=4, show_default=True, help="Top-k used for recall (the retriever default).")
+@click.option("--oversampling", default=4.0, show_default=True, help="Rescoring candidates per result.")
+@click.option("--queries", default=50, show_default=True, help="Number of chunk-derived queries.")
+@click.option("--fake-embeddings", is_flag=True, help="Embed with the offline stand-in from app.fakes.")
+def quantization_report_command(data_dir, k, oversampling, queries, fake_embeddings):
+    """Report vector memory vs. recall@k for each quantization mode on the corpus."""
+    from app.vectorstore import quantization_report
+
+    if fake_embeddings:
+        from app.fakes import FakeEmbeddings
+
+        embedding_model = FakeEmbeddings(dim=1536)
+    else:
+        embedding_model = openai_embeddings()
+    # Ingested exactly as the server does it (streaming refresh with dedup and tagging)
+    library = RAGLibrary(data_dir, embedding_model)
+    library.refresh()
+    index = library.index
+    if index.vectors is None:
+        raise click.ClickException(f"No PDF chunks found in {data_dir!r}")
+    count, size = index.vectors.count, _ingest_batch_size()
+    # Queries: the opening words of evenly spaced chunks, a stand-in for real questions
+    step = max(1, count // queries)
+    query_texts = [" ".join(index.chunks.text(i).split()[:20]) for i in range(0, count, step)][:queries]
+    query_vectors = embedding_model.embed_documents(query_texts)
+
+    # The index's vectors are read back in ingestion-sized batches
+    batches = (index.vectors.vectors(range(i, min(count, i + size))) for i in range(0, count, size))
+    rows = quantization_report(batches, query_vectors, k, oversampling)
+    print(f"{count} chunks, {len(query_texts)} queries, recall@{k} vs. exact float32 search\n")
+    print(f"{'mode':<8} {'rescore':>7} {'RAM KiB':>10} {'disk KiB':>10} {'recall':>7}")
+    for row in rows:
+        print(
+            f"{row['quantization']:<8} {row['rescore_oversampling'] or '-':>7} "
+            f"{row['ram_bytes'] / 1024:>10.1f} {row['disk_bytes'] / 1024:>10.1f} "
+            f"{row[f'recall@{k}']:>7.3f}"
+        )
+
+
 if __name__ == "__main__":
-    test_rag_system()
\ No newline at end of file
+    cli()
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""Stage-by-stage profiler for the RAG ingestion pipeline.
+
+Runs the stages of `RAGLibrary.refresh` over every PDF in the data
+directory and reports, per PDF and per stage:
+- wall time and peak traced Python memory,
+- page and chunk counts, and chunks left after near-duplicate removal,
+- token totals for page text and chunks (chunk tokens are what gets embedded).
+
+The stages are the refresh's own: `load` (pages from the extracted-text
+store, parsing only new or changed PDFs; set `RAG_TEXT_STORE=off` to time
+parsing every PDF), `chunk` (split and tag), `dedup`, `embed` (batches of
+`RAG_INGEST_BATCH_SIZE`) and `index` (chunk store, vectors and section
+index). A refresh runs them in pipeline threads; here they are called in
+turn for one PDF at a time so their costs can be told apart, so embedding
+batches end at each PDF instead of spanning PDFs.
+
+Invoked as `python -m app.rag profile`. Memory is measured with `tracemalloc`,
+so native allocations inside PyMuPDF are not included and timings carry some
+tracing overhead; use the numbers to compare documents and stages.
+"""
+from __future__ import annotations
+
+import os
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+
+from app.dedup import Deduplicator
+from app.rag import (
+    IndexBuilder,
+    RAGIndex,
+    RAGLibrary,
+    dedup_threshold,
+    openai_embeddings,
+    tiktoken_len,
+)
+from app.textstore import file_hash, list_pdfs
+
+
+STAGES = ("load", "chunk", "dedup", "embed", "index")
+
+
+@dataclass
+class StageStats:
+    """Time and peak traced memory (above the stage's starting point) of one stage."""
+
+    seconds: float = 0.0
+    peak_bytes: int = 0
+
+
+@dataclass
+class FileProfile:
+    """Ingestion profile of a single PDF."""
+
+    path: str
+    pages: int = 0
+    chunks: int = 0
+    unique_chunks: int = 0
+    page_tokens: int = 0
+    chunk_tokens: int = 0
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+
+    @property
+    def seconds(self) -> float:
+        return sum(s.seconds for s in self.stages.values())
+
+
+@dataclass
+class IngestionProfile:
+    """Per-file and per-stage profile of a full ingestion run."""
+
+    data_dir: str
+    files: List[FileProfile] = field(default_factory=list)
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    max_rss_bytes: int = 0
+
+
+@contextmanager
+def _measure(stats: Dict[str, StageStats], stage: str):
+    """Accumulate time and peak memory of the enclosed block into `stats[stage]`."""
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = stats.setdefault(stage, StageStats())
+        entry.seconds += time.perf_counter() - start
+        entry.peak_bytes = max(entry.peak_bytes, tracemalloc.get_traced_memory()[1] - baseline)
+
+
+def _merge(totals: Dict[str, StageStats], stage: str, stats: StageStats) -> None:
+    entry = totals.setdefault(stage, StageStats())
+    entry.seconds += stats.seconds
+    entry.peak_bytes = max(entry.peak_bytes, stats.peak_bytes)
+
+
+def profile_ingestion(data_dir: str, embedding_model=None, skip_embed: bool = False) -> IngestionProfile:
+    """Run the refresh stages one PDF at a time and measure each (see the module docstring).
+
+    With `skip_embed` only loading, chunking and dedup run, which needs no
+    embedding model (and no API key).
+    """
+    if embedding_model is None:
+        if skip_embed:
+            from app.fakes import FakeEmbeddings
+
+            embedding_model = FakeEmbeddings()  # never called
+        else:
+            embedding_model = openai_embeddings()
+    library = RAGLibrary(data_dir, embedding_model)
+    digests = {path: file_hash(path) for path in list_pdfs(data_dir)}
+    deduplicator = Deduplicator(dedup_threshold())
+    builder = IndexBuilder(library.query_embeddings)
+    previous = RAGIndex()  # nothing to copy vectors from: every chunk is embedded
+
+    profile = IngestionProfile(data_dir=data_dir)
+    tracemalloc.start()
+    try:
+        pages_by_file = library.iter_pages(digests)
+        while True:
+            file_stages: Dict[str, StageStats] = {}
+            with _measure(file_stages, "load"):
+                item = next(pages_by_file, None)
+            if item is None:
+                break
+            path, pages = item
+            file_profile = FileProfile(path=os.path.relpath(path, data_dir), stages=file_stages)
+            with _measure(file_profile.stages, "chunk"):
+                chunks = next(library.chunk_stage(iter([(path, pages)])))
+            with _measure(file_profile.stages, "dedup"):
+                kept = next(deduplicator.stage(iter([chunks])))
+            if not skip_embed:
+                with _measure(file_profile.stages, "embed"):
+                    batches = list(library.embed_stage(iter([kept]), previous))
+                with _measure(file_profile.stages, "index"):
+                    for batch in batches:
+                        builder.add(*batch)
+
+            file_profile.pages = len(pages)
+            file_profile.chunks = len(chunks)
+            file_profile.unique_chunks = len(kept)
+            file_profile.page_tokens = sum(tiktoken_len(p.page_content) for p in pages)
+            file_profile.chunk_tokens = sum(tiktoken_len(c.page_content) for c in chunks)
+            profile.files.append(file_profile)
+            for stage, stats in file_profile.stages.items():
+                _merge(profile.stages, stage, stats)
+        if not skip_embed:
+            with _measure(profile.stages, "index"):
+                builder.finish(digests, deduplicator)
+    finally:
+        tracemalloc.stop()
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    profile.max_rss_bytes = max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+    return profile
+
+
+def _mib(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f}"
+
+
+def print_profile(profile: IngestionProfile) -> None:
+    """Print per-PDF (slowest first) and per-stage tables."""
+    print(f"RAG ingestion profile for {profile.data_dir!r} ({len(profile.files)} PDFs)\n")
+    header = f"{'file':<48} {'pages':>5} {'chunks':>6} {'unique':>6} {'page tok':>9} {'chunk tok':>9}"
+    header += "".join(f" {stage + ' s':>8}" for stage in STAGES) + f" {'peak MiB':>8}"
+    print(header)
+    print("-" * len(header))
+    for f in sorted(profile.files, key=lambda f: f.seconds, reverse=True):
+        line = (
+            f"{f.path[:48]:<48} {f.pages:>5} {f.chunks:>6} {f.unique_chunks:>6} "
+            f"{f.page_tokens:>9} {f.chunk_tokens:>9}"
+        )
+        line += "".join(
+            f" {f.stages[stage].seconds:>8.3f}" if stage in f.stages else f" {'-':>8}"
+            for stage in STAGES
+        )
+        line += f" {_mib(max((s.peak_bytes for s in f.stages.values()), default=0)):>8}"
+        print(line)
+
+    print(f"\n{'stage':<8} {'seconds':>9} {'peak MiB':>9}")
+    for stage in STAGES:
+        if stage in profile.stages:
+            stats = profile.stages[stage]
+            print(f"{stage:<8} {stats.seconds:>9.3f} {_mib(stats.peak_bytes):>9}")
+    print(
+        f"\ntotals: {sum(f.pages for f in profile.files)} pages, "
+        f"{sum(f.chunks for f in profile.files)} chunks "
+        f"({sum(f.unique_chunks for f in profile.files)} after dedup), "
+        f"{sum(f.chunk_tokens for f in profile.files)} chunk tokens; "
+        f"process max RSS {_mib(profile.max_rss_bytes)} MiB"
+    )
+
+
+def profile_as_dict(profile: IngestionProfile) -> dict:
+    """Return the profile as JSON-serialisable data."""
+    return asdict(profile)
@@ -0,0 +1,70 @@
+"""Local query router in front of the agent graph.
+
+`route_query` classifies a user message without calling a model:
+- "lookup": a short, general question about a named rice disease or
+  pathogen ("What causes false smut?", "Describe the symptoms of tungro"),
+  which the PDF library answers directly;
+- "agent": everything else, in particular field reports to diagnose ("my
+  plants have...", "we see..."), requests for recent research or web
+  sources, and multi-part or follow-up questions that need the full tool
+  loop.
+
+Only questions the router is confident about take the fast path; anything
+ambiguous goes to the agent.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from app.metadata import infer_filters
+
+
+LOOKUP = "lookup"
+AGENT = "agent"
+
+# Longest message (in words) still treated as a simple lookup
+MAX_LOOKUP_WORDS = 25
+
+_LOOKUP_START = re.compile(
+    r"^\s*(?:what(?:'s| is| are| causes?| pathogen| fungus)|which|define|describe|explain|outline|list|"
+    r"how (?:is|are|does|do|can) (?:it|they|the|this|\w+ (?:spread|transmitted|managed|controlled))|"
+    r"(?:tell me )?about)\b",
+    re.IGNORECASE,
+)
+
+# First/second person, field observations and requests for other sources
+_AGENT_CUES = re.compile(
+    r"\b(?:i|i'm|i've|my|me|we|we're|our|us|you think|should i|"
+    r"field|farm|plot|plants? (?:have|has|show)|seeing|noticed|observed|"
+    r"recent|latest|new|current|news|research|papers?|studies|study|arxiv|pubmed|web|internet|online|"
+    r"compare|versus|vs\.?|price|buy|brand|dose|dosage|rate)\b",
+    re.IGNORECASE,
+)
+
+# Pronouns that refer back to an earlier turn
+_FOLLOW_UP = re.compile(r"\b(?:it|its|this|that|these|those|they|them)\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Routing decision for one user message."""
+
+    kind: str
+    reason: str
+
+
+def route_query(query: str) -> Route:
+    """Return whether `query` is a simple library lookup or needs the full agent."""
+    words = query.split()
+    if not words or len(words) > MAX_LOOKUP_WORDS:
+        return Route(AGENT, "length")
+    if _AGENT_CUES.search(query):
+        return Route(AGENT, "agent cue")
+    if not _LOOKUP_START.search(query):
+        return Route(AGENT, "not a lookup question")
+    tags = infer_filters(query)
+    if not tags.get("diseases"):
+        # Pronouns without a named disease refer back to an earlier turn
+        return Route(AGENT, "follow-up" if _FOLLOW_UP.search(query) else "no disease named")
+    return Route(LOOKUP, "named disease lookup")
@@ -0,0 +1,84 @@
+"""Coalescing of concurrent identical work.
+
+- `SingleFlight.do(key, fn)` runs `fn` once per key at a time: callers that
+  arrive while a call for the same key is running wait for it and receive
+  its result (or exception) instead of repeating the work.
+- `once` is a thread-safe `lru_cache(maxsize=1)` for zero-argument builders:
+  concurrent first callers share one build instead of each running it.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Return `fn(*args, **kwargs)`, sharing the call with concurrent callers of `key`."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """Calls run, calls that shared another's result, and calls running now."""
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+def once(fn: Callable[[], T]) -> Callable[[], T]:
+    """Cache the first successful result of `fn`; concurrent first callers wait for it.
+
+    A failed build is not cached, so the next call retries. Like
+    `lru_cache`, the wrapper has `cache_clear()`; `cached()` returns the
+    value without building it (None before the first build).
+    """
+    lock = threading.Lock()
+    cache: Dict[str, T] = {}
+
+    @functools.wraps(fn)
+    def wrapper() -> T:
+        if "value" not in cache:
+            with lock:
+                if "value" not in cache:
+                    cache["value"] = fn()
+        return cache["value"]
+
+    wrapper.cache_clear = cache.clear  # type: ignore[attr-defined]
+    wrapper.cached = lambda: cache.get("value")  # type: ignore[attr-defined]
+    return wrapper
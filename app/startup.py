@@ -0,0 +1,162 @@
+"""Startup profiling for the A2A server (`python -m app --profile-startup`).
+
+`profile_startup` runs the server's startup in a fresh interpreter with
+Python's `-X importtime` and reports:
+- initialization stages: importing `app.__main__`, building the agent card
+  and the A2A application (the server can listen once these are done), and
+  the agent build that runs in the background after the port is bound;
+- import time per top-level package (summed self time), before listening
+  and during the deferred agent build;
+- which third-party packages each `app.*` module pulls in, with their
+  cumulative import time.
+
+A fresh interpreter is used so that nothing is imported already; the stages
+are measured in the child and printed as JSON on its stdout.
+"""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+
+# Printed to stderr by the child between the listening and deferred phases
+_PHASE_MARKER = "-- startup: listening --"
+
+
+@dataclass
+class ImportRecord:
+    """One module from `-X importtime`, with the modules it imported first."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    children: List["ImportRecord"] = field(default_factory=list)
+
+
+@dataclass
+class StartupProfile:
+    stages: List[Tuple[str, float]]
+    listening: List[ImportRecord]
+    deferred: List[ImportRecord]
+
+
+def parse_importtime(lines: List[str]) -> List[ImportRecord]:
+    """Return the root records of `-X importtime` output, children attached.
+
+    Python prints a module after the modules it imports, indented two spaces
+    per nesting level, so each record adopts the pending records one level
+    deeper.
+    """
+    pending: Dict[int, List[ImportRecord]] = defaultdict(list)
+    for line in lines:
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        record = ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth)
+        record.children = pending.pop(depth + 1, [])
+        pending[depth].append(record)
+    return pending.get(0, [])
+
+
+def _walk(records: List[ImportRecord]):
+    for record in records:
+        yield record
+        yield from _walk(record.children)
+
+
+def package_times(records: List[ImportRecord]) -> List[Tuple[str, float]]:
+    """Return (top-level package, seconds of self import time), slowest first."""
+    totals: Dict[str, int] = defaultdict(int)
+    for record in _walk(records):
+        totals[record.name.split(".")[0]] += record.self_us
+    return sorted(((name, us / 1e6) for name, us in totals.items()), key=lambda t: -t[1])
+
+
+def app_dependencies(records: List[ImportRecord]) -> List[Tuple[str, str, float]]:
+    """Return (app module, third-party module it imported, cumulative seconds), slowest first."""
+    edges = []
+    for record in _walk(records):
+        if record.name.split(".")[0] != "app":
+            continue
+        for child in record.children:
+            if child.name.split(".")[0] != "app":
+                edges.append((record.name, child.name, child.cumulative_us / 1e6))
+    return sorted(edges, key=lambda t: -t[2])
+
+
+def _run_stages(warm_up: bool) -> List[Tuple[str, float]]:
+    """Run the server's startup steps in this interpreter and time each one."""
+    stages = []
+    start = last = time.perf_counter()
+
+    def mark(name):
+        nonlocal last
+        now = time.perf_counter()
+        stages.append((name, now - last))
+        last = now
+
+    from app import __main__ as server_main
+    from app.agent_executor import GeneralAgentExecutor
+
+    mark("import app.__main__")
+    agent_card = server_main.build_agent_card("localhost", 0)
+    mark("build agent card")
+    executor = GeneralAgentExecutor()
+    server = server_main.build_server(agent_card, executor)
+    mark("build request handler")
+    server.build()
+    mark("build Starlette app")
+    stages.append(("ready to listen", last - start))
+    print(_PHASE_MARKER, file=sys.stderr, flush=True)
+    if warm_up:
+        executor.warm_up()
+        mark("agent build (after listening)")
+    return stages
+
+
+def profile_startup(warm_up: bool = True) -> StartupProfile:
+    """Profile the server's startup in a fresh interpreter."""
+    command = [sys.executable, "-X", "importtime", "-m", "app.startup"]
+    if warm_up:
+        command.append("--warm-up")
+    proc = subprocess.run(command, capture_output=True, text=True, env=os.environ.copy())
+    if proc.returncode != 0:
+        raise RuntimeError(f"Startup failed while profiling:\n{proc.stderr[-2000:]}")
+    lines = proc.stderr.splitlines()
+    split = lines.index(_PHASE_MARKER) if _PHASE_MARKER in lines else len(lines)
+    return StartupProfile(
+        stages=[tuple(s) for s in json.loads(proc.stdout.strip().splitlines()[-1])],
+        listening=parse_importtime(lines[:split]),
+        deferred=parse_importtime(lines[split:]),
+    )
+
+
+def print_profile(profile: StartupProfile, top: int = 15) -> None:
+    print("== startup stages ==")
+    for name, seconds in profile.stages:
+        print(f"  {name:<34} {seconds:8.3f}s")
+    for title, records in (("before listening", profile.listening), ("agent build", profile.deferred)):
+        if not records:
+            continue
+        total = sum(r.cumulative_us for r in records) / 1e6
+        print(f"\n== imports {title}: {total:.3f}s ==")
+        print("  by package (self time):")
+        for name, seconds in package_times(records)[:top]:
+            print(f"    {name:<40} {seconds:8.3f}s")
+        edges = app_dependencies(records)
+        if edges:
+            print("  pulled in by app modules (cumulative):")
+            for module, dependency, seconds in edges[:top]:
+                print(f"    {module + ' -> ' + dependency:<56} {seconds:8.3f}s")
+
+
+if __name__ == "__main__":
+    print(json.dumps(_run_stages(warm_up="--warm-up" in sys.argv)))
@@ -0,0 +1,20 @@
+"""Latency percentiles shared by the benchmark, the load test and push delivery stats."""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile of an already sorted list; None if it is empty."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def percentiles(values: Iterable[float], pcts: Sequence[int] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+    """Return {"p50": ..., "p95": ..., "p99": ...} of `values` (any order)."""
+    ordered = sorted(values)
+    return {f"p{pct}": percentile(ordered, pct) for pct in pcts}
@@ -0,0 +1,368 @@
+"""Compact on-disk store of extracted PDF page texts.
+
+PyMuPDF extraction is the slowest part of loading the library and its output
+only changes when a PDF does. `extract_library` parses each PDF once and
+writes every page text into a store directory:
+- `texts-<gen>.bin`: all page texts as one UTF-8 blob, read through `mmap`,
+- `pages-<gen>.npy`: offset table with one (start, end) byte range per page,
+- `manifest.json`: per-file entries keyed by the SHA-256 of the PDF bytes
+  (first row in the offset table, page count, document metadata), the PDFs
+  that could not be parsed (`failed`, retried only once their bytes change)
+  and the current generation.
+
+Later runs hash the PDFs, re-extract only files whose hash is not in the
+store and copy the stored bytes of the others, so restarts and re-chunking
+experiments skip PDF parsing. A rewrite goes to new generation files and the
+manifest is replaced last, so readers never see a half-written store; the
+files of a generation that fails or is abandoned before it is published are
+deleted. The previous generation is kept until the next rewrite, so a reader
+that read the manifest just before it was replaced can still open the files
+it names (and a reader that loses even that race re-reads the manifest).
+Writers hold an exclusive lock on `.lock` in the store directory, so two
+processes never rewrite the same store at once. The lock is held for the
+whole rewrite, including while `iter_extract`'s consumer processes each
+yielded PDF: a slow consumer (e.g. embedding in a streaming refresh) delays
+other processes' rewrites of the same store, though not their reads.
+`iter_extract` does the same while handing each PDF's pages to a streaming
+consumer as soon as they are available.
+"""
+from __future__ import annotations
+
+import contextlib
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+LOCK = ".lock"
+
+# (start, end) byte offsets of one page's text in the blob
+_PAGE_DTYPE = np.dtype([("start", "<i8"), ("end", "<i8")])
+
+# Page metadata that depends on where the file currently lives
+_LOCATION_KEYS = ("source", "file_path")
+
+# Times a reader re-reads the manifest when the generation it names was removed meanwhile
+_OPEN_ATTEMPTS = 3
+
+
+def file_hash(path: str) -> str:
+    """Return the hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_pdfs(data_dir: str) -> List[str]:
+    """Return the PDFs under `data_dir` (recursive), sorted."""
+    return sorted(glob.glob(os.path.join(data_dir, "**", "*.pdf"), recursive=True))
+
+
+class TextStore:
+    """Read-only view of a store directory; page texts are sliced from an mmap."""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.generation = 0
+        self.files: Dict[str, dict] = {}
+        self.failed: Dict[str, dict] = {}  # digest -> {"name", "error"} of PDFs that could not be parsed
+        self._blob: Optional[mmap.mmap] = None
+        self._pages = np.zeros(0, dtype=_PAGE_DTYPE)
+
+        for attempt in range(_OPEN_ATTEMPTS):
+            try:
+                self._open()
+                return
+            except FileNotFoundError:
+                # Rewritten twice since we read the manifest; the new one names newer files
+                if attempt == _OPEN_ATTEMPTS - 1:
+                    raise
+
+    def _open(self) -> None:
+        manifest_path = os.path.join(self.store_dir, MANIFEST)
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        self.generation = manifest["generation"]
+        self.files = manifest["files"]
+        self.failed = manifest.get("failed", {})
+        self._pages = np.load(self._path("pages", ".npy"), mmap_mode="r")
+        with open(self._path("texts", ".bin"), "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _path(self, kind: str, ext: str, generation: Optional[int] = None) -> str:
+        generation = self.generation if generation is None else generation
+        return os.path.join(self.store_dir, f"{kind}-{generation}{ext}")
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.files
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def nbytes(self) -> int:
+        """Size of the text blob in bytes."""
+        return len(self._blob) if self._blob is not None else 0
+
+    def _row(self, digest: str, page: int) -> int:
+        entry = self.files[digest]
+        if not 0 <= page < entry["pages"]:
+            raise IndexError(f"page {page} out of range for {digest[:12]} ({entry['pages']} pages)")
+        return entry["row"] + page
+
+    def page_bytes(self, digest: str, page: int) -> memoryview:
+        """Return the UTF-8 bytes of one page without copying them out of the mmap."""
+        start, end = self._pages[self._row(digest, page)]
+        if self._blob is None or start == end:
+            return memoryview(b"")
+        return memoryview(self._blob)[int(start):int(end)]
+
+    def page_text(self, digest: str, page: int) -> str:
+        """Return the text of one page of the PDF with hash `digest`."""
+        return str(self.page_bytes(digest, page), "utf-8", "surrogatepass")
+
+    def documents(self, digest: str, source: str) -> List[Document]:
+        """Return one Document per page, as PyMuPDFLoader would for `source`."""
+        entry = self.files[digest]
+        texts = (self.page_text(digest, page) for page in range(entry["pages"]))
+        return _page_documents(texts, entry["metadata"], source, digest)
+
+    def close(self) -> None:
+        if self._blob is not None:
+            self._blob.close()
+            self._blob = None
+
+
+@dataclass
+class ExtractStats:
+    """Outcome of one `extract_library` run."""
+
+    files: int = 0
+    extracted: int = 0
+    reused: int = 0
+    failed: int = 0
+    removed: int = 0
+    pages: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+def parse_pdf(path: str) -> List[Document]:
+    """Return one Document per page of `path`, parsed with PyMuPDF."""
+    from langchain_community.document_loaders import PyMuPDFLoader
+
+    return PyMuPDFLoader(path).load()
+
+
+@contextlib.contextmanager
+def _locked(store_dir: str) -> Iterator[None]:
+    """Hold an exclusive lock on the store directory (waits for other writers)."""
+    try:
+        import fcntl
+    except ImportError:  # no advisory locks on this platform
+        yield
+        return
+    with open(os.path.join(store_dir, LOCK), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _page_documents(texts: Iterable[str], metadata: dict, source: str, digest: str) -> List[Document]:
+    location = {key: source for key in _LOCATION_KEYS}
+    return [
+        Document(page_content=text, metadata={**location, **metadata, "page": page, "file_hash": digest})
+        for page, text in enumerate(texts)
+    ]
+
+
+def extract_library(
+    data_dir: str, store_dir: str, digests: Optional[Dict[str, str]] = None
+) -> ExtractStats:
+    """Bring the store in `store_dir` up to date with the PDFs in `data_dir`.
+
+    PDFs already in the store (by content hash) are not parsed again; entries
+    for PDFs no longer present are dropped. The store is left untouched when
+    nothing changed. `digests` ({path: hash}) skips re-hashing known files.
+    """
+    stats = ExtractStats()
+    for _ in iter_extract(data_dir, store_dir, digests, stats, pages=False):
+        pass
+    return stats
+
+
+def _remove_generation(store: TextStore, generation: int) -> None:
+    for kind, ext in (("texts", ".bin"), ("pages", ".npy")):
+        try:
+            os.remove(store._path(kind, ext, generation))
+        except FileNotFoundError:
+            pass
+
+
+def _remove_generations_before(store: TextStore, generation: int) -> None:
+    for name in os.listdir(store.store_dir):
+        kind, _, rest = name.partition("-")
+        number = rest.split(".", 1)[0]
+        if kind in ("texts", "pages") and number.isdigit() and int(number) < generation:
+            _remove_generation(store, int(number))
+
+
+def _write_generation(
+    old: TextStore, hashes: Dict[str, str], stats: ExtractStats, pages: bool
+) -> Iterator[Tuple[str, str, List[Document]]]:
+    """Write the generation after `old`, yielding each PDF's pages, and publish its manifest last."""
+    generation = old.generation + 1
+    files: Dict[str, dict] = {}
+    failed: Dict[str, dict] = {}
+    offsets: List[tuple] = []
+    try:
+        with open(old._path("texts", ".bin", generation), "wb") as blob:
+            for digest, path in hashes.items():
+                entry = {"row": len(offsets), "name": os.path.basename(path)}
+                if digest in old:
+                    # Copy the file's contiguous byte range and shift its offsets
+                    stored = old.files[digest]
+                    rows = old._pages[stored["row"]:stored["row"] + stored["pages"]]
+                    first, last = (int(rows[0]["start"]), int(rows[-1]["end"])) if len(rows) else (0, 0)
+                    shift = blob.tell() - first
+                    if last > first:
+                        blob.write(old._blob[first:last])
+                    offsets.extend((int(s) + shift, int(e) + shift) for s, e in rows)
+                    entry.update(pages=stored["pages"], metadata=stored["metadata"])
+                    documents = old.documents(digest, path) if pages else []
+                    stats.reused += 1
+                elif digest in old.failed:
+                    failed[digest] = old.failed[digest]
+                    stats.failed += 1
+                    yield path, digest, []
+                    continue
+                else:
+                    try:
+                        parsed = parse_pdf(path)
+                    except Exception as e:
+                        logger.warning("Skipping unreadable PDF %s: %r", path, e)
+                        failed[digest] = {"name": entry["name"], "error": repr(e)}
+                        stats.failed += 1
+                        yield path, digest, []
+                        continue
+                    for page in parsed:
+                        data = page.page_content.encode("utf-8", "surrogatepass")
+                        offsets.append((blob.tell(), blob.tell() + len(data)))
+                        blob.write(data)
+                    metadata = dict(parsed[0].metadata) if parsed else {}
+                    for key in _LOCATION_KEYS + ("page",):
+                        metadata.pop(key, None)
+                    entry.update(pages=len(parsed), metadata=metadata)
+                    # The same Documents a later load from the store returns
+                    documents = (
+                        _page_documents((p.page_content for p in parsed), metadata, path, digest)
+                        if pages else []
+                    )
+                    del parsed
+                    stats.extracted += 1
+                files[digest] = entry
+                yield path, digest, documents
+                del documents
+            stats.bytes = blob.tell()
+        np.save(old._path("pages", ".npy", generation), np.array(offsets, dtype=_PAGE_DTYPE))
+
+        tmp = os.path.join(old.store_dir, MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"generation": generation, "files": files, "failed": failed}, f)
+        os.replace(tmp, os.path.join(old.store_dir, MANIFEST))
+    except BaseException:
+        # Failed or abandoned (the consumer closed the iterator) before the manifest named it
+        _remove_generation(old, generation)
+        raise
+    stats.pages = len(offsets)
+
+
+def iter_extract(
+    data_dir: str,
+    store_dir: str,
+    digests: Optional[Dict[str, str]] = None,
+    stats: Optional[ExtractStats] = None,
+    pages: bool = True,
+) -> Iterator[Tuple[str, str, List[Document]]]:
+    """Update the store like `extract_library`, yielding (path, digest, pages) per PDF as it goes.
+
+    Each PDF's pages are yielded as soon as it is parsed (or copied from the
+    previous generation), so a consumer can process one PDF while the next
+    is parsed. Identical copies are yielded once, under the first path. A
+    PDF that cannot be parsed is logged, recorded in the manifest and
+    yielded with no pages. The new generation is published when the
+    iterator is exhausted; if it raises or is closed early, the store is
+    left as it was. With `pages=False` only the store is updated and page
+    lists are empty.
+    """
+    start = time.perf_counter()
+    stats = stats if stats is not None else ExtractStats()
+    paths = list_pdfs(data_dir)
+    digests = digests if digests is not None else {path: file_hash(path) for path in paths}
+    hashes: Dict[str, str] = {}
+    for path in paths:
+        hashes.setdefault(digests[path], path)  # identical copies are stored once
+    stats.files = len(paths)
+
+    os.makedirs(store_dir, exist_ok=True)
+    with _locked(store_dir):
+        # Opened under the lock, so this is the latest published generation
+        old = TextStore(store_dir)
+        known = set(old.files) | set(old.failed)
+        stats.removed = len(known - set(hashes))
+        if not old.generation or known != set(hashes):
+            try:
+                yield from _write_generation(old, hashes, stats, pages)
+            finally:
+                old.close()
+            # The generation just replaced stays for readers that still hold the old manifest;
+            # open readers keep their mmap of older ones after unlinking
+            _remove_generations_before(old, old.generation)
+            stats.seconds = time.perf_counter() - start
+            return
+
+    # Nothing changed: read the published generation without holding up other writers
+    try:
+        stats.reused = len(old.files)
+        stats.failed = len(old.failed)
+        stats.pages = len(old)
+        stats.bytes = old.nbytes()
+        for digest, path in hashes.items():
+            yield path, digest, old.documents(digest, path) if pages and digest in old else []
+    finally:
+        old.close()
+    stats.seconds = time.perf_counter() - start
+
+
+def load_documents(
+    data_dir: str, store_dir: str, digests: Optional[Dict[str, str]] = None
+) -> List[Document]:
+    """Return one Document per PDF page in `data_dir`, extracting only new or changed PDFs."""
+    if digests is None:
+        digests = {path: file_hash(path) for path in list_pdfs(data_dir)}
+    extract_library(data_dir, store_dir, digests)
+    store = TextStore(store_dir)
+    try:
+        return [
+            doc for path, digest in digests.items() if digest in store for doc in store.documents(digest, path)
+        ]
+    finally:
+        store.close()
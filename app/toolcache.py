@@ -0,0 +1,304 @@
+"""Disk cache for external search tools (Tavily, PubMed, arXiv).
+
+`cache_tools` wraps tools in `CachedTool`, which answers repeated calls from
+an SQLite file instead of calling the provider again:
+- keys are the tool name plus its arguments, normalised (None dropped,
+  strings lower-cased with whitespace collapsed, keys sorted), so "Rice
+  Blast " and "rice blast" share an entry;
+- entries are fresh for the tool's TTL; for a further `stale` window they
+  are still returned immediately while one background call refreshes them
+  (stale-while-revalidate), and if the provider fails the stale result is
+  served instead of the error;
+- failures are never cached: PubMed and arXiv return "... exception: ..."
+  strings and Tavily returns `{"error": ...}` instead of raising, so those
+  payloads count as failures (without a stale entry the payload itself is
+  returned, as the uncached tool would);
+- the file is kept under a byte limit by evicting least recently used entries;
+- provider calls run as child runs of the cached tool's run, so they show up
+  in tracing and callbacks (background refreshes run detached).
+
+Configured with `TOOL_CACHE_DIR`, `TOOL_CACHE_MAX_MB`, `TOOL_CACHE_TTL_<TOOL>`
+and `TOOL_CACHE_STALE_<TOOL>` (seconds, e.g. `TOOL_CACHE_TTL_TAVILY_SEARCH`);
+`TOOL_CACHE=off` disables it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import patch_config
+from langchain_core.tools import BaseTool
+from pydantic import ConfigDict
+
+
+logger = logging.getLogger(__name__)
+
+# Default (fresh, stale) seconds per tool: web results age faster than papers
+DEFAULT_TTLS: Dict[str, Tuple[float, float]] = {
+    "tavily_search": (6 * 3600, 18 * 3600),
+    "pub_med": (24 * 3600, 6 * 24 * 3600),
+    "arxiv": (24 * 3600, 6 * 24 * 3600),
+}
+FALLBACK_TTL = (3600.0, 23 * 3600.0)
+
+# Writes between re-reads of the stored size, which picks up other processes' writes
+_RESYNC_WRITES = 256
+
+# Results PubMed and arXiv return instead of raising when a request fails
+ERROR_PREFIXES = ("PubMed exception:", "Arxiv exception:")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+
+# Keys with a background refresh in flight, shared by all cached tools
+_refreshing: Set[str] = set()
+_refreshing_lock = threading.Lock()
+_refresher_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _refresher() -> ThreadPoolExecutor:
+    global _refresher_pool
+    with _refreshing_lock:
+        if _refresher_pool is None:
+            _refresher_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tool-cache-refresh")
+        return _refresher_pool
+
+
+class ToolResultError(Exception):
+    """A tool returned an error payload instead of raising; `payload` is what it returned."""
+
+    def __init__(self, tool_name: str, payload: Any):
+        super().__init__(f"{tool_name} returned an error: {error_message(payload)}")
+        self.payload = payload
+
+
+def error_message(value: Any) -> Optional[str]:
+    """Return the error a tool result reports in place of results, or None for a real result."""
+    if isinstance(value, str) and value.startswith(ERROR_PREFIXES):
+        return value
+    if isinstance(value, dict) and set(value) == {"error"}:  # Tavily
+        return str(value["error"])
+    return None
+
+
+def normalize_args(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Return `args` without None values, with strings lower-cased and whitespace collapsed."""
+
+    def norm(value):
+        if isinstance(value, str):
+            return " ".join(value.lower().split())
+        if isinstance(value, (list, tuple)):
+            return [norm(v) for v in value]
+        if isinstance(value, dict):
+            return {k: norm(v) for k, v in sorted(value.items()) if v is not None}
+        return value
+
+    return {k: norm(v) for k, v in sorted(args.items()) if v is not None}
+
+
+def cache_key(tool_name: str, args: Dict[str, Any]) -> str:
+    payload = json.dumps([tool_name, normalize_args(args)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Thread-safe SQLite key/value store with LRU eviction above `max_bytes`."""
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        self._size = self._stored_size()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _stored_size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, age in seconds) or None, marking the entry as recently used."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), now - row[1]
+
+    def set(self, key: str, tool_name: str, value: Any) -> None:
+        data = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool_name, data, len(data), now, now),
+            )
+            self._size += len(data) - (replaced[0] if replaced else 0)
+            self._writes += 1
+            if self._writes % _RESYNC_WRITES == 0:
+                self._size = self._stored_size()
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # The running size may miss other processes' writes and evictions
+        total = self._stored_size()
+        removed = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            removed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", removed)
+        self._size = total
+
+    def stats(self) -> Dict[str, int]:
+        """Entries and bytes stored, and lookups found (fresh or stale) or missing since start."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._size = 0
+
+
+class CachedTool(BaseTool):
+    """A tool that serves repeated calls of `tool` from a `DiskCache`."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    tool: BaseTool
+    cache: DiskCache
+    ttl: float
+    stale: float = 0.0
+
+    def __init__(self, tool: BaseTool, cache: DiskCache, ttl: float, stale: float = 0.0, **kwargs: Any):
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.tool_call_schema,
+            tool=tool,
+            cache=cache,
+            ttl=ttl,
+            stale=stale,
+            **kwargs,
+        )
+
+    def _call(self, args: Dict[str, Any], config: Optional[RunnableConfig] = None) -> Any:
+        value = self.tool.invoke({k: v for k, v in args.items() if v is not None}, config)
+        if error_message(value) is not None:
+            raise ToolResultError(self.name, value)
+        return value
+
+    def _refresh(self, key: str, args: Dict[str, Any]) -> None:
+        try:
+            self.cache.set(key, self.name, self._call(args))
+        except Exception:
+            logger.warning("Background refresh of %s failed", self.name, exc_info=True)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    def _run(
+        self,
+        config: RunnableConfig,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+        **kwargs: Any,
+    ) -> Any:
+        key = cache_key(self.name, kwargs)
+        hit = self.cache.get(key)
+        if hit is not None:
+            value, age = hit
+            if age <= self.ttl:
+                return value
+            if age <= self.ttl + self.stale:
+                with _refreshing_lock:
+                    start = key not in _refreshing
+                    _refreshing.add(key)
+                if start:
+                    _refresher().submit(self._refresh, key, kwargs)
+                return value
+
+        child_config = patch_config(config, callbacks=run_manager.get_child()) if run_manager else config
+        try:
+            value = self._call(kwargs, child_config)
+        except Exception as e:
+            if hit is not None:
+                logger.warning("%s failed; serving an expired cached result", self.name, exc_info=True)
+                return hit[0]
+            if isinstance(e, ToolResultError):
+                return e.payload
+            raise
+        self.cache.set(key, self.name, value)
+        return value
+
+
+def tool_ttl(tool_name: str) -> Tuple[float, float]:
+    """Return (fresh, stale) seconds for a tool.
+
+    `TOOL_CACHE_TTL_<NAME>` overrides the fresh TTL and `TOOL_CACHE_STALE_<NAME>`
+    the stale window after it (0: expired entries are only served when the
+    provider fails).
+    """
+    fresh, stale = DEFAULT_TTLS.get(tool_name, FALLBACK_TTL)
+    fresh = float(os.environ.get(f"TOOL_CACHE_TTL_{tool_name.upper()}") or fresh)
+    stale = float(os.environ.get(f"TOOL_CACHE_STALE_{tool_name.upper()}") or stale)
+    return fresh, stale
+
+
+_default_cache: Optional[DiskCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> Optional[DiskCache]:
+    """Return the process-wide cache from the environment, or None if disabled."""
+    global _default_cache
+    if os.environ.get("TOOL_CACHE", "on").lower() in ("0", "off", "false", "no"):
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                cache_dir = os.environ.get("TOOL_CACHE_DIR", os.path.join(".cache", "tools"))
+                max_bytes = int(float(os.environ.get("TOOL_CACHE_MAX_MB", "64")) * 1024 * 1024)
+                _default_cache = DiskCache(os.path.join(cache_dir, "tools.sqlite3"), max_bytes)
+    return _default_cache
+
+
+def cache_tools(tools: List[BaseTool], cache: Optional[DiskCache] = None) -> List[BaseTool]:
+    """Wrap each tool in a `CachedTool` (unchanged if caching is disabled)."""
+    cache = cache or default_cache()
+    if cache is None:
+        return list(tools)
+    return [CachedTool(tool, cache, *tool_ttl(tool.name)) for tool in tools]
@@ -0,0 +1,220 @@
+"""Compact in-memory vector store with int8 / binary quantization.
+
+The in-memory Qdrant store keeps every chunk vector as float32 (6 KiB per
+`text-embedding-3-small` vector). `QuantizedVectorStore` keeps only compact
+codes in RAM:
+- "int8": per-dimension symmetric scalar quantization (4x smaller); the scale
+  follows the running per-dimension maximum, and rows encoded before it last
+  grew are re-encoded from the full-precision vectors by `finish` (or the
+  next search), so no batch is clipped to the range of an earlier one,
+- "binary": one sign bit per dimension, scored by Hamming distance (32x smaller),
+- "float32": unquantized, used as the exact baseline in reports.
+
+The full-precision vectors of a quantized store are written to a temporary
+memory-mapped file, not kept in RAM: `vectors` reads them back (so a new
+index can copy unchanged rows instead of re-embedding them), and with
+rescoring enabled a search over-fetches `k * oversampling` candidates with
+the codes and re-ranks them with exact cosine similarity read from disk.
+
+Vectors are L2-normalised on insert, so scores approximate cosine similarity.
+The store holds vectors only, addressed by row: callers keep chunk texts and
+metadata elsewhere (see `app.chunkstore`) and pass the rows a filter allows
+to `search_rows`.
+"""
+from __future__ import annotations
+
+import tempfile
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+QUANTIZATION_MODES = ("float32", "int8", "binary")
+
+# Number of set bits in every byte value, for Hamming distances on packed codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Rows scored per block, bounding the float32 temporaries created while scanning codes
+_BLOCK_ROWS = 16384
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class QuantizedVectorStore:
+    """Brute-force vector store over quantized codes with optional exact rescoring."""
+
+    def __init__(self, quantization: str = "int8", rescore_oversampling: float = 0.0):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(
+                f"Unknown quantization {quantization!r}; expected one of {QUANTIZATION_MODES}"
+            )
+        self.quantization = quantization
+        self.rescore_oversampling = rescore_oversampling
+        self._dim: Optional[int] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scale: Optional[np.ndarray] = None
+        self._stale = 0  # rows [0, _stale) were encoded with an older int8 scale
+        self._full_file = None
+        self._full: Optional[np.ndarray] = None
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    # -- encoding -------------------------------------------------------------
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.quantization == "float32":
+            return vectors
+        if self.quantization == "binary":
+            return np.packbits(vectors > 0, axis=1)
+        scale = (np.abs(vectors).max(axis=0) / 127.0).astype(np.float32)
+        if self._scale is None:
+            self._scale = scale
+        elif (scale > self._scale).any():
+            self._scale = np.maximum(self._scale, scale)
+            self._stale = self._rows
+        return self._quantize(vectors)
+
+    def _quantize(self, vectors: np.ndarray) -> np.ndarray:
+        # A dimension with a zero scale has only held zeros; any divisor keeps them zero
+        scale = np.where(self._scale > 0.0, self._scale, 1.0)
+        return np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+
+    def finish(self) -> "QuantizedVectorStore":
+        """Re-encode the rows quantized with an older int8 scale (call once the last batch is added)."""
+        for start in range(0, self._stale, _BLOCK_ROWS):
+            stop = min(self._stale, start + _BLOCK_ROWS)
+            self._codes[start:stop] = self._quantize(np.asarray(self._full[start:stop]))
+        self._stale = 0
+        return self
+
+    def _scores(self, query: np.ndarray, rows) -> np.ndarray:
+        codes = self._codes[rows]
+        if self.quantization == "float32":
+            return codes @ query
+        if self.quantization == "int8":
+            return codes.astype(np.float32) @ (query * self._scale)
+        bits = np.packbits(query > 0)
+        distance = _POPCOUNT[np.bitwise_xor(codes, bits)].sum(axis=1, dtype=np.int32)
+        return 1.0 - 2.0 * distance / self._dim
+
+    def _append_full(self, vectors: np.ndarray) -> None:
+        if self._full_file is None:
+            self._full_file = tempfile.TemporaryFile(prefix="rag-vectors-")
+        self._full_file.seek(0, 2)
+        self._full_file.write(vectors.tobytes())
+        self._full_file.flush()
+        self._full = np.memmap(
+            self._full_file, dtype=np.float32, mode="r", shape=(self._rows, self._dim)
+        )
+
+    # -- rows -----------------------------------------------------------------
+
+    def add_vectors(self, embeddings: Sequence[Sequence[float]]) -> range:
+        """Add vectors and return their rows (consecutive, in order)."""
+        if not len(embeddings):
+            return range(self._rows, self._rows)
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        if self._dim is None:
+            self._dim = vectors.shape[1]
+        codes = self._encode(vectors)
+        self._codes = codes if self._codes is None else np.concatenate([self._codes, codes])
+        rows = range(self._rows, self._rows + len(vectors))
+        self._rows = rows.stop
+        if self.quantization != "float32":
+            self._append_full(vectors)
+        return rows
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        """Return the (L2-normalised) float32 vectors of `rows`."""
+        source = self._codes if self.quantization == "float32" else self._full
+        if source is None or not len(rows):
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        return np.asarray(source[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+
+    def search_rows(
+        self, embedding: Sequence[float], k: int, rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """Return (row, score) pairs of the top-k rows (optionally among sorted `rows`), best first."""
+        n = self._rows if rows is None else len(rows)
+        if n == 0:
+            return []
+        if self._stale:
+            self.finish()
+        query = _normalize(np.asarray([embedding], dtype=np.float32))[0]
+        rescore = self._full is not None and self.rescore_oversampling > 0
+        fetch = min(n, max(k, int(np.ceil(k * self.rescore_oversampling))) if rescore else k)
+        scores = np.concatenate(
+            [
+                self._scores(query, slice(i, i + _BLOCK_ROWS) if rows is None else rows[i:i + _BLOCK_ROWS])
+                for i in range(0, n, _BLOCK_ROWS)
+            ]
+        )
+        top = np.argpartition(-scores, fetch - 1)[:fetch] if fetch < n else np.arange(n)
+        top_rows = top if rows is None else rows[top]
+        if rescore:
+            candidates = np.sort(top_rows)  # ascending rows read the memmap sequentially
+            exact = np.asarray(self._full[candidates]) @ query
+            order = np.argsort(-exact)[:k]
+            return [(int(candidates[j]), float(exact[j])) for j in order]
+        order = np.argsort(-scores[top])[:k]
+        return [(int(top_rows[j]), float(scores[top[j]])) for j in order]
+
+    # -- reporting ------------------------------------------------------------
+
+    def memory_bytes(self) -> int:
+        """Bytes of vector data resident in RAM (codes plus int8 scales)."""
+        total = self._codes.nbytes if self._codes is not None else 0
+        if self._scale is not None:
+            total += self._scale.nbytes
+        return total
+
+    def disk_bytes(self) -> int:
+        """Bytes of full-precision vectors kept on disk (for rescoring and `vectors`)."""
+        return self._full.nbytes if self._full is not None else 0
+
+
+def quantization_report(
+    batches: Iterable[Sequence[Sequence[float]]],
+    query_vectors: List[List[float]],
+    k: int = 4,
+    oversampling: float = 4.0,
+) -> List[dict]:
+    """Compare memory and recall@k of each quantization mode against exact float32 search.
+
+    `batches` of vectors are read once and added to every store as they
+    arrive, the way ingestion adds them, so the int8 scales evolve as they
+    do in production.
+    """
+    exact = QuantizedVectorStore("float32")
+    configs = [("float32", 0.0)] + [
+        (mode, rescore) for mode in ("int8", "binary") for rescore in (0.0, oversampling)
+    ]
+    stores = [QuantizedVectorStore(mode, rescore) for mode, rescore in configs]
+    for batch in batches:
+        for store in [exact] + stores:
+            store.add_vectors(batch)
+    truth = [{i for i, _ in exact.search_rows(q, k)} for q in query_vectors]
+
+    rows = []
+    for store in stores:
+        store.finish()
+        hits = sum(
+            len(expected & {i for i, _ in store.search_rows(q, k)})
+            for q, expected in zip(query_vectors, truth)
+        )
+        rows.append(
+            {
+                "quantization": store.quantization,
+                "rescore_oversampling": store.rescore_oversampling,
+                "ram_bytes": store.memory_bytes(),
+                "disk_bytes": store.disk_bytes(),
+                f"recall@{k}": hits / max(1, sum(len(t) for t in truth)),
+            }
+        )
+    return rows
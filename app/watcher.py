@@ -0,0 +1,116 @@
+"""Polling watcher for the PDF library directory.
+
+`LibraryWatcher` stats the PDFs under a directory every `interval` seconds
+and calls `on_change` with the added, modified and deleted paths. A change is
+reported only once the directory listing is unchanged for one more poll, so
+a PDF that is still being copied is not picked up half-written. Polling
+keeps it dependency-free and works on bind mounts and network shares where
+file-system events are unreliable.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.textstore import list_pdfs
+
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size) of a PDF; any difference counts as a modification
+_Stamp = Tuple[int, int]
+
+
+@dataclass
+class LibraryChanges:
+    """PDF paths added, modified and deleted since the last reported state."""
+
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.deleted)
+
+
+def snapshot(data_dir: str) -> Dict[str, _Stamp]:
+    """Return {path: (mtime_ns, size)} for the PDFs under `data_dir`."""
+    stamps: Dict[str, _Stamp] = {}
+    for path in list_pdfs(data_dir):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # deleted between listing and stat
+        stamps[path] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+def _diff(old: Dict[str, _Stamp], new: Dict[str, _Stamp]) -> LibraryChanges:
+    return LibraryChanges(
+        added=sorted(set(new) - set(old)),
+        modified=sorted(p for p in set(new) & set(old) if new[p] != old[p]),
+        deleted=sorted(set(old) - set(new)),
+    )
+
+
+class LibraryWatcher:
+    """Background thread that reports PDF additions, modifications and deletions."""
+
+    def __init__(
+        self,
+        data_dir: str,
+        on_change: Callable[[LibraryChanges], None],
+        interval: float = 30.0,
+    ):
+        self.data_dir = data_dir
+        self.on_change = on_change
+        self.interval = interval
+        self._reported = snapshot(data_dir)
+        self._pending: Optional[Dict[str, _Stamp]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> LibraryChanges:
+        """Check the directory once; call and return the changes if they have settled."""
+        current = snapshot(self.data_dir)
+        if current == self._reported:
+            self._pending = None
+            return LibraryChanges()
+        if current != self._pending:
+            # Changed since the last poll: wait one more interval for writes to finish
+            self._pending = current
+            return LibraryChanges()
+
+        changes = _diff(self._reported, current)
+        logger.info(
+            "PDF library changed: %d added, %d modified, %d deleted",
+            len(changes.added), len(changes.modified), len(changes.deleted),
+        )
+        try:
+            self.on_change(changes)
+        except Exception:
+            # Keep the previous state so the change is retried on the next poll
+            logger.exception("Reloading the PDF library failed")
+            self._pending = None
+            return changes
+        self._reported, self._pending = current, None
+        return changes
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self) -> "LibraryWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rag-library-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def gpt4o_encoding():
+    """tiktoken's gpt-4o encoding; skips the test when its BPE file cannot be loaded (offline, empty cache)."""
+    tiktoken = pytest.importorskip("tiktoken")
+    try:
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception as e:
+        pytest.skip(f"tiktoken encoding unavailable: {e!r}")
+
+
+@pytest.fixture
+def pdf_dir(tmp_path):
+    """A data directory with one small rice-disease PDF."""
+    fitz = pytest.importorskip("fitz")
+    data = tmp_path / "data"
+    data.mkdir()
+    document = fitz.open()
+    for text in (
+        "Rice blast is caused by the fungus Magnaporthe oryzae. Lesions on leaves are diamond shaped.",
+        "False smut replaces grains in the panicle with smut balls. Ustilaginoidea virens is the pathogen.",
+    ):
+        document.new_page().insert_text((72, 72), text, fontsize=9)
+    document.save(str(data / "Fungus Chapter 1.pdf"))
+    document.close()
+    return data
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.admin import AdminAPI, admin_routes
+
+
+class Executor:
+    built_agent = None
+
+    def __init__(self):
+        self.warmups = 0
+
+    def warm_up(self):
+        self.warmups += 1
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE", "off")
+    return AdminAPI(Executor(), token="secret")
+
+
+AUTH = {"Authorization": "Bearer secret"}
+
+
+def client(api, **headers):
+    return TestClient(Starlette(routes=[Mount("/admin", routes=api.routes())]), headers=headers)
+
+
+def test_no_routes_without_token(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert admin_routes(Executor()) == []
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert len(admin_routes(Executor())) == 1
+
+
+def test_requests_need_the_bearer_token(api):
+    assert client(api).get("/admin/stats").status_code == 401
+    response = client(api, Authorization="Bearer wrong").get("/admin/stats")
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+
+def test_stats_report_unbuilt_components_as_null(api):
+    response = client(api, **AUTH).get("/admin/stats")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["agent_ready"] is False
+    assert body["caches"]["tools"] is None and body["caches"]["answers"] is None
+    assert body["task_store"] is None and body["push_configs"] is None and body["push_delivery"] is None
+
+
+def test_stats_ignore_stores_of_unknown_layout(monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE", "off")
+    api = AdminAPI(
+        Executor(),
+        task_store=SimpleNamespace(tasks=[], lock=None),
+        push_config_store=SimpleNamespace(_push_notification_infos="opaque"),
+        token="secret",
+    )
+    body = client(api, **AUTH).get("/admin/stats").json()
+    assert body["task_store"] is None and body["push_configs"] is None
+
+
+def test_bad_requests_are_rejected(api):
+    admin = client(api, **AUTH)
+    response = admin.post("/admin/warmup", json={"questions": "what causes blast?"})
+    assert response.status_code == 400
+    assert "list of strings" in response.json()["error"]
+    assert api.agent_executor.warmups == 0
+
+    assert admin.post("/admin/caches/invalidate", json=["tools"]).status_code == 400
+    response = admin.post("/admin/caches/invalidate", json={"caches": ["nope"]})
+    assert response.status_code == 400 and "nope" in response.json()["error"]
+
+
+def test_invalidate_with_nothing_built(api):
+    response = client(api, **AUTH).post("/admin/caches/invalidate", json={"caches": ["tools", "answers"]})
+    assert response.status_code == 200
+    assert response.json() == {"cleared": {}}
@@ -0,0 +1,104 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from a2a.server.agent_execution import RequestContext
+from a2a.types import DataPart, Message, MessageSendParams, Part, Role, TextPart
+
+from app import agent_executor
+from app.agent_executor import GeneralAgentExecutor, batch_queries
+
+
+def context(*parts, metadata=None):
+    message = Message(role=Role.user, message_id=uuid.uuid4().hex, parts=list(parts), metadata=metadata)
+    return RequestContext(MessageSendParams(message=message))
+
+
+def data(**values):
+    return Part(root=DataPart(data=values))
+
+
+class FakeAgent:
+    """Answers each query with its upper-cased text; "fail" raises."""
+
+    graph = SimpleNamespace(checkpointer=None)
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.queries = []
+
+    async def stream(self, query, context_id, deadline_s=None):
+        self.queries.append(query)
+        await asyncio.sleep(self.delay)
+        if query == "fail":
+            raise RuntimeError("agent down")
+        yield {"is_task_complete": True, "require_user_input": False, "content": query.upper()}
+
+
+class Updater:
+    def __init__(self, fail_after=None):
+        self.artifacts = {}
+        self.completed = False
+        self.fail_after = fail_after
+
+    async def update_status(self, *args, **kwargs):
+        pass
+
+    async def add_artifact(self, parts, name):
+        if self.fail_after is not None and len(self.artifacts) >= self.fail_after:
+            raise RuntimeError("queue closed")
+        self.artifacts[name] = parts[0].root.data
+
+    async def complete(self):
+        self.completed = True
+
+
+TASK = SimpleNamespace(id="task", context_id="ctx")
+
+
+def test_batch_queries():
+    assert batch_queries(context(Part(root=TextPart(text="what causes blast?")))) is None
+    assert batch_queries(context(data(queries=["a", "b"]))) == ["a", "b"]
+    for queries in (["a", 3], ["a", "  "], "a", []):
+        with pytest.raises(ValueError):
+            batch_queries(context(data(queries=queries)))
+
+
+def test_batch_size_is_capped(monkeypatch):
+    monkeypatch.setattr(agent_executor, "BATCH_MAX_QUERIES", 2)
+    with pytest.raises(ValueError, match="1 to 2"):
+        batch_queries(context(data(queries=["a", "b", "c"])))
+
+
+def test_invalid_requests_are_explained():
+    executor = GeneralAgentExecutor(FakeAgent())
+    assert executor._validate_request(context(data(queries=["a"]))) is None
+    assert "non-empty strings" in executor._validate_request(context(data(queries=[None])))
+    assert "negative" in executor._validate_request(context(data(queries=["a"]), metadata={"deadline_s": -1}))
+
+
+def test_batch_runs_duplicates_once_and_reports_each_item():
+    agent = FakeAgent()
+    updater = Updater()
+    executor = GeneralAgentExecutor(agent, batch_concurrency=2)
+    asyncio.run(executor._execute_batch(["blast", "fail", " Blast "], TASK, updater))
+    assert sorted(agent.queries) == ["blast", "fail"]
+    assert updater.artifacts["item-0"]["message"] == updater.artifacts["item-2"]["message"] == "BLAST"
+    assert updater.artifacts["item-1"]["status"] == "error"
+    assert updater.artifacts["summary"] == {"total": 3, "unique": 2, "completed": 2, "error": 1}
+    assert updater.completed
+
+
+def test_failed_artifact_cancels_the_remaining_items():
+    async def run():
+        agent = FakeAgent(delay=0.05)
+        executor = GeneralAgentExecutor(agent, batch_concurrency=1)
+        with pytest.raises(RuntimeError, match="queue closed"):
+            await executor._execute_batch(["a", "b", "c", "d"], TASK, Updater(fail_after=0))
+        await asyncio.sleep(0.2)
+        return agent.queries
+
+    # The items still waiting for the semaphore were cancelled
+    queries = asyncio.run(run())
+    assert queries[0] == "a" and "c" not in queries and "d" not in queries
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from app import answers
+from app.answers import AnswerStore, StoredAnswer, extract_citations, library_files, normalize_question
+
+
+QUESTION = "What causes leaf blast in rice?"
+
+
+@pytest.fixture
+def library(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "blast.pdf").write_bytes(b"%PDF blast")
+    return data
+
+
+def write_store(path, data_dir):
+    stored = StoredAnswer(QUESTION, "completed", "Magnaporthe oryzae [blast.pdf, p. 2]")
+    path.write_text(json.dumps({
+        "files": library_files(str(data_dir)),
+        "answers": {normalize_question(QUESTION): stored.__dict__},
+    }))
+
+
+def test_normalize_and_citations():
+    assert normalize_question("  What causes LEAF blast, in rice?? ") == "what causes leaf blast in rice"
+    assert extract_citations("a [x.pdf, p. 2] b [x.pdf, p. 2] [y.PDF]") == [
+        {"file": "x.pdf", "pages": "2"}, {"file": "y.PDF", "pages": ""},
+    ]
+
+
+def test_lookup_serves_answers_for_the_stored_library(library, tmp_path):
+    path = tmp_path / "answers.json"
+    write_store(path, library)
+    store = AnswerStore(str(path), str(library), check_interval=0)
+    assert store.lookup("what causes leaf blast in rice").message.startswith("Magnaporthe")
+    assert store.lookup("What causes sheath blight?") is None
+
+    # Same content with a new mtime is re-hashed and still matches
+    (library / "blast.pdf").write_bytes(b"%PDF blast")
+    assert store.lookup(QUESTION) is not None
+    (library / "blast.pdf").write_bytes(b"%PDF changed")
+    assert store.lookup(QUESTION) is None
+    assert (store.lookups, store.hits) == (4, 2)
+
+
+def test_library_is_checked_once_per_interval(library, tmp_path, monkeypatch):
+    path = tmp_path / "answers.json"
+    write_store(path, library)
+    snapshots = []
+    real_snapshot = answers.snapshot
+    monkeypatch.setattr(answers, "snapshot", lambda data_dir: snapshots.append(data_dir) or real_snapshot(data_dir))
+    clock = [100.0]
+    monkeypatch.setattr(answers.time, "monotonic", lambda: clock[0])
+
+    store = AnswerStore(str(path), str(library), check_interval=5)
+    for _ in range(3):
+        assert store.lookup(QUESTION) is not None
+    assert len(snapshots) == 1
+
+    # A change is seen once the interval has passed
+    (library / "blast.pdf").write_bytes(b"%PDF changed")
+    assert store.lookup(QUESTION) is not None
+    clock[0] += 5
+    assert store.lookup(QUESTION) is None
+    assert len(snapshots) == 2
+
+    # A rebuilt store file, or invalidate(), checks again straight away
+    write_store(path, library)
+    snapshots.clear()
+    assert store.lookup(QUESTION) is not None
+    store.invalidate()
+    assert store.lookup(QUESTION) is not None
+    assert len(snapshots) == 2
+
+
+def test_missing_store_serves_nothing(library, tmp_path):
+    store = AnswerStore(str(tmp_path / "missing.json"), str(library))
+    assert store.lookup(QUESTION) is None
+    assert len(store) == 0
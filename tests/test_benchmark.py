@@ -0,0 +1,47 @@
+import asyncio
+from unittest import mock
+
+from app.benchmark import DEFAULT_QUERIES, bench_agent
+from app.fakes import build_offline_agent
+
+
+def test_offline_agent_benchmark(pdf_dir, gpt4o_encoding, monkeypatch):
+    import app.rag as rag
+
+    monkeypatch.setenv("RAG_WATCH_INTERVAL", "0")
+    monkeypatch.setenv("RAG_TEXT_STORE", "off")
+    agent, rag_graph = build_offline_agent(str(pdf_dir))
+    with mock.patch.object(rag, "_get_rag_graph", lambda: rag_graph):
+        report = asyncio.run(bench_agent(agent, DEFAULT_QUERIES[:2], requests=2, concurrency=2))
+    summary = report.summary()
+
+    assert set(summary) == {
+        "mode", "requests", "errors", "wall_time_s", "throughput_rps", "latency_s",
+        "llm_calls_per_request", "stage_time_per_request_s",
+    }
+    assert (summary["mode"], summary["requests"], summary["errors"]) == ("agent", 2, 0)
+    assert set(summary["latency_s"]) == {"mean", "p50", "p95", "p99"}
+    assert summary["llm_calls_per_request"] >= 1
+    assert summary["stage_time_per_request_s"]
+
+
+def test_a2a_benchmark_closes_its_push_sender(pdf_dir, gpt4o_encoding, monkeypatch):
+    import app.rag as rag
+    from app.benchmark import bench_a2a
+    from app.push import QueuedPushNotificationSender
+
+    monkeypatch.setenv("RAG_WATCH_INTERVAL", "0")
+    monkeypatch.setenv("RAG_TEXT_STORE", "off")
+    closed = []
+    aclose = QueuedPushNotificationSender.aclose
+
+    async def recording_aclose(self, timeout=5.0):
+        await aclose(self, timeout)
+        closed.append(self._client.is_closed)
+
+    monkeypatch.setattr(QueuedPushNotificationSender, "aclose", recording_aclose)
+    agent, rag_graph = build_offline_agent(str(pdf_dir))
+    with mock.patch.object(rag, "_get_rag_graph", lambda: rag_graph):
+        report = asyncio.run(bench_a2a(agent, DEFAULT_QUERIES[:1], requests=2, concurrency=2))
+    assert report.summary()["errors"] == 0
+    assert closed == [True]
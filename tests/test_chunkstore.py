@@ -0,0 +1,65 @@
+from langchain_core.documents import Document
+
+from app.chunkstore import ChunkStore
+
+
+def chunk(text, source, page, diseases, **extra):
+    metadata = {
+        "source": source,
+        "file_hash": source.upper(),
+        "page": page,
+        "start_index": 10 * page,
+        "diseases": diseases,
+        "chapter": source[:-4],
+        **extra,
+    }
+    return Document(page_content=text, metadata=metadata)
+
+
+def sample():
+    return [
+        chunk("blast on leaves", "a.pdf", 0, ["blast"]),
+        chunk("neck blast ü", "a.pdf", 1, ["blast"], duplicates=[{"source": "c.pdf", "page": 2}]),
+        chunk("false smut", "b.pdf", 1, ["false smut"]),
+        chunk("tungro", "b.pdf", 1, []),
+    ]
+
+
+def test_round_trip():
+    chunks = sample()
+    store = ChunkStore()
+    store.extend(chunks)
+    assert len(store) == 4
+    for original, stored in zip(chunks, store.documents()):
+        assert stored.page_content == original.page_content
+        assert stored.metadata == original.metadata
+    assert [d.page_content for d in store.documents([2, 0])] == ["false smut", "blast on leaves"]
+
+
+def test_returned_metadata_cannot_alter_the_store():
+    store = ChunkStore()
+    store.extend(sample())
+    store.metadata(0)["diseases"].append("tungro")
+    store.metadata(1)["duplicates"].clear()
+    assert store.metadata(0)["diseases"] == ["blast"]
+    assert store.metadata(1)["duplicates"] == [{"source": "c.pdf", "page": 2}]
+
+
+def test_filter_ids():
+    store = ChunkStore()
+    store.extend(sample())
+    assert store.filter_ids({"diseases": ["blast"]}).tolist() == [0, 1]
+    assert store.filter_ids({"diseases": ["blast", "false smut"], "chapter": ["b"]}).tolist() == [2]
+    assert store.filter_ids({"page": 1}).tolist() == [1, 2, 3]
+    assert store.filter_ids({"source": ["a.pdf"], "page": [0]}).tolist() == [0]
+    assert store.filter_ids({}).tolist() == [0, 1, 2, 3]
+
+
+def test_counts_and_duplicates():
+    store = ChunkStore()
+    store.extend(sample())
+    assert store.page_count() == 3
+    store.set_duplicates(0, [{"source": "d.pdf", "page": 5}])
+    assert store.metadata(0)["duplicates"] == [{"source": "d.pdf", "page": 5}]
+    assert store.nbytes() > len("blast on leavesneck blast üfalse smuttungro")
+    assert ChunkStore().page_count() == 0
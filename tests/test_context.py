@@ -0,0 +1,71 @@
+from langchain_core.documents import Document
+
+from app.context import MIN_TRUNCATED_TOKENS, _merge_adjacent, citation_headers, pack_context
+
+
+class WordEncoding:
+    """Deterministic stand-in tokenizer: one token per whitespace-separated word."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def chunk(text, source="/data/a.pdf", page=None, start=0, **meta):
+    metadata = {"source": source, "start_index": start, **meta}
+    if page is not None:
+        metadata["page"] = page
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_citation_headers_include_duplicates_once():
+    meta = {
+        "source": "/data/a.pdf",
+        "page": 3,
+        "duplicates": [{"source": "/data/b.pdf", "page": 1}, {"source": "/data/a.pdf", "page": 3}],
+    }
+    assert citation_headers(meta) == ["[a.pdf, p. 3]", "[b.pdf, p. 1]"]
+    assert citation_headers({}) == ["[unknown.pdf]"]
+
+
+def test_adjacent_pages_merge_in_page_order_and_keep_best_rank():
+    docs = [
+        chunk("b p5", "/data/b.pdf", 5),
+        chunk("a p3", "/data/a.pdf", 3),
+        chunk("a p2 late", "/data/a.pdf", 2, start=900),
+        chunk("a p2", "/data/a.pdf", 2, start=10),
+        chunk("a p9", "/data/a.pdf", 9),
+        chunk("no page", "/data/c.pdf"),
+    ]
+    passages = _merge_adjacent(docs)
+    assert [[d.page_content for d in p.docs] for p in passages] == [
+        ["b p5"],
+        ["a p2", "a p2 late", "a p3"],
+        ["a p9"],
+        ["no page"],
+    ]
+    assert [p.rank for p in passages] == [0, 1, 4, 5]
+
+
+def test_pack_context_renders_headers_and_respects_budget():
+    docs = [chunk("blast " * 200, "/data/a.pdf", 1), chunk("smut " * 200, "/data/b.pdf", 4)]
+    unlimited = pack_context(docs)
+    assert unlimited.startswith("[a.pdf, p. 1]\nblast")
+    assert "\n\n[b.pdf, p. 4]\nsmut" in unlimited
+
+    words = WordEncoding()
+    # Each header is 3 words: "[a.pdf,", "p.", "1]"
+    first, second_header = 3 + 200, 3
+    packed = pack_context(docs, token_budget=first + second_header + MIN_TRUNCATED_TOKENS + 10, encoding=words)
+    assert packed.startswith("[a.pdf, p. 1]\nblast")
+    assert packed.endswith(" …")
+    assert packed.count("[b.pdf, p. 4]") == 1
+    assert len(packed) < len(unlimited)
+
+    # A remainder too small for a useful excerpt is left out entirely
+    too_small = first + second_header + MIN_TRUNCATED_TOKENS - 1
+    assert "[b.pdf" not in pack_context(docs, token_budget=too_small, encoding=words)
+    # The excerpt fills the remaining 50 tokens, less the last word cut at the word boundary
+    assert packed.split("[b.pdf, p. 4]\n")[1] == "smut " * (MIN_TRUNCATED_TOKENS + 9) + "…"
@@ -0,0 +1,43 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.deadline import CRITICAL, DEGRADED, EXPIRED, NORMAL, best_available_answer, deadline_phase
+
+
+def config(deadline, budget=10.0):
+    return {"configurable": {"deadline": deadline, "latency_budget": budget}}
+
+
+def test_deadline_phase():
+    assert deadline_phase(None) == NORMAL
+    assert deadline_phase({"configurable": {}}) == NORMAL
+    assert deadline_phase(config(100.0), now=91.0) == NORMAL
+    assert deadline_phase(config(100.0), now=96.0) == DEGRADED
+    assert deadline_phase(config(100.0), now=99.0) == CRITICAL
+    assert deadline_phase(config(100.0), now=100.0) == EXPIRED
+
+
+def test_best_available_answer_prefers_the_current_turns_answer():
+    messages = [
+        HumanMessage("first question"),
+        AIMessage("old answer"),
+        HumanMessage("second question"),
+        AIMessage("", tool_calls=[{"name": "search", "args": {}, "id": "1"}]),
+        ToolMessage("evidence " * 500, tool_call_id="1"),
+        AIMessage("new answer"),
+        AIMessage("HELPFULNESS:Y"),
+    ]
+    assert best_available_answer(messages) == "new answer"
+
+
+def test_best_available_answer_falls_back_to_evidence():
+    messages = [
+        HumanMessage("first question"),
+        AIMessage("old answer"),
+        HumanMessage("second question"),
+        ToolMessage("evidence " * 500, tool_call_id="1"),
+    ]
+    answer = best_available_answer(messages)
+    assert answer.startswith("I ran out of time")
+    assert "old answer" not in answer
+    assert len(answer) < 1700
+    assert best_available_answer([HumanMessage("question")]).startswith("I could not complete")
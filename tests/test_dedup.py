@@ -0,0 +1,61 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from app.dedup import NUM_PERM, Deduplicator, deduplicate_chunks, minhash_signature
+
+
+WORDS = "rice blast lesions appear on leaves as diamond shaped spots with gray centers and brown margins".split()
+
+
+def chunk(text, source="a.pdf", page=0):
+    return Document(page_content=text, metadata={"source": source, "page": page})
+
+
+def estimated_similarity(a, b):
+    return float(np.mean(minhash_signature(a) == minhash_signature(b)))
+
+
+def test_signature_shape_and_determinism():
+    text = " ".join(WORDS)
+    assert minhash_signature(text).shape == (NUM_PERM,)
+    assert np.array_equal(minhash_signature(text), minhash_signature(text.upper()))
+
+
+def test_similarity_estimate_tracks_overlap():
+    text = " ".join(WORDS * 3)
+    assert estimated_similarity(text, text) == 1.0
+    one_word_changed = text.replace("gray", "grey", 1)
+    assert estimated_similarity(text, one_word_changed) >= 0.7
+    assert estimated_similarity(text, "sheath blight forms large lesions near the water line") < 0.2
+
+
+def test_near_duplicates_are_dropped_with_citations():
+    text = " ".join(WORDS * 3)
+    chunks = [
+        chunk(text, "a.pdf", 1),
+        chunk("false smut balls replace individual grains in the panicle", "a.pdf", 2),
+        chunk(text + " again", "b.pdf", 7),
+    ]
+    kept = deduplicate_chunks(chunks)
+    assert [c.page_content for c in kept] == [chunks[0].page_content, chunks[1].page_content]
+    assert kept[0].metadata["duplicates"] == [{"source": "b.pdf", "page": 7}]
+    assert "duplicates" not in chunks[0].metadata  # inputs are not modified
+
+
+def test_threshold_bounds_what_counts_as_duplicate():
+    text = " ".join(WORDS * 3)
+    edited = text.replace("gray", "grey")
+    similarity = estimated_similarity(text, edited)
+    assert len(deduplicate_chunks([chunk(text), chunk(edited)], threshold=similarity)) == 1
+    assert len(deduplicate_chunks([chunk(text), chunk(edited)], threshold=min(1.0, similarity + 0.05))) == 2
+    assert len(deduplicate_chunks([chunk(text), chunk(text)], threshold=0)) == 2
+
+
+def test_streaming_stage_reports_updated_canonical_chunks():
+    text = " ".join(WORDS * 3)
+    deduplicator = Deduplicator()
+    batches = list(deduplicator.stage([[chunk(text, "a.pdf", 1)], [chunk(text, "b.pdf", 2)]]))
+    assert [len(batch) for batch in batches] == [1, 0]
+    assert deduplicator.kept == 1
+    assert deduplicator.updated[0] is batches[0][0].metadata
+    assert batches[0][0].metadata["duplicates"] == [{"source": "b.pdf", "page": 2}]
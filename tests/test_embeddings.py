@@ -0,0 +1,97 @@
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from app import embeddings
+from app.embeddings import BatchingEmbeddings
+
+
+class Recorder(Embeddings):
+    """Embeds a text as [len(text), 1.0] and records each request."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+
+    def embed_documents(self, texts):
+        self.requests.append(list(texts))
+        time.sleep(self.delay)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def embed_concurrently(model, texts):
+    results = {}
+
+    def embed(text):
+        results[text] = model.embed_query(text)
+
+    threads = [threading.Thread(target=embed, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_queries_in_one_window_share_a_request():
+    inner = Recorder()
+    model = BatchingEmbeddings(inner, window=0.2, cache_size=0)
+    texts = ["a", "bb", "ccc", "bb"]
+    results = embed_concurrently(model, texts)
+    assert results == {"a": [1.0, 1.0], "bb": [2.0, 1.0], "ccc": [3.0, 1.0]}
+    assert len(inner.requests) == 1 and sorted(inner.requests[0]) == ["a", "bb", "ccc"]
+    assert model.stats()["queries"] == 4
+
+
+def test_large_windows_are_split(monkeypatch):
+    monkeypatch.setattr(embeddings, "MAX_BATCH_SIZE", 2)
+    inner = Recorder()
+    model = BatchingEmbeddings(inner, window=0.2, cache_size=0)
+    embed_concurrently(model, ["a", "bb", "ccc", "dddd", "eeeee"])
+    assert sorted(len(batch) for batch in inner.requests) == [1, 2, 2]
+
+
+def test_leader_does_not_flush_later_windows():
+    inner = Recorder(delay=0.5)
+    model = BatchingEmbeddings(inner, window=0.05, cache_size=0)
+    leader = threading.Thread(target=model.embed_query, args=("first",))
+    leader.start()
+    time.sleep(0.1)  # The first batch is in flight
+    # A later arrival leads its own window and need not wait for the first
+    started = time.monotonic()
+    assert model.embed_query("second") == [6.0, 1.0]
+    assert time.monotonic() - started < 0.8
+    leader.join()
+    assert inner.requests == [["first"], ["second"]]
+
+
+def test_cache_hits_return_copies():
+    inner = Recorder()
+    model = BatchingEmbeddings(inner, window=0, cache_size=2)
+    vector = model.embed_query("blast")
+    vector.append(99.0)
+    assert model.embed_query("blast") == [5.0, 1.0]
+    assert model.embed_query("blast") is not model.embed_query("blast")
+    assert len(inner.requests) == 1
+    model.embed_query("smut")
+    model.embed_query("tungro")  # Evicts "blast"
+    model.embed_query("blast")
+    assert len(inner.requests) == 4
+    assert model.stats() == {"queries": 7, "cache_hits": 3, "requests": 4, "cached": 2}
+
+
+def test_warm_embeds_only_missing_texts(monkeypatch):
+    monkeypatch.setattr(embeddings, "MAX_BATCH_SIZE", 2)
+    inner = Recorder()
+    model = BatchingEmbeddings(inner, window=0, cache_size=10)
+    model.embed_query("a")
+    assert model.warm(["a", "bb", "ccc", "bb", "dddd"]) == 3
+    assert inner.requests == [["a"], ["bb", "ccc"], ["dddd"]]
+    assert model.embed_query("ccc") == [3.0, 1.0]
+    assert len(inner.requests) == 3
+    model.clear()
+    assert model.stats()["cached"] == 0
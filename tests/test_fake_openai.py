@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from openai.types import CreateEmbeddingResponse
+from openai.types.chat import ChatCompletion
+from starlette.testclient import TestClient
+
+from app.fake_openai import StandInConfig, build_app, load_script
+from app.fakes import hash_embedding
+
+
+@pytest.fixture
+def client():
+    return TestClient(build_app(StandInConfig(embedding_dim=8)))
+
+
+def langchain_kwargs(client):
+    return {"api_key": "unused", "base_url": "http://testserver/v1", "http_client": client, "max_retries": 0}
+
+
+@tool
+def tavily_search(query: str) -> str:
+    """Search the web for current information."""
+    return query
+
+
+def test_chat_completion_has_the_openai_shape(client):
+    response = client.post("/v1/chat/completions", json={
+        "model": "gpt-4o-mini", "messages": [{"role": "user", "content": "What causes false smut?"}],
+    })
+    assert response.status_code == 200
+    completion = ChatCompletion.model_validate(response.json())
+    assert completion.choices[0].message.role == "assistant"
+    assert completion.choices[0].finish_reason in ("stop", "tool_calls")
+    assert completion.usage.total_tokens == completion.usage.prompt_tokens + completion.usage.completion_tokens
+    assert client.post("/v1/chat/completions", content=b"not json").status_code == 400
+
+
+def test_langchain_parses_answers_tool_calls_and_streams(client, tmp_path):
+    script = tmp_path / "script.json"
+    script.write_text(json.dumps([
+        {"match": "recent research", "tool_calls": [{"name": "tavily_search", "arguments": {"query": "blast"}}]},
+        {"match": "false smut", "content": "Ustilaginoidea virens causes false smut."},
+    ]))
+    client = TestClient(build_app(StandInConfig(rules=load_script(str(script)))))
+    model = ChatOpenAI(model="gpt-4o-mini", **langchain_kwargs(client))
+
+    assert model.invoke("What causes false smut?").content == "Ustilaginoidea virens causes false smut."
+    chunks = list(model.stream("What causes false smut?"))
+    assert "".join(c.content for c in chunks) == "Ustilaginoidea virens causes false smut."
+
+    message = model.bind_tools([tavily_search]).invoke("Find recent research on blast")
+    assert [(c["name"], c["args"]) for c in message.tool_calls] == [("tavily_search", {"query": "blast"})]
+
+
+def test_embeddings_have_the_openai_shape(client):
+    response = client.post("/v1/embeddings", json={"model": "text-embedding-3-small", "input": ["rice blast", "smut"]})
+    parsed = CreateEmbeddingResponse.model_validate(response.json())
+    assert [d.index for d in parsed.data] == [0, 1]
+    assert parsed.data[0].embedding == pytest.approx(hash_embedding("rice blast", 8))
+    assert client.post("/v1/embeddings", json={"input": []}).status_code == 400
+
+
+def test_langchain_embeddings_round_trip(client):
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", check_embedding_ctx_length=False, **langchain_kwargs(client))
+    # The OpenAI client asks for base64; the vectors decode to the same values
+    vector = embeddings.embed_query("rice blast")
+    assert vector == pytest.approx(hash_embedding("rice blast", 8), abs=1e-6)
+    assert len(embeddings.embed_documents(["a", "b", "c"])) == 3
+    assert client.get("/stats").json()["embedded_inputs"] == 4
@@ -0,0 +1,68 @@
+import numpy as np
+
+from app.hierarchy import SectionIndex, coarse_files
+from app.vectorstore import QuantizedVectorStore
+
+
+DIM = 32
+FILES, SECTIONS, CHUNKS = 6, 3, 20  # sections per file, chunks per section
+SECTION_PAGES = 4
+
+
+def corpus(seed=0):
+    """Chunks clustered by section around random topic vectors: (sources, pages, vectors)."""
+    rng = np.random.default_rng(seed)
+    sources, pages, vectors = [], [], []
+    for f in range(FILES):
+        for s in range(SECTIONS):
+            topic = rng.normal(size=DIM)
+            for c in range(CHUNKS):
+                sources.append(f"chapter {f}.pdf")
+                pages.append(s * SECTION_PAGES + c % SECTION_PAGES)
+                vectors.append(topic + 0.3 * rng.normal(size=DIM))
+    return sources, pages, np.asarray(vectors, dtype=np.float32)
+
+
+def build(sources, pages, vectors, min_candidates=40):
+    index = SectionIndex(files=2, min_candidates=min_candidates, section_pages=SECTION_PAGES)
+    # Added in batches, as refresh does
+    for start in range(0, len(vectors), 64):
+        end = start + 64
+        index.add(sources[start:end], pages[start:end], vectors[start:end])
+    return index.finish()
+
+
+def test_coarse_then_fine_search_finds_the_flat_top_chunk():
+    sources, pages, vectors = corpus()
+    index = build(sources, pages, vectors)
+    assert len(index) == FILES * SECTIONS
+    store = QuantizedVectorStore("float32")
+    store.add_vectors(vectors)
+
+    rng = np.random.default_rng(1)
+    queries = vectors[::7] + 0.3 * rng.normal(size=(len(vectors[::7]), DIM)).astype(np.float32)
+    for query in queries:
+        narrowed = index.candidates(query)
+        assert len(narrowed) < len(vectors)
+        flat = store.search_rows(query, 1)[0][0]
+        assert store.search_rows(query, 1, narrowed)[0][0] == flat
+
+
+def test_candidates_respect_allowed_ids():
+    sources, pages, vectors = corpus()
+    index = build(sources, pages, vectors)
+    allowed = np.arange(0, len(vectors), 3)
+    narrowed = index.candidates(vectors[0], allowed)
+    assert set(narrowed) <= set(allowed)
+    assert 0 in narrowed
+
+
+def test_small_libraries_are_searched_in_full(monkeypatch):
+    sources, pages, vectors = corpus()
+    assert build(sources, pages, vectors, min_candidates=len(vectors)).candidates(vectors[0]) is None
+    assert SectionIndex(files=0).finish().candidates(vectors[0]) is None
+
+    monkeypatch.delenv("RAG_COARSE_FILES", raising=False)
+    assert (coarse_files(), coarse_files(quantized=True)) == (0, 8)
+    monkeypatch.setenv("RAG_COARSE_FILES", "3")
+    assert coarse_files() == 3
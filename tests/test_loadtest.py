@@ -0,0 +1,87 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.loadtest import LoadReport, Scenario, TurnResult, _run_in_process, load_mix, run_load
+
+
+class Client:
+    """Answers `message/send` with a task in `state`; records (context_id, text) per turn."""
+
+    def __init__(self, state="completed"):
+        self.state = state
+        self.turns = []
+
+    async def send_message(self, request):
+        message = request.params.message
+        self.turns.append((message.context_id, message.parts[0].root.text))
+        task = SimpleNamespace(status=SimpleNamespace(state=self.state))
+        return SimpleNamespace(root=SimpleNamespace(result=task, error=None))
+
+
+def test_load_mix(tmp_path):
+    path = tmp_path / "mix.json"
+    path.write_text(json.dumps([{"name": "a", "turns": ["q1", "q2"], "weight": 2}, {"name": "b", "turns": ["q"]}]))
+    assert load_mix(str(path)) == [Scenario("a", ["q1", "q2"], 2.0), Scenario("b", ["q"], 1.0)]
+    path.write_text(json.dumps([{"name": "a", "turns": []}]))
+    with pytest.raises(ValueError):
+        load_mix(str(path))
+
+
+def test_report_summary():
+    report = LoadReport(wall_time=2.0, arrivals=3, dropped=1, results=[
+        TurnResult("a", 0, True, True, 1.0, first_event=0.1),
+        TurnResult("a", 1, True, True, 3.0, first_event=0.3),
+        TurnResult("b", 0, False, False, 5.0, error="timeout"),
+    ])
+    data = report.as_dict()
+    assert data["conversations"] == 2 and data["errors"] == {"timeout": 1}
+    overall = data["overall"]
+    assert (overall["turns"], overall["errors"], overall["throughput_tps"]) == (3, 1, 1.0)
+    assert overall["latency_s"]["p50"] == 2.0
+    assert overall["first_event_s"]["p50"] == pytest.approx(0.2)
+    assert data["scenarios"]["b"]["latency_s"] == {"p50": None, "p95": None, "p99": None}
+
+
+def test_conversations_send_their_turns_in_one_context():
+    client = Client()
+    mix = [Scenario("two", ["first", "second"])]
+    report = asyncio.run(run_load(client, mix, rate=50, duration=0.2, think_time=0, streaming_share=0, seed=1))
+    assert report.arrivals > 0 and report.dropped == 0
+    assert len(client.turns) == 2 * report.arrivals
+    contexts = {}
+    for context_id, text in client.turns:
+        contexts.setdefault(context_id, []).append(text)
+    assert all(texts == ["first", "second"] for texts in contexts.values())
+    assert all(r.ok for r in report.results)
+
+
+def test_failed_turn_ends_the_conversation():
+    client = Client(state="failed")
+    mix = [Scenario("two", ["first", "second"])]
+    report = asyncio.run(run_load(client, mix, rate=50, duration=0.1, think_time=0, streaming_share=0, seed=2))
+    assert [text for _, text in client.turns] == ["first"] * report.arrivals
+    assert {r.error for r in report.results} == {"state failed"}
+
+
+def test_in_process_run(pdf_dir, gpt4o_encoding, monkeypatch):
+    from app.push import QueuedPushNotificationSender
+
+    monkeypatch.setenv("RAG_WATCH_INTERVAL", "0")
+    monkeypatch.setenv("RAG_TEXT_STORE", "off")
+    closed = []
+    aclose = QueuedPushNotificationSender.aclose
+
+    async def recording_aclose(self, timeout=5.0):
+        await aclose(self, timeout)
+        closed.append(self._client.is_closed)
+
+    monkeypatch.setattr(QueuedPushNotificationSender, "aclose", recording_aclose)
+    report = asyncio.run(_run_in_process(
+        str(pdf_dir), 0.0, timeout=30.0, mix=[Scenario("single", ["What causes false smut?"])],
+        rate=20, duration=0.15, think_time=0, streaming_share=0.5, seed=3,
+    ))
+    assert report.results and all(r.ok for r in report.results)
+    assert closed == [True]
@@ -0,0 +1,44 @@
+from langchain_core.documents import Document
+
+from app.metadata import derive_metadata, enrich_metadata, infer_filters, matches
+
+
+def test_infer_filters():
+    assert infer_filters("What causes rice blast on leaves?") == {"diseases": ["blast"], "plant_parts": ["leaf"]}
+    assert infer_filters("Is Xanthomonas oryzae pv. oryzae spread by water?") == {
+        "diseases": ["bacterial blight"],
+        "pathogen_types": ["bacterial"],
+    }
+    assert infer_filters("fungal disease of the panicle") == {
+        "plant_parts": ["panicle"],
+        "pathogen_types": ["fungal"],
+    }
+    assert infer_filters("hello") == {}
+
+
+def test_matches():
+    meta = {"diseases": ["blast", "brown spot"], "chapter": "Fungus Chapter 1"}
+    assert matches(meta, {"diseases": ["blast", "tungro"]})
+    assert matches(meta, {"chapter": ["Fungus Chapter 1"]})
+    assert not matches(meta, {"diseases": ["tungro"]})
+    assert not matches(meta, {"plant_parts": ["leaf"]})
+
+
+def test_derive_metadata_uses_text_and_file_name():
+    text = "Panicle blast on the panicle neck; panicles turn white."
+    tags = derive_metadata(text, "/data/Fungus Chapter 4--Grain_Diseases.pdf")
+    assert tags == {
+        "diseases": ["blast"],
+        "plant_parts": ["grain", "panicle"],
+        "pathogen_types": ["fungal"],
+        "chapter": "Fungus Chapter 4--Grain_Diseases",
+    }
+    # A single mention of a plant part is not enough to tag it
+    assert derive_metadata("one leaf", "x.pdf")["plant_parts"] == []
+
+
+def test_enrich_metadata_updates_chunks_in_place():
+    chunk = Document(page_content="tungro is spread by leafhoppers", metadata={"source": "v.pdf", "page": 2})
+    assert enrich_metadata([chunk]) == [chunk]
+    assert chunk.metadata["diseases"] == ["tungro"] and chunk.metadata["page"] == 2
+    assert chunk.metadata["pathogen_types"] == ["viral"]
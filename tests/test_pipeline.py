@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from app.pipeline import run_pipeline
+
+
+def double(items):
+    for item in items:
+        yield item * 2
+
+
+def pairs(items):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == 2:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def test_stages_run_in_order():
+    assert list(run_pipeline(range(5), double, pairs, maxsize=1)) == [[0, 2], [4, 6], [8]]
+    assert list(run_pipeline([])) == []
+
+
+def test_stage_exception_reaches_the_consumer():
+    def failing(items):
+        for item in items:
+            if item == 3:
+                raise ValueError("bad item")
+            yield item
+
+    with pytest.raises(ValueError, match="bad item"):
+        list(run_pipeline(range(10), failing))
+
+
+def test_closing_early_stops_every_stage():
+    produced = []
+
+    def source():
+        for i in range(10_000):
+            produced.append(i)
+            yield i
+
+    before = threading.active_count()
+    outputs = run_pipeline(source(), double, maxsize=2)
+    assert next(outputs) == 0
+    outputs.close()
+    assert threading.active_count() == before
+    # Bounded queues keep the source from running ahead
+    assert len(produced) < 20
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pytest
+from langchain_core.documents import Document
+
+from app import rag
+
+
+QUESTION = "What is the best fertilizer?"
+
+
+@pytest.fixture(autouse=True)
+def prefetches(monkeypatch):
+    monkeypatch.setattr(rag, "_prefetches", OrderedDict())
+    monkeypatch.setattr(rag, "_prefetch_counts", {"started": 0, "hits": 0, "failed": 0})
+    return rag._prefetches
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    """Contexts `retrieve_information` generates from (None means it retrieved itself)."""
+    contexts = []
+
+    def answer(query, filters, context=None):
+        contexts.append(context)
+        return {"response": "answer"}
+
+    monkeypatch.setattr(rag, "_answer", answer)
+    return contexts
+
+
+def prefetch(prefetches, result):
+    future = Future()
+    if isinstance(result, Exception):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+    filters = rag._query_filters(QUESTION)
+    prefetches[rag._query_key(QUESTION, filters)] = (float("inf"), future)
+    return filters
+
+
+def counts():
+    stats = rag.query_stats()
+    return stats["prefetches"], stats["prefetches_hits"], stats["prefetches_failed"]
+
+
+def test_prefetch_is_used_once(prefetches, answers):
+    chunks = [Document("compost")]
+    prefetch(prefetches, chunks)
+    assert rag.retrieve_information.invoke({"query": "  what is the BEST fertilizer? "}) == "answer"
+    assert rag.retrieve_information.invoke({"query": QUESTION}) == "answer"
+    assert answers == [chunks, None]
+    assert counts() == (0, 1, 0)
+
+
+def test_failed_prefetch_is_counted_and_retrieved_again(prefetches, answers):
+    prefetch(prefetches, RuntimeError("search down"))
+    rag.retrieve_information.invoke({"query": QUESTION})
+    assert answers == [None]
+    assert counts() == (0, 0, 1)
+
+
+def test_expired_prefetch_is_not_used(prefetches):
+    filters = prefetch(prefetches, [Document("compost")])
+    key = next(iter(prefetches))
+    prefetches[key] = (0.0, prefetches[key][1])
+    assert rag._take_prefetch(QUESTION, filters) is None
+    assert counts() == (0, 0, 0)
@@ -0,0 +1,211 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from a2a.server.tasks import InMemoryPushNotificationConfigStore
+from a2a.types import PushNotificationConfig, Task, TaskState, TaskStatus
+
+from app import push
+from app.push import QueuedPushNotificationSender
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(push, "RETRY_BASE", 0.01)
+
+
+class Receivers:
+    """Webhook receivers by host: states received, and the responses to give first (None: refuse)."""
+
+    def __init__(self, **responses):
+        self.responses = {host: list(codes) for host, codes in responses.items()}
+        self.received = {}
+        self.tokens = []
+        self.task_ids = []
+
+    async def __call__(self, request):
+        host = request.url.host
+        codes = self.responses.get(host)
+        code = codes.pop(0) if codes else 200
+        if code is None:
+            raise httpx.ConnectError("refused")
+        if code != 200:
+            return httpx.Response(code)
+        payload = json.loads(request.content)
+        self.tokens.append(request.headers.get("X-A2A-Notification-Token"))
+        self.task_ids.append(payload["id"])
+        self.received.setdefault(host, []).append(payload["status"]["state"])
+        return httpx.Response(200)
+
+
+def task(task_id, state):
+    return Task(id=task_id, context_id="c", status=TaskStatus(state=TaskState(state)))
+
+
+async def sender_for(receivers, hosts, **kwargs):
+    """A sender with one push config per host, for task "task-<host>"."""
+    store = InMemoryPushNotificationConfigStore()
+    for host in hosts:
+        await store.set_info(f"task-{host}", PushNotificationConfig(url=f"http://{host}/hook", token="tok"))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(receivers))
+    return QueuedPushNotificationSender(client, store, workers=2, max_attempts=3, **kwargs)
+
+
+async def settle(sender, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while sender._destinations and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_updates_are_coalesced_and_delivered_in_background():
+    async def run():
+        receivers = Receivers()
+        sender = await sender_for(receivers, ["a"])
+        for state in ("submitted", "working", "working", "completed"):
+            await sender.send_notification(task("task-a", state))
+        assert receivers.received == {}  # nothing is sent inline
+        await settle(sender)
+        stats = sender.stats()
+        await sender.aclose()
+        return receivers, stats
+
+    receivers, stats = asyncio.run(run())
+    assert receivers.received == {"a": ["completed"]}
+    assert receivers.tokens == ["tok"]
+    assert (stats["enqueued"], stats["coalesced"], stats["delivered"]) == (1, 3, 1)
+    assert stats["latency_s"]["p50"] is not None
+
+
+def test_retries_then_gives_up():
+    async def run():
+        receivers = Receivers(flaky=[503, None], dead=[None] * 10, gone=[404])
+        sender = await sender_for(receivers, ["flaky", "dead", "gone"])
+        for host in ("flaky", "dead", "gone"):
+            await sender.send_notification(task(f"task-{host}", "completed"))
+        await settle(sender)
+        stats = sender.stats()
+        await sender.aclose()
+        return receivers, stats
+
+    receivers, stats = asyncio.run(run())
+    assert receivers.received == {"flaky": ["completed"]}
+    assert stats["delivered"] == 1
+    assert stats["failed"] == 2  # dead after 3 attempts, gone (404) at once
+    assert stats["retries"] == 2 + 2
+
+
+def test_idle_queues_are_dropped_and_counters_kept(monkeypatch):
+    monkeypatch.setattr(push, "DESTINATION_STATS_SIZE", 5)
+
+    async def run():
+        receivers = Receivers()
+        sender = await sender_for(receivers, [f"h{i}" for i in range(20)])
+        for i in range(20):
+            await sender.send_notification(task(f"task-h{i}", "completed"))
+        queued = len(sender._destinations)
+        await settle(sender)
+        # A destination used again continues its counters
+        await sender.send_notification(task("task-h19", "completed"))
+        await settle(sender)
+        stats = sender.stats()
+        await sender.aclose()
+        return queued, sender, stats
+
+    queued, sender, stats = asyncio.run(run())
+    assert queued == 20
+    assert sender._destinations == {}
+    assert stats["delivered"] == 21
+    # Only the most recently used URLs keep counters, most recent first
+    assert list(stats["destinations"]) == [f"http://h{i}/hook" for i in (19, 18, 17, 16, 15)]
+    assert stats["destinations"]["http://h19/hook"]["delivered"] == 2
+    assert stats["destinations"]["http://h15/hook"]["queued"] == 0
+
+
+def test_unexpected_delivery_error_counts_as_failed(monkeypatch):
+    async def run():
+        receivers = Receivers()
+        sender = await sender_for(receivers, ["a", "b"])
+        deliver = sender._deliver
+
+        async def broken(url, notification):
+            if "//a/" in url:
+                raise ValueError("bad payload")
+            return await deliver(url, notification)
+
+        monkeypatch.setattr(sender, "_deliver", broken)
+        await sender.send_notification(task("task-a", "completed"))
+        await sender.send_notification(task("task-b", "completed"))
+        await settle(sender)
+        stats = sender.stats()
+        await sender.aclose()
+        return receivers, stats
+
+    receivers, stats = asyncio.run(run())
+    assert receivers.received == {"b": ["completed"]}
+    assert (stats["delivered"], stats["failed"], stats["queued"]) == (1, 1, 0)
+    assert stats["destinations"]["http://a/hook"]["failed"] == 1
+
+
+def test_delivery_cut_short_by_aclose_stays_queued():
+    async def run():
+        hung = asyncio.Event()
+
+        async def hang(request):
+            hung.set()
+            await asyncio.sleep(10)
+
+        store = InMemoryPushNotificationConfigStore()
+        await store.set_info("t", PushNotificationConfig(url="http://a/hook"))
+        client = httpx.AsyncClient(transport=httpx.MockTransport(hang))
+        sender = QueuedPushNotificationSender(client, store, workers=1)
+        await sender.send_notification(task("t", "completed"))
+        await hung.wait()
+        await sender.aclose(timeout=0.05)
+        return sender.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["queued"], stats["delivered"], stats["failed"]) == (1, 0, 0)
+
+
+def test_per_destination_latency_while_backing_off(monkeypatch):
+    monkeypatch.setattr(push, "RETRY_BASE", 0.2)
+
+    async def run():
+        receivers = Receivers(slow=[200, 503, 503])
+        sender = await sender_for(receivers, ["slow"])
+        await sender._config_store.set_info("task-slow-2", PushNotificationConfig(url="http://slow/hook"))
+        await sender.send_notification(task("task-slow", "completed"))
+        await sender.send_notification(task("task-slow-2", "completed"))
+        await asyncio.sleep(0.02)
+        stats = sender.stats()
+        await settle(sender)
+        await sender.aclose()
+        return stats
+
+    stats = asyncio.run(run())
+    slow = stats["destinations"]["http://slow/hook"]
+    # The first update was delivered; the second is waiting to be retried
+    assert (slow["delivered"], slow["queued"], slow["consecutive_failures"]) == (1, 1, 1)
+    assert slow["latency_s"]["p50"] is not None
+
+
+def test_full_queue_drops_the_oldest_update():
+    async def run():
+        receivers = Receivers()
+        store = InMemoryPushNotificationConfigStore()
+        for i in range(3):
+            await store.set_info(f"t{i}", PushNotificationConfig(url="http://a/hook"))
+        client = httpx.AsyncClient(transport=httpx.MockTransport(receivers))
+        sender = QueuedPushNotificationSender(client, store, workers=1, queue_size=2)
+        # Queued together before the worker runs
+        await asyncio.gather(*(sender.send_notification(task(f"t{i}", "completed")) for i in range(3)))
+        await settle(sender)
+        stats = sender.stats()
+        await sender.aclose()
+        return receivers, stats
+
+    receivers, stats = asyncio.run(run())
+    assert receivers.task_ids == ["t1", "t2"]
+    assert (stats["dropped"], stats["delivered"]) == (1, 2)
@@ -0,0 +1,22 @@
+import pytest
+
+from app.router import AGENT, LOOKUP, route_query
+
+
+@pytest.mark.parametrize(
+    "query, kind, reason",
+    [
+        ("What causes false smut?", LOOKUP, "named disease lookup"),
+        ("Describe the symptoms of tungro", LOOKUP, "named disease lookup"),
+        ("My plants have blast lesions on the leaves", AGENT, "agent cue"),
+        ("Find recent research on sheath blight", AGENT, "agent cue"),
+        ("What causes it?", AGENT, "follow-up"),
+        ("What is the best fertilizer?", AGENT, "no disease named"),
+        ("Blast again", AGENT, "not a lookup question"),
+        ("What causes blast " + "and more " * 20, AGENT, "length"),
+        ("", AGENT, "length"),
+    ],
+)
+def test_route_query(query, kind, reason):
+    route = route_query(query)
+    assert (route.kind, route.reason) == (kind, reason)
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.singleflight import SingleFlight, once
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def work(x):
+        runs.append(x)
+        release.wait(5)
+        return x * 2
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "k", work, 21)
+        while flight.in_flight() == 0:
+            pass
+        followers = [pool.submit(flight.do, "k", work, 21) for _ in range(3)]
+        while flight.stats()["shared"] < 3:
+            pass
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert results == [42] * 4
+    assert runs == [21]
+    assert flight.stats() == {"calls": 1, "shared": 3, "in_flight": 0}
+
+
+def test_exception_reaches_every_caller_and_is_not_kept():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do("k", lambda: "ok") == "ok"
+    assert flight.in_flight() == 0
+
+
+def test_once_caches_success_and_retries_failure():
+    attempts = []
+
+    @once
+    def build():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("not yet")
+        return object()
+
+    assert build.cached() is None
+    with pytest.raises(RuntimeError):
+        build()
+    value = build()
+    assert build() is value and build.cached() is value
+    assert len(attempts) == 2
+    build.cache_clear()
+    assert build.cached() is None
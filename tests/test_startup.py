@@ -0,0 +1,56 @@
+from app.startup import app_dependencies, package_times, parse_importtime
+
+
+# Trimmed from `python -X importtime -c "import app.metadata"`
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:        48 |         48 |     _abc
+import time:       268 |        316 |   abc
+import time:       396 |        712 | io
+import time:       282 |        282 |   app
+import time:       163 |        163 |       _sre
+import time:      1761 |       1761 |         re._constants
+import time:       711 |       2471 |       re._parser
+import time:       787 |       3653 |     re._compiler
+import time:      1069 |      16042 |   re
+import time:       157 |     202007 |   langchain_core.documents
+import time:     15742 |     296373 | app.metadata
+""".splitlines()
+
+
+def names(records):
+    return [record.name for record in records]
+
+
+def test_parse_importtime_nests_records():
+    roots = parse_importtime(SAMPLE)
+    assert names(roots) == ["io", "app.metadata"]
+    io, metadata = roots
+    assert names(io.children) == ["abc"] and names(io.children[0].children) == ["_abc"]
+    assert (metadata.self_us, metadata.cumulative_us, metadata.depth) == (15742, 296373, 0)
+    assert names(metadata.children) == ["app", "re", "langchain_core.documents"]
+    compiler = metadata.children[1].children[0]
+    assert (compiler.name, compiler.depth) == ("re._compiler", 2)
+    assert names(compiler.children) == ["_sre", "re._parser"]
+    assert names(compiler.children[1].children) == ["re._constants"]
+
+
+def test_parse_importtime_ignores_other_lines():
+    lines = ["-- startup: listening --", "Traceback (most recent call last):"] + SAMPLE[:4]
+    assert names(parse_importtime(lines)) == ["io"]
+    assert parse_importtime([]) == []
+
+
+def test_package_times_sum_self_time():
+    times = dict(package_times(parse_importtime(SAMPLE)))
+    assert times["app"] == (282 + 15742) / 1e6
+    assert times["re"] == (1761 + 711 + 787 + 1069) / 1e6
+    assert times["_sre"] == 163 / 1e6
+    assert next(iter(times)) == "app"
+
+
+def test_app_dependencies_use_cumulative_time():
+    assert app_dependencies(parse_importtime(SAMPLE)) == [
+        ("app.metadata", "langchain_core.documents", 0.202007),
+        ("app.metadata", "re", 0.016042),
+    ]
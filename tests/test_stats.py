@@ -0,0 +1,16 @@
+from app.stats import percentile, percentiles
+
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile([], 50) is None
+    assert percentile([7.0], 95) == 7.0
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert abs(percentile(values, 90) - 3.7) < 1e-9
+
+
+def test_percentiles_sort_their_input():
+    assert percentiles([4.0, 1.0, 3.0, 2.0], (50, 100)) == {"p50": 2.5, "p100": 4.0}
+    assert percentiles([]) == {"p50": None, "p95": None, "p99": None}
@@ -0,0 +1,184 @@
+import os
+import threading
+
+import pytest
+from langchain_core.documents import Document
+
+from app import textstore
+from app.textstore import MANIFEST, TextStore, extract_library, iter_extract, load_documents
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Parse "PDFs" as text files with pages separated by form feeds; record the paths parsed."""
+    calls = []
+
+    def parse_pdf(path):
+        calls.append(os.path.basename(path))
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if text.startswith("%broken"):
+            raise ValueError("cannot open broken document")
+        return [
+            Document(page_content=page, metadata={"source": path, "file_path": path, "page": i, "title": "T"})
+            for i, page in enumerate(text.split("\f"))
+        ]
+
+    monkeypatch.setattr(textstore, "parse_pdf", parse_pdf)
+    return calls
+
+
+def write_pdf(directory, name, text):
+    path = directory / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def generation_files(store_dir):
+    return sorted(name for name in os.listdir(store_dir) if name.startswith(("texts-", "pages-")))
+
+
+def test_pages_round_trip_and_unchanged_files_are_not_parsed_again(tmp_path, parsed):
+    data, store = tmp_path / "data", str(tmp_path / "store")
+    data.mkdir()
+    write_pdf(data, "a.pdf", "blast lesions\fneck blast ü")
+    write_pdf(data, "b.pdf", "false smut")
+
+    docs = load_documents(str(data), store)
+    assert [(os.path.basename(d.metadata["source"]), d.metadata["page"], d.page_content) for d in docs] == [
+        ("a.pdf", 0, "blast lesions"),
+        ("a.pdf", 1, "neck blast ü"),
+        ("b.pdf", 0, "false smut"),
+    ]
+    assert docs[0].metadata["title"] == "T" and docs[0].metadata["file_hash"]
+
+    stats = extract_library(str(data), store)
+    assert (stats.extracted, stats.reused) == (0, 2)
+    assert parsed == ["a.pdf", "b.pdf"]
+
+
+def test_changed_and_removed_files(tmp_path, parsed):
+    data, store = tmp_path / "data", str(tmp_path / "store")
+    data.mkdir()
+    write_pdf(data, "a.pdf", "blast")
+    write_pdf(data, "b.pdf", "smut")
+    extract_library(str(data), store)
+
+    write_pdf(data, "a.pdf", "tungro")
+    os.remove(data / "b.pdf")
+    stats = extract_library(str(data), store)
+    # Both old entries are dropped: the changed file has a new hash
+    assert (stats.extracted, stats.reused, stats.removed) == (1, 0, 2)
+    assert [d.page_content for d in load_documents(str(data), store)] == ["tungro"]
+    # The replaced generation stays for readers that read the previous manifest
+    assert generation_files(store) == ["pages-1.npy", "pages-2.npy", "texts-1.bin", "texts-2.bin"]
+
+    write_pdf(data, "a.pdf", "grassy stunt")
+    extract_library(str(data), store)
+    assert generation_files(store) == ["pages-2.npy", "pages-3.npy", "texts-2.bin", "texts-3.bin"]
+
+
+def test_reader_that_loses_a_rewrite_race_reopens_the_new_generation(tmp_path, parsed, monkeypatch):
+    data, store = tmp_path / "data", str(tmp_path / "store")
+    data.mkdir()
+    write_pdf(data, "a.pdf", "blast")
+    extract_library(str(data), store)
+    real_load = textstore.np.load
+    rewrites = []
+
+    def load_after_two_rewrites(*args, **kwargs):
+        # Another process rewrites twice between this reader's manifest read and its np.load
+        if not rewrites:
+            for text in ("smut", "tungro"):
+                rewrites.append(text)
+                write_pdf(data, "a.pdf", text)
+                extract_library(str(data), store)
+        return real_load(*args, **kwargs)
+
+    monkeypatch.setattr(textstore.np, "load", load_after_two_rewrites)
+    reader = TextStore(store)
+    assert reader.generation == 3
+    (digest,) = reader.files
+    assert reader.page_text(digest, 0) == "tungro"
+
+
+def test_identical_copies_are_stored_once(tmp_path, parsed):
+    data, store = tmp_path / "data", str(tmp_path / "store")
+    data.mkdir()
+    write_pdf(data, "a.pdf", "blast")
+    write_pdf(data, "copy.pdf", "blast")
+    yielded = [(os.path.basename(path), pages) for path, _, pages in iter_extract(str(data), store)]
+    assert [(name, [p.page_content for p in pages]) for name, pages in yielded] == [("a.pdf", ["blast"])]
+    assert len(TextStore(store).files) == 1
+
+
+def test_unreadable_pdf_is_recorded_and_not_retried(tmp_path, parsed):
+    data, store = tmp_path / "data", str(tmp_path / "store")
+    data.mkdir()
+    write_pdf(data, "a.pdf", "blast")
+    write_pdf(data, "bad.pdf", "%broken")
+
+    stats = extract_library(str(data), store)
+    assert (stats.extracted, stats.failed) == (1, 1)
+    failed = list(TextStore(store).failed.values())
+    assert failed[0]["name"] == "bad.pdf" and "broken" in failed[0]["error"]
+    assert [d.page_content for d in load_documents(str(data), store)] == ["blast"]
+
+    stats = extract_library(str(data), store)
+    assert (stats.extracted, stats.failed) == (0, 1)
+    assert parsed.count("bad.pdf") == 1
+
+
+def test_abandoned_extraction_leaves_the_store_unchanged(tmp_path, parsed):
+    data, store = tmp_path / "data", str(tmp_path / "store")
+    data.mkdir()
+    write_pdf(data, "a.pdf", "blast")
+    extract_library(str(data), store)
+    write_pdf(data, "b.pdf", "smut")
+    write_pdf(data, "c.pdf", "tungro")
+
+    extraction = iter_extract(str(data), store)
+    next(extraction)
+    extraction.close()
+    assert TextStore(store).generation == 1
+    assert generation_files(store) == ["pages-1.npy", "texts-1.bin"]
+    assert not os.path.exists(os.path.join(store, MANIFEST + ".tmp"))
+
+
+def test_concurrent_writers_are_serialized(tmp_path, parsed):
+    data, store = tmp_path / "data", str(tmp_path / "store")
+    data.mkdir()
+    for i in range(5):
+        write_pdf(data, f"{i}.pdf", f"chapter {i}")
+    errors = []
+
+    def extract():
+        try:
+            extract_library(str(data), store)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=extract) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    # The second writer found the first one's generation current
+    assert len(parsed) == 5
+    assert TextStore(store).generation == 1
+
+
+def test_library_falls_back_to_parsing_with_a_warning(pdf_dir, tmp_path, monkeypatch, caplog):
+    from app.fakes import FakeEmbeddings
+    from app.rag import RAGLibrary
+
+    blocked = tmp_path / "not-a-directory"
+    blocked.write_text("")
+    monkeypatch.setenv("RAG_TEXT_STORE", str(blocked))
+    library = RAGLibrary(str(pdf_dir), FakeEmbeddings())
+    digests = {path: textstore.file_hash(path) for path in textstore.list_pdfs(str(pdf_dir))}
+
+    pages = list(library.iter_pages(digests))
+    assert [len(documents) for _, documents in pages] == [2]
+    assert "Extracted-text store" in caplog.text and "parsing the remaining PDFs directly" in caplog.text
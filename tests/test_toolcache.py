@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tools import tool
+
+from app import toolcache
+from app.toolcache import CachedTool, DiskCache, cache_key, error_message, normalize_args, tool_ttl
+
+
+class Provider:
+    """Results a fake search tool returns, one per call, and the calls it saw."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def __call__(self, query):
+        self.calls.append(query)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def cached_tool(provider, cache, ttl=60.0, stale=0.0):
+    @tool
+    def search(query: str) -> str:
+        """Search for `query`."""
+        return provider(query)
+
+    return CachedTool(search, cache, ttl, stale)
+
+
+def age_entries(cache, seconds):
+    cache._conn.execute("UPDATE entries SET created = created - ?", (seconds,))
+
+
+def wait_for_refresh():
+    deadline = time.monotonic() + 5
+    while toolcache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(str(tmp_path / "tools.sqlite3"))
+
+
+def test_normalized_args_share_a_key():
+    assert normalize_args({"query": "  Rice   Blast ", "max": None}) == {"query": "rice blast"}
+    assert cache_key("search", {"query": "Rice Blast "}) == cache_key("search", {"query": "rice blast"})
+    assert cache_key("search", {"query": "rice blast"}) != cache_key("arxiv", {"query": "rice blast"})
+
+
+def test_error_message():
+    assert error_message("PubMed exception: timed out") == "PubMed exception: timed out"
+    assert error_message("Arxiv exception: 503") == "Arxiv exception: 503"
+    assert error_message({"error": "rate limited"}) == "rate limited"
+    assert error_message({"error": None, "results": []}) is None
+    assert error_message("No good PubMed Result was found") is None
+
+
+def test_repeated_call_is_served_from_cache(cache):
+    provider = Provider("papers")
+    search = cached_tool(provider, cache)
+    assert search.invoke({"query": "Rice Blast"}) == "papers"
+    assert search.invoke({"query": "rice  blast"}) == "papers"
+    assert provider.calls == ["Rice Blast"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_error_payload_is_returned_but_not_cached(cache):
+    provider = Provider("PubMed exception: timed out", "papers")
+    search = cached_tool(provider, cache)
+    assert search.invoke({"query": "blast"}) == "PubMed exception: timed out"
+    assert cache.stats()["entries"] == 0
+    assert search.invoke({"query": "blast"}) == "papers"
+    assert len(provider.calls) == 2
+
+
+def test_expired_entry_is_served_when_provider_fails(cache):
+    provider = Provider("papers", {"error": "rate limited"})
+    search = cached_tool(provider, cache, ttl=60.0)
+    search.invoke({"query": "blast"})
+    age_entries(cache, 120)
+    assert search.invoke({"query": "blast"}) == "papers"
+    assert len(provider.calls) == 2
+
+
+def test_exception_without_cached_entry_propagates(cache):
+    search = cached_tool(Provider(RuntimeError("down")), cache)
+    with pytest.raises(Exception, match="down"):
+        search.invoke({"query": "blast"})
+
+
+def test_stale_entry_is_served_and_refreshed_in_background(cache):
+    provider = Provider("old", "new")
+    search = cached_tool(provider, cache, ttl=60.0, stale=600.0)
+    search.invoke({"query": "blast"})
+    age_entries(cache, 120)
+    assert search.invoke({"query": "blast"}) == "old"
+    wait_for_refresh()
+    assert len(provider.calls) == 2
+    assert search.invoke({"query": "blast"}) == "new"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DiskCache(str(tmp_path / "tools.sqlite3"), max_bytes=25)
+    cache.set("a", "search", "x" * 10)
+    cache.set("b", "search", "y" * 10)
+    cache.get("a")
+    cache.set("c", "search", "z" * 10)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_running_size_tracks_replacements_and_clear(tmp_path):
+    cache = DiskCache(str(tmp_path / "tools.sqlite3"), max_bytes=1000)
+    cache.set("a", "search", "x" * 10)
+    cache.set("a", "search", "x" * 20)
+    cache.set("b", "search", "y" * 5)
+    assert cache._size == cache.stats()["bytes"] == 22 + 7
+    cache.clear()
+    assert cache._size == 0
+    # A reopened cache starts from the stored size
+    cache.set("c", "search", "z")
+    assert DiskCache(cache.path)._size == 3
+
+
+class ToolStarts(BaseCallbackHandler):
+    def __init__(self):
+        self.starts = []
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self.starts.append((serialized.get("name"), run_id, parent_run_id))
+
+
+def test_provider_call_is_a_child_run(cache):
+    handler = ToolStarts()
+    search = cached_tool(Provider("papers"), cache)
+    search.invoke({"query": "blast"}, {"callbacks": [handler]})
+    (outer, outer_id, outer_parent), (inner, _, inner_parent) = handler.starts
+    assert outer == inner == "search"
+    assert outer_parent is None and inner_parent == outer_id
+
+    # A cache hit does not call the provider
+    handler.starts.clear()
+    search.invoke({"query": "blast"}, {"callbacks": [handler]})
+    assert len(handler.starts) == 1
+
+
+def test_default_cache_is_created_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(toolcache, "_default_cache", None)
+    caches = []
+    threads = [threading.Thread(target=lambda: caches.append(toolcache.default_cache())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(caches) == 8 and all(c is caches[0] for c in caches)
+    monkeypatch.setenv("TOOL_CACHE", "off")
+    assert toolcache.default_cache() is None
+
+
+def test_tool_ttl_environment_overrides(monkeypatch):
+    assert tool_ttl("tavily_search") == toolcache.DEFAULT_TTLS["tavily_search"]
+    assert tool_ttl("unknown") == toolcache.FALLBACK_TTL
+    monkeypatch.setenv("TOOL_CACHE_TTL_ARXIV", "10")
+    monkeypatch.setenv("TOOL_CACHE_STALE_ARXIV", "0")
+    assert tool_ttl("arxiv") == (10.0, 0.0)
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from app.vectorstore import QuantizedVectorStore, quantization_report
+
+
+DIM = 64
+
+
+def unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def skewed_batches(seed=0):
+    """Two batches; the second's much larger values on dims 0-3 raise the int8 scale."""
+    rng = np.random.default_rng(seed)
+    first = rng.normal(size=(200, DIM)).astype(np.float32)
+    second = rng.normal(size=(200, DIM)).astype(np.float32)
+    second[:, :4] *= 25.0
+    return first, second
+
+
+def top1(store, queries, rows=None):
+    return [store.search_rows(q, 1, rows)[0][0] for q in queries]
+
+
+@pytest.mark.parametrize("mode", ["float32", "int8", "binary"])
+def test_each_vector_finds_itself(mode):
+    first, second = skewed_batches()
+    store = QuantizedVectorStore(mode)
+    assert store.add_vectors(first) == range(0, 200)
+    assert store.add_vectors(second) == range(200, 400)
+    vectors = np.concatenate([first, second])
+    assert top1(store, vectors) == list(range(400))
+
+
+def test_int8_rows_are_re_encoded_after_the_scale_grows():
+    first, second = skewed_batches()
+    store = QuantizedVectorStore("int8")
+    store.add_vectors(first)
+    codes_before = store._codes[:200].copy()
+    store.add_vectors(second)
+    assert store._stale == 200
+
+    # The first search re-encodes the stale rows with the final scale
+    assert top1(store, first) == list(range(200))
+    assert store._stale == 0
+    assert not np.array_equal(store._codes[:200], codes_before)
+    fresh = QuantizedVectorStore("int8")
+    fresh.add_vectors(np.concatenate([first, second]))
+    assert np.array_equal(store._codes, fresh._codes)
+
+
+def test_rescoring_returns_exact_scores_from_disk():
+    first, second = skewed_batches()
+    vectors = unit(np.concatenate([first, second]))
+    store = QuantizedVectorStore("binary", rescore_oversampling=4.0)
+    store.add_vectors(first)
+    store.add_vectors(second)
+    store.finish()
+
+    query = vectors[7] + 0.05 * vectors[300]
+    exact = vectors @ unit(query[None])[0]
+    results = store.search_rows(query, 3)
+    rows, scores = [row for row, _ in results], [score for _, score in results]
+    # Candidates come from the codes; their order and scores are exact
+    assert rows[0] == 7
+    assert np.allclose(scores, exact[rows], atol=1e-5)
+    assert scores == sorted(scores, reverse=True)
+    assert np.allclose(store.vectors([7, 300]), vectors[[7, 300]], atol=1e-6)
+
+
+def test_search_within_rows_and_sizes():
+    first, _ = skewed_batches()
+    store = QuantizedVectorStore("int8")
+    store.add_vectors(first)
+    allowed = np.array([3, 50, 120])
+    assert top1(store, first[[3, 50, 120]], allowed) == [3, 50, 120]
+    assert {row for row, _ in store.search_rows(first[0], 5, allowed)} == {3, 50, 120}
+    assert store.memory_bytes() == 200 * DIM + DIM * 4
+    assert store.disk_bytes() == 200 * DIM * 4
+    assert QuantizedVectorStore("float32").search_rows(first[0], 3) == []
+    with pytest.raises(ValueError):
+        QuantizedVectorStore("int4")
+
+
+def test_quantization_report():
+    first, second = skewed_batches()
+    queries = list(first[:20] + 0.1)
+    rows = quantization_report([first, second], queries, k=4, oversampling=4.0)
+    assert [(r["quantization"], r["rescore_oversampling"]) for r in rows] == [
+        ("float32", 0.0), ("int8", 0.0), ("int8", 4.0), ("binary", 0.0), ("binary", 4.0),
+    ]
+    recall = {(r["quantization"], r["rescore_oversampling"]): r["recall@4"] for r in rows}
+    assert recall[("float32", 0.0)] == 1.0
+    assert recall[("int8", 4.0)] >= 0.95
+    assert recall[("binary", 4.0)] >= recall[("binary", 0.0)]
+    ram = {r["quantization"]: r["ram_bytes"] for r in rows}
+    assert ram["binary"] < ram["int8"] < ram["float32"]
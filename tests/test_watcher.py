@@ -0,0 +1,113 @@
+import os
+import threading
+
+import pytest
+
+from app.watcher import LibraryWatcher
+
+
+def write(path, data=b"%PDF-1.4"):
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def library(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    write(data / "a.pdf")
+    write(data / "b.pdf")
+    return data
+
+
+def test_change_is_reported_once_it_settles(library):
+    reported = []
+    watcher = LibraryWatcher(str(library), reported.append, interval=60)
+    assert not watcher.poll()
+
+    added = write(library / "c.pdf")
+    assert not watcher.poll()  # first sight: may still be copying
+    write(library / "c.pdf", b"%PDF-1.4 more bytes")
+    assert not watcher.poll()  # still growing
+    changes = watcher.poll()
+    assert changes.added == [added] and not changes.modified and not changes.deleted
+    assert reported == [changes]
+    assert not watcher.poll()  # reported once
+    assert len(reported) == 1
+
+
+def test_modified_and_deleted_pdfs(library):
+    reported = []
+    watcher = LibraryWatcher(str(library), reported.append, interval=60)
+    write(library / "a.pdf", b"%PDF-1.4 edited")
+    os.remove(library / "b.pdf")
+    watcher.poll()
+    changes = watcher.poll()
+    assert changes.modified == [str(library / "a.pdf")]
+    assert changes.deleted == [str(library / "b.pdf")]
+
+
+def test_non_pdf_files_are_ignored(library):
+    reported = []
+    watcher = LibraryWatcher(str(library), reported.append, interval=60)
+    (library / "notes.txt").write_text("draft")
+    (library / ".text_store").mkdir()
+    (library / ".text_store" / "texts-1.bin").write_bytes(b"x")
+    assert not watcher.poll() and not watcher.poll()
+    assert reported == []
+
+
+def test_failed_reload_is_retried(library):
+    calls = []
+
+    def on_change(changes):
+        calls.append(changes)
+        if len(calls) == 1:
+            raise RuntimeError("index build failed")
+
+    watcher = LibraryWatcher(str(library), on_change, interval=60)
+    write(library / "c.pdf")
+    watcher.poll()
+    watcher.poll()  # fails; the change stays pending
+    watcher.poll()
+    assert watcher.poll()
+    assert [c.added for c in calls] == [[str(library / "c.pdf")]] * 2
+
+
+def test_background_thread_fires_once(library):
+    fired = threading.Event()
+    reported = []
+
+    def on_change(changes):
+        reported.append(changes)
+        fired.set()
+
+    watcher = LibraryWatcher(str(library), on_change, interval=0.02).start()
+    try:
+        write(library / "c.pdf")
+        assert fired.wait(5)
+        threading.Event().wait(0.2)  # several more polls
+    finally:
+        watcher.stop()
+    assert len(reported) == 1
+
+
+def test_refresh_drops_prefetches_of_the_replaced_index(pdf_dir, gpt4o_encoding, monkeypatch):
+    from concurrent.futures import Future
+
+    from app import rag
+    from app.fakes import FakeEmbeddings
+
+    monkeypatch.setenv("RAG_TEXT_STORE", "off")
+    library = rag.RAGLibrary(str(pdf_dir), FakeEmbeddings())
+    library.refresh()
+    with rag._prefetch_lock:
+        rag._prefetches[("old question", ())] = (float("inf"), Future())
+
+    assert library.refresh() is False  # unchanged library: prefetches stay valid
+    assert ("old question", ()) in rag._prefetches
+
+    os.rename(next(pdf_dir.glob("*.pdf")), pdf_dir / "renamed.pdf")
+    assert library.refresh() is True
+    assert ("old question", ()) not in rag._prefetches
+    assert library.prefetches_dropped == 1